@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+共享摄像头模块
+Shared Camera Broker
+
+同一进程内手势控制和录屏画中画共用一路摄像头:
+1. 每个摄像头只打开一次，由后台线程解码
+2. 每帧只解码一次，以只读数组的形式分发给所有订阅者
+3. 订阅者接口与 cv.VideoCapture 一致 (isOpened / read / set / release)
+4. 引用计数管理，最后一个订阅者释放时关闭摄像头
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import cv2 as cv
+import numpy as np
+
+
+class CameraBroker:
+    """摄像头分发器 - 一个摄像头对应一个实例"""
+
+    def __init__(self, index: int = 0):
+        self.index = index
+        self.capture = cv.VideoCapture(index)
+        self.capture_lock = threading.Lock()  # VideoCapture 的读取和设置不能并发
+        self.condition = threading.Condition()
+
+        self.latest_frame: Optional[np.ndarray] = None  # 最新一帧 (只读)
+        self.sequence = 0  # 帧序号，每解码一帧加一
+        self.ref_count = 0
+        self.failed_reads = 0
+        self.max_failed_reads = 50  # 连续读取失败次数上限
+
+        self.running = self.capture.isOpened()
+        self.thread = None
+        if self.running:
+            self.thread = threading.Thread(target=self._read_loop, daemon=True)
+            self.thread.start()
+
+    def is_opened(self) -> bool:
+        """摄像头是否仍在工作"""
+        return self.running
+
+    def _read_loop(self):
+        """解码线程"""
+        while self.running:
+            with self.capture_lock:
+                ret, frame = self.capture.read()
+            if not ret:
+                self.failed_reads += 1
+                if self.failed_reads >= self.max_failed_reads:
+                    print(f"❌ 摄像头 {self.index} 连续读取失败，停止分发")
+                    break
+                time.sleep(0.01)
+                continue
+
+            self.failed_reads = 0
+            # 所有订阅者共享同一数组，设为只读防止互相篡改
+            frame.flags.writeable = False
+            with self.condition:
+                self.latest_frame = frame
+                self.sequence += 1
+                self.condition.notify_all()
+
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def wait_for_frame(self, last_sequence: int, timeout: float = 2.0) -> Tuple[int, Optional[np.ndarray]]:
+        """等待比 last_sequence 更新的一帧，返回(帧序号, 帧)"""
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.sequence > last_sequence or not self.running,
+                timeout=timeout
+            )
+            if self.sequence > last_sequence:
+                return self.sequence, self.latest_frame
+            return last_sequence, None
+
+    def set(self, prop_id: int, value) -> bool:
+        """设置摄像头参数"""
+        with self.capture_lock:
+            return self.capture.set(prop_id, value)
+
+    def subscribe(self) -> "CameraSubscription":
+        """新增一个订阅者"""
+        with self.condition:
+            self.ref_count += 1
+        return CameraSubscription(self)
+
+    def unsubscribe(self) -> bool:
+        """释放一个订阅者，返回摄像头是否已无人使用"""
+        with self.condition:
+            self.ref_count -= 1
+            return self.ref_count <= 0
+
+    def close(self):
+        """停止解码线程并释放摄像头"""
+        self.running = False
+        with self.condition:
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+        self.capture.release()
+
+
+class CameraSubscription:
+    """摄像头订阅者，接口与 cv.VideoCapture 一致"""
+
+    def __init__(self, broker: CameraBroker):
+        self.broker = broker
+        self.last_sequence = 0
+        self.released = False
+
+    def isOpened(self) -> bool:
+        return not self.released and self.broker.is_opened()
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """读取下一帧 (阻塞到有新帧为止)，返回的数组只读"""
+        if self.released:
+            return False, None
+        self.last_sequence, frame = self.broker.wait_for_frame(self.last_sequence)
+        return frame is not None, frame
+
+    def set(self, prop_id: int, value) -> bool:
+        """设置摄像头参数；摄像头被多方共享时忽略，避免互相改动分辨率"""
+        if self.broker.ref_count > 1:
+            return False
+        return self.broker.set(prop_id, value)
+
+    def release(self):
+        """释放订阅，最后一个订阅者释放时关闭摄像头"""
+        if self.released:
+            return
+        self.released = True
+        release_camera(self.broker)
+
+
+# 全局摄像头分发器注册表
+_brokers: Dict[int, CameraBroker] = {}
+_brokers_lock = threading.Lock()
+
+
+def open_shared_camera(index: int = 0) -> CameraSubscription:
+    """打开(或复用)共享摄像头，返回一个订阅者"""
+    with _brokers_lock:
+        broker = _brokers.get(index)
+        if broker is not None and not broker.is_opened() and broker.ref_count <= 0:
+            broker.close()
+            broker = None
+        if broker is None or not broker.is_opened():
+            broker = CameraBroker(index)
+            _brokers[index] = broker
+        return broker.subscribe()
+
+
+def release_camera(broker: CameraBroker):
+    """释放一个订阅，引用计数归零时关闭摄像头"""
+    with _brokers_lock:
+        if broker.unsubscribe():
+            broker.close()
+            if _brokers.get(broker.index) is broker:
+                del _brokers[broker.index]
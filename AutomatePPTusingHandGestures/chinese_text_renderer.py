@@ -6,8 +6,8 @@
 
 import cv2 as cv
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
 import os
+import time
 
 
 class ChineseTextRenderer:
@@ -16,6 +16,7 @@ class ChineseTextRenderer:
     def __init__(self):
         self.font_path = self._get_chinese_font()
         self.font_cache = {}
+        self.render_time_ns = 0  # 累计渲染耗时，供性能分析按帧取差值
         
     def _get_chinese_font(self):
         """获取中文字体路径"""
@@ -37,6 +38,7 @@ class ChineseTextRenderer:
     def _get_font(self, size):
         """获取指定大小的字体对象"""
         if size not in self.font_cache:
+            from PIL import ImageFont
             try:
                 if self.font_path:
                     self.font_cache[size] = ImageFont.truetype(self.font_path, size)
@@ -49,6 +51,11 @@ class ChineseTextRenderer:
         
         return self.font_cache[size]
     
+    def preload_fonts(self, sizes):
+        """预先加载常用字号，避免首次绘制时卡顿"""
+        for size in sizes:
+            self._get_font(size)
+    
     def put_text(self, img, text, position, font_size=20, color=(255, 255, 255)):
         """
         在图像上绘制中文文本
@@ -63,6 +70,9 @@ class ChineseTextRenderer:
         Returns:
             修改后的图像
         """
+        from PIL import Image, ImageDraw
+
+        start = time.perf_counter_ns()
         # 将OpenCV图像转换为PIL图像
         img_pil = Image.fromarray(cv.cvtColor(img, cv.COLOR_BGR2RGB))
         draw = ImageDraw.Draw(img_pil)
@@ -76,6 +86,7 @@ class ChineseTextRenderer:
         
         # 转换回OpenCV格式
         img_cv = cv.cvtColor(np.array(img_pil), cv.COLOR_RGB2BGR)
+        self.render_time_ns += time.perf_counter_ns() - start
         return img_cv
 
 
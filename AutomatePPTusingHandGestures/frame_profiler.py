@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+帧处理分阶段性能分析器
+Per-stage Frame Profiler
+
+功能特性:
+1. 按名称记录每个处理阶段的耗时 (翻转、颜色转换、推理、绘制、显示等)
+2. 对数分桶直方图，常数内存，计算 p50/p95/p99
+3. 每个直方图只由主循环线程写入，记录时不加锁
+4. 在画面上绘制紧凑的性能叠加层
+5. 退出时导出JSON
+"""
+
+import json
+import math
+import time
+from typing import Dict, Optional, Tuple
+
+import cv2 as cv
+
+
+class LatencyHistogram:
+    """对数分桶的耗时直方图 (单线程写入)"""
+
+    def __init__(self, min_ms: float = 0.01, buckets_per_octave: int = 4, octaves: int = 20):
+        self.min_ms = min_ms
+        self.buckets_per_octave = buckets_per_octave
+        self.counts = [0] * (buckets_per_octave * octaves + 1)  # 最后一个桶收纳超出范围的值
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+
+    def _bucket_index(self, value_ms: float) -> int:
+        if value_ms <= self.min_ms:
+            return 0
+        index = int(math.log2(value_ms / self.min_ms) * self.buckets_per_octave) + 1
+        return min(index, len(self.counts) - 1)
+
+    def _bucket_upper(self, index: int) -> float:
+        """桶的上界 (毫秒)"""
+        return self.min_ms * 2 ** (index / self.buckets_per_octave)
+
+    def record(self, value_ms: float):
+        self.counts[self._bucket_index(value_ms)] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        self.last_ms = value_ms
+        if value_ms > self.max_ms:
+            self.max_ms = value_ms
+
+    def percentile(self, q: float) -> float:
+        """第q百分位的近似值 (所在桶的上界，不超过最大值)"""
+        if self.count == 0:
+            return 0.0
+        target = q / 100.0 * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= target and bucket_count:
+                return min(self._bucket_upper(index), self.max_ms)
+        return self.max_ms
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_ms,
+        }
+
+
+class _StageTimer:
+    """计时上下文，退出时把耗时记录到直方图"""
+
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: LatencyHistogram):
+        self.histogram = histogram
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.record((time.perf_counter_ns() - self.start) / 1e6)
+        return False
+
+
+class FrameProfiler:
+    """帧处理分阶段性能分析器"""
+
+    def __init__(self):
+        self.histograms: Dict[str, LatencyHistogram] = {}  # 按首次记录的顺序排列
+        self.timers: Dict[str, _StageTimer] = {}
+        self.started_at = time.time()
+
+    def _histogram(self, name: str) -> LatencyHistogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        return histogram
+
+    def stage(self, name: str) -> _StageTimer:
+        """用法: with profiler.stage("draw_ui"): ..."""
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = _StageTimer(self._histogram(name))
+        return timer
+
+    def record(self, name: str, value_ms: float):
+        """直接记录一个阶段耗时 (毫秒)"""
+        self._histogram(name).record(value_ms)
+
+    def get_summary(self) -> Dict[str, Dict[str, float]]:
+        return {name: histogram.summary() for name, histogram in self.histograms.items()}
+
+    def draw_overlay(self, img, origin: Optional[Tuple[int, int]] = None):
+        """在画面左下角绘制各阶段 p50/p95/p99 (毫秒)"""
+        if not self.histograms:
+            return img
+        line_height = 16
+        width = 330
+        height = line_height * (len(self.histograms) + 1) + 8
+        x, y = origin or (10, img.shape[0] - height - 10)
+        x = max(0, x)
+        y = max(0, y)
+
+        # 半透明背景
+        region = img[y:y + height, x:x + width]
+        region[:] = (region * 0.35).astype(region.dtype)
+
+        font = cv.FONT_HERSHEY_PLAIN
+        columns = (5, 135, 200, 265)  # 名称、p50、p95、p99 的横坐标
+        rows = [("stage", "p50", "p95", "p99")]
+        for name, histogram in self.histograms.items():
+            rows.append((name[:16], f"{histogram.percentile(50):.1f}",
+                         f"{histogram.percentile(95):.1f}", f"{histogram.percentile(99):.1f}"))
+        for row_index, row in enumerate(rows, start=1):
+            color = (0, 255, 255) if row_index == 1 else (255, 255, 255)
+            for column, text in zip(columns, row):
+                cv.putText(img, text, (x + column, y + line_height * row_index), font, 1.0, color, 1)
+        return img
+
+    def export_json(self, path: str) -> bool:
+        """导出各阶段统计到JSON文件"""
+        data = {
+            "started_at": self.started_at,
+            "duration_s": time.time() - self.started_at,
+            "stages": self.get_summary(),
+        }
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            return True
+        except OSError as e:
+            print(f"❌ 导出性能数据失败: {e}")
+            return False
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+手势识别微基准测试
+Gesture Classification Microbenchmarks
+
+功能特性:
+1. 参数化生成合成手部姿态 (拳头、食指、OK、剪刀手等) 和运动轨迹 (四向滑动、画圈)，可叠加噪声和抖动
+2. 逐次计时 detect_static_gesture / detect_dynamic_gesture / is_circular_motion / match_and_execute_gestures
+3. 报告单次耗时、吞吐量以及 tracemalloc 统计的内存分配 (每次调用的峰值与新增内存块数的均值/最大值)
+4. 与保存的基线比较，超过阈值视为性能回退 (退出码1)
+
+用法:
+    python gesture_benchmark.py [--samples 2000] [--repeat 5] [--seed 0]
+                                [--save-baseline gesture_baseline.json]
+                                [--baseline gesture_baseline.json] [--threshold 0.2]
+"""
+
+import contextlib
+import io
+import json
+import math
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# 各姿态的手指状态 [拇指, 食指, 中指, 无名指, 小指]
+POSE_FINGERS = {
+    "fist": [0, 0, 0, 0, 0],
+    "point": [0, 1, 0, 0, 0],
+    "thumb_up": [1, 0, 0, 0, 0],
+    "peace": [0, 1, 1, 0, 0],
+    "ok": [1, 1, 0, 0, 0],
+    "two": [1, 1, 0, 0, 0],
+    "three": [0, 1, 1, 1, 0],
+    "four": [0, 1, 1, 1, 1],
+    "open_hand": [1, 1, 1, 1, 1],
+    "rock": [0, 1, 0, 0, 1],
+}
+
+TRAJECTORIES = ("swipe_left", "swipe_right", "swipe_up", "swipe_down", "circle")
+
+
+def make_hand(pose: str, center: Tuple[float, float] = (320, 240), scale: float = 1.0,
+              noise: float = 0.0, rng: Optional[random.Random] = None) -> List[List[int]]:
+    """
+    生成一只手的21个关键点 (findPosition 格式 [id, x, y])
+
+    Args:
+        pose: POSE_FINGERS 中的姿态名
+        center: 手掌中心 (关键点9) 的像素坐标
+        scale: 手的大小
+        noise: 每个关键点的高斯抖动标准差 (像素)
+    """
+    rng = rng or random.Random()
+    fingers = POSE_FINGERS[pose]
+    cx, cy = center
+    points = [(0.0, 0.0)] * 21
+    points[0] = (cx, cy + 90 * scale)  # 手腕
+
+    # 拇指 (1-4): 伸出时指尖在指间关节右侧
+    thumb_dir = 1 if fingers[0] else -1
+    points[1] = (cx - 35 * scale, cy + 60 * scale)
+    points[2] = (cx - 45 * scale, cy + 35 * scale)
+    points[3] = (cx - 50 * scale, cy + 15 * scale)
+    points[4] = (points[3][0] + thumb_dir * 15 * scale, cy - 5 * scale)
+
+    # 其余四指 (MCP, PIP, DIP, TIP): 伸直时逐节向上，弯曲时指尖回到PIP下方
+    for finger in range(1, 5):
+        base = finger * 4 + 1
+        x = cx + (finger - 2.5) * 22 * scale
+        mcp_y = cy + 10 * scale
+        points[base] = (x, mcp_y)
+        points[base + 1] = (x, mcp_y - 35 * scale)
+        if fingers[finger]:
+            points[base + 2] = (x, mcp_y - 60 * scale)
+            points[base + 3] = (x, mcp_y - 85 * scale)
+        else:
+            points[base + 2] = (x, mcp_y - 20 * scale)
+            points[base + 3] = (x, mcp_y - 5 * scale)
+
+    if pose == "ok":
+        # 拇指尖贴近食指尖 (距离 < 40)
+        points[4] = (points[8][0] + 10 * scale, points[8][1] + 10 * scale)
+        points[3] = (points[4][0] - 20 * scale, points[4][1] + 20 * scale)
+    elif pose == "two":
+        # 拇指和食指张开 (距离 >= 40)
+        points[4] = (points[3][0] + 15 * scale, cy + 40 * scale)
+
+    # 手掌中心放在 center
+    offset_x, offset_y = cx - points[9][0], cy - points[9][1]
+    return [[i, int(round(x + offset_x + rng.gauss(0, noise))), int(round(y + offset_y + rng.gauss(0, noise)))]
+            for i, (x, y) in enumerate(points)]
+
+
+def make_trajectory(kind: str, frames: int = 20, fps: float = 30.0, amplitude: float = 150.0,
+                    pose: str = "open_hand", jitter: float = 0.0, start_time: float = 0.0,
+                    rng: Optional[random.Random] = None) -> List[Tuple[float, List[List[int]]]]:
+    """生成一段运动轨迹，返回 [(时间戳, 关键点)]"""
+    rng = rng or random.Random()
+    samples = []
+    for index in range(frames):
+        progress = index / max(1, frames - 1)
+        if kind == "circle":
+            angle = 2 * math.pi * progress
+            center = (320 + amplitude / 2 * math.cos(angle), 240 + amplitude / 2 * math.sin(angle))
+        else:
+            dx, dy = {"swipe_left": (-1, 0), "swipe_right": (1, 0),
+                      "swipe_up": (0, -1), "swipe_down": (0, 1)}[kind]
+            center = (320 + dx * amplitude * (progress - 0.5), 240 + dy * amplitude * (progress - 0.5))
+        center = (center[0] + rng.gauss(0, jitter), center[1] + rng.gauss(0, jitter))
+        samples.append((start_time + index / fps, make_hand(pose, center, rng=rng)))
+    return samples
+
+
+def time_calls(func: Callable, inputs: List, repeat: int = 5) -> Dict[str, float]:
+    """对每个输入调用一次 func，重复 repeat 轮，返回单次调用耗时统计 (取各轮中位数)"""
+    per_call = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for item in inputs:
+            func(item)
+        per_call.append((time.perf_counter_ns() - start) / len(inputs))
+    median_ns = statistics.median(per_call)
+    return {
+        "calls": len(inputs) * repeat,
+        "mean_ns": median_ns,
+        "best_ns": min(per_call),
+        "throughput_per_s": 1e9 / median_ns if median_ns else 0.0,
+    }
+
+
+def measure_allocations(func: Callable, inputs: List) -> Dict[str, float]:
+    """
+    用 tracemalloc 统计内存分配: 一轮调用后保留的内存，以及每次调用的峰值
+    (调用期间相对调用前新增的最大字节数) 和净新增内存块数
+    """
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    call_peaks = []
+    call_blocks = []
+    for item in inputs:
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        blocks = sys.getallocatedblocks()
+        func(item)
+        call_blocks.append(sys.getallocatedblocks() - blocks)
+        _, peak = tracemalloc.get_traced_memory()
+        call_peaks.append(peak - current)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    diff = after.compare_to(before, "filename")
+    allocated = sum(stat.size_diff for stat in diff if stat.size_diff > 0)
+    blocks = sum(stat.count_diff for stat in diff if stat.count_diff > 0)
+    return {
+        "retained_bytes": allocated,
+        "retained_blocks": blocks,
+        "call_peak_bytes_mean": statistics.mean(call_peaks),
+        "call_peak_bytes_max": max(call_peaks),
+        "call_blocks_mean": statistics.mean(call_blocks),
+        "call_blocks_max": max(call_blocks),
+    }
+
+
+def run_benchmarks(samples: int = 2000, repeat: int = 5, seed: int = 0) -> Dict[str, Dict]:
+    """运行全部基准，返回 {基准名: 统计}"""
+    from landmark_replay import MockPPTController
+    from unified_ppt_gesture_controller import UnifiedGestureDetector, UnifiedPPTGestureController
+
+    rng = random.Random(seed)
+    results: Dict[str, Dict] = {}
+
+    # 1. 静态手势: 随机姿态 + 抖动，同时统计识别正确率
+    poses = [rng.choice(list(POSE_FINGERS)) for _ in range(samples)]
+    hands = [make_hand(pose, (rng.uniform(150, 490), rng.uniform(150, 330)),
+                       rng.uniform(0.8, 1.2), noise=2.0, rng=rng) for pose in poses]
+    detector = UnifiedGestureDetector(load_model=False)
+    results["detect_static_gesture"] = time_calls(detector.detect_static_gesture, hands, repeat)
+    results["detect_static_gesture"].update(measure_allocations(detector.detect_static_gesture, hands))
+    correct = sum(pose in detector.detect_static_gesture(hand) for pose, hand in zip(poses, hands))
+    results["detect_static_gesture"]["pose_accuracy"] = correct / samples
+
+    # 2. 动态手势: 按时间顺序送入轨迹 (每次调用追加一帧历史)
+    frames: List[Tuple[float, List[List[int]]]] = []
+    clock = 0.0
+    while len(frames) < samples:
+        trajectory = make_trajectory(rng.choice(TRAJECTORIES), jitter=3.0, start_time=clock, rng=rng)
+        frames.extend(trajectory)
+        clock = trajectory[-1][0] + 0.5
+    frames = frames[:samples]
+
+    def detect_dynamic(frame):
+        dynamic_detector.detect_dynamic_gesture(frame[1], frame[0])
+
+    dynamic_detector = UnifiedGestureDetector(load_model=False)
+    results["detect_dynamic_gesture"] = time_calls(detect_dynamic, frames, repeat)
+    dynamic_detector = UnifiedGestureDetector(load_model=False)
+    results["detect_dynamic_gesture"].update(measure_allocations(detect_dynamic, frames))
+
+    # 3. 画圈检测: 10帧的位置窗口
+    windows = []
+    for _ in range(samples):
+        trajectory = make_trajectory(rng.choice(TRAJECTORIES), frames=10, jitter=3.0, rng=rng)
+        windows.append([[lm[9][1], lm[9][2], t] for t, lm in trajectory])
+    results["is_circular_motion"] = time_calls(detector.is_circular_motion, windows, repeat)
+    results["is_circular_motion"].update(measure_allocations(detector.is_circular_motion, windows))
+
+    # 4. 手势匹配与执行 (模拟PPT控制器，屏蔽执行时的打印)
+    with contextlib.redirect_stdout(io.StringIO()):
+        controller = UnifiedPPTGestureController(ppt_controller=MockPPTController(), headless=True)
+    detections = []
+    match_clock = 0.0
+    for pose in poses:
+        detected = controller.gesture_detector.detect_static_gesture(make_hand(pose, rng=rng))
+        if rng.random() < 0.3:
+            detected[rng.choice(TRAJECTORIES)] = rng.uniform(0.5, 1.0)
+        match_clock += 1 / 30
+        detections.append((detected, match_clock))
+
+    def match(item):
+        controller.match_and_execute_gestures(item[0], item[1])
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        results["match_and_execute_gestures"] = time_calls(match, detections, repeat)
+        results["match_and_execute_gestures"].update(measure_allocations(match, detections))
+        controller.action_executor.stop()
+
+    return results
+
+
+def compare_baseline(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """返回比基线慢超过 threshold (比例) 的基准描述"""
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if not base or not base.get("mean_ns"):
+            continue
+        change = stats["mean_ns"] / base["mean_ns"] - 1
+        if change > threshold:
+            regressions.append(f"{name}: {base['mean_ns']:.0f}ns -> {stats['mean_ns']:.0f}ns (+{change:.0%})")
+    return regressions
+
+
+def _option(name: str, default=None):
+    if name in sys.argv:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
+
+def main():
+    """命令行入口"""
+    samples = int(_option("--samples", 2000))
+    repeat = int(_option("--repeat", 5))
+    seed = int(_option("--seed", 0))
+    threshold = float(_option("--threshold", 0.2))
+
+    results = run_benchmarks(samples, repeat, seed)
+
+    print(f"{'基准':<28}{'单次(μs)':>10}{'吞吐(次/秒)':>14}{'单次峰值 均值/最大(B)':>22}{'单次新增块 均值/最大':>20}")
+    for name, stats in results.items():
+        print(f"{name:<28}{stats['mean_ns'] / 1000:>10.2f}{stats['throughput_per_s']:>14.0f}"
+              f"{stats['call_peak_bytes_mean']:>14.1f}/{stats['call_peak_bytes_max']:<7}"
+              f"{stats['call_blocks_mean']:>12.1f}/{stats['call_blocks_max']:<7}")
+    if "pose_accuracy" in results.get("detect_static_gesture", {}):
+        print(f"合成姿态识别正确率: {results['detect_static_gesture']['pose_accuracy']:.1%}")
+
+    save_path = _option("--save-baseline")
+    if save_path:
+        with open(save_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"基线已保存: {save_path}")
+
+    baseline_path = _option("--baseline")
+    if baseline_path:
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_baseline(results, baseline, threshold)
+        if regressions:
+            print("❌ 性能回退:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print(f"✅ 与基线相比无超过 {threshold:.0%} 的回退")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
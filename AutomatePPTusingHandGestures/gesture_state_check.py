@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+手势状态机检查
+Gesture State Machine Check
+
+用合成关键点驱动无界面控制器 (模拟PPT控制器)，检查每个手势的状态机:
+1. 持续保持的静态手势只触发一次
+2. 不应期已过且松开后，第二次滑动可以再次触发
+3. 不应期内的第二次滑动被忽略
+4. 手离开画面后，之前的轨迹不会与下一次滑动拼接而重复触发
+5. 滑动后紧接着的回手动作不会触发反方向手势
+
+每项检查比较完整的动作序列。
+
+不需要摄像头、窗口或真实PPT，任一检查失败时退出码为1。
+
+用法:
+    python gesture_state_check.py
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+from typing import List, Tuple
+
+from gesture_benchmark import make_hand, make_trajectory
+
+FPS = 30.0
+
+
+def make_controller():
+    """使用默认手势配置的无界面控制器"""
+    from landmark_replay import MockPPTController
+    from unified_ppt_gesture_controller import UnifiedPPTGestureController
+
+    # 指向不存在的配置文件，避免本地修改过的 gesture_config.json 影响结果
+    config_file = os.path.join(tempfile.mkdtemp(), "gesture_config.json")
+    mock = MockPPTController()
+    controller = UnifiedPPTGestureController(config_file=config_file, ppt_controller=mock, headless=True)
+    return controller, mock
+
+
+def hold(pose: str, duration: float, start_time: float) -> List[Tuple[float, list]]:
+    """在画面中心保持一个静态姿态"""
+    hand = make_hand(pose)
+    return [(start_time + i / FPS, hand) for i in range(int(duration * FPS))]
+
+
+def no_hand(duration: float, start_time: float) -> List[Tuple[float, list]]:
+    """手离开画面"""
+    return [(start_time + i / FPS, []) for i in range(int(duration * FPS))]
+
+
+def swipe(start_time: float, kind: str = "swipe_right") -> List[Tuple[float, list]]:
+    """一次滑动 (20帧，10帧窗口内移动约95像素；右滑终点即左滑起点)"""
+    return make_trajectory(kind, frames=20, fps=FPS, amplitude=200.0, start_time=start_time)
+
+
+def end_time(segment: List[Tuple[float, list]]) -> float:
+    """下一段的开始时间"""
+    return segment[-1][0] + 1 / FPS
+
+
+def run(controller, mock, segments) -> List[str]:
+    """依次回放各段关键点，返回触发的动作名"""
+    frames = [frame for segment in segments for frame in segment]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for timestamp, lm_list in frames:
+            mock.clock = timestamp
+            controller.process_landmarks(lm_list, timestamp)
+        controller.action_executor.stop()
+    return [action["action"] for action in mock.actions]
+
+
+def check_hold_fires_once() -> Tuple[List[str], List[str]]:
+    controller, mock = make_controller()
+    actions = run(controller, mock, [hold("point", 3.0, 0.0), no_hand(0.5, 3.0)])
+    return actions, ["laser_pointer"]
+
+
+def check_swipe_after_refractory() -> Tuple[List[str], List[str]]:
+    controller, mock = make_controller()
+    refractory = controller.gesture_configs["next_slide"].refractory_period
+    # 第二次滑动在不应期和松开之后开始
+    gap = max(0.5, refractory + 0.2)
+    first = swipe(0.0)
+    actions = run(controller, mock, [first, no_hand(gap, end_time(first)), swipe(end_time(first) + gap),
+                                     no_hand(0.5, end_time(first) + gap + 20 / FPS)])
+    return actions, ["next_slide", "next_slide"]
+
+
+def check_swipe_inside_refractory() -> Tuple[List[str], List[str]]:
+    controller, mock = make_controller()
+    controller.gesture_configs["next_slide"].refractory_period = 1.5
+    first = swipe(0.0)
+    # 第二次滑动在第一次触发 (约0.3秒) 后约1.2秒时越过阈值，仍在1.5秒不应期内
+    second = swipe(end_time(first) + 0.2)
+    actions = run(controller, mock, [first, no_hand(0.2, end_time(first)), second, no_hand(1.0, end_time(second))])
+    return actions, ["next_slide"]
+
+
+def check_hand_loss_clears_motion() -> Tuple[List[str], List[str]]:
+    controller, mock = make_controller()
+    # 右滑，手离开0.4秒，再左滑: 旧轨迹不能让右滑再次触发
+    first = swipe(0.0)
+    second = swipe(end_time(first) + 0.4, "swipe_left")
+    actions = run(controller, mock, [first, no_hand(0.4, end_time(first)), second, no_hand(0.5, end_time(second))])
+    return actions, ["next_slide", "prev_slide"]
+
+
+def check_return_stroke_ignored() -> Tuple[List[str], List[str]]:
+    controller, mock = make_controller()
+    # 右滑后手立即沿原路返回
+    first = swipe(0.0)
+    back = swipe(end_time(first), "swipe_left")
+    actions = run(controller, mock, [first, back, no_hand(0.5, end_time(back))])
+    return actions, ["next_slide"]
+
+
+def main():
+    """命令行入口"""
+    checks = [
+        ("保持的手势只触发一次", check_hold_fires_once),
+        ("不应期后松开再滑动可再次触发", check_swipe_after_refractory),
+        ("不应期内的滑动被忽略", check_swipe_inside_refractory),
+        ("手离开后轨迹不拼接", check_hand_loss_clears_motion),
+        ("回手动作不触发反向手势", check_return_stroke_ignored),
+    ]
+    failed = 0
+    for name, check in checks:
+        actual, expected = check()
+        if actual == expected:
+            print(f"✅ {name}: {actual}")
+        else:
+            failed += 1
+            print(f"❌ {name}: {actual}，预期 {expected}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+手势到动作的端到端延迟追踪
+Gesture-to-Action Latency Tracer
+
+为每一次手势实例记录单调时钟时间戳:
+1. 动作开始 (滑动窗口起点的采集帧)
+2. 画面采集、关键点可用
+3. 置信度越过阈值
+4. execute_custom_action 分发
+5. PPT动作执行器完成按键注入
+
+同一手势实例的事件用同一个id关联，导出为 Chrome trace / Perfetto 可直接打开的JSON
+(chrome://tracing 或 https://ui.perfetto.dev)。
+"""
+
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+class GestureTracer:
+    """手势延迟追踪器 (线程安全，未启用时所有记录调用直接返回)"""
+
+    def __init__(self, enabled: bool = False, max_events: int = 200000):
+        self.enabled = enabled
+        self.max_events = max_events
+        self.events: List[Dict] = []
+        self.lock = threading.Lock()
+        self.id_counter = itertools.count(1)
+        self.pid = os.getpid()
+        self.dropped_events = 0
+
+    @staticmethod
+    def now() -> float:
+        """单调时钟时间戳 (秒)，与 time.perf_counter 一致"""
+        return time.perf_counter()
+
+    def new_trace_id(self) -> int:
+        return next(self.id_counter)
+
+    def _emit(self, phase: str, name: str, timestamp: Optional[float], trace_id: Optional[int],
+              args: Optional[Dict]):
+        if not self.enabled:
+            return
+        event = {
+            "name": name,
+            "cat": "gesture",
+            "ph": phase,
+            "ts": (timestamp if timestamp is not None else time.perf_counter()) * 1e6,  # 微秒
+            "pid": self.pid,
+            "tid": threading.get_ident(),
+        }
+        if trace_id is not None:
+            event["id"] = trace_id
+        if args:
+            event["args"] = args
+        with self.lock:
+            if len(self.events) >= self.max_events:
+                self.dropped_events += 1
+                return
+            self.events.append(event)
+
+    def begin(self, name: str, timestamp: Optional[float] = None, args: Optional[Dict] = None) -> int:
+        """开始一个手势实例，返回用于关联后续事件的id"""
+        trace_id = self.new_trace_id()
+        self._emit("b", name, timestamp, trace_id, args)
+        return trace_id
+
+    def step(self, trace_id: Optional[int], name: str, timestamp: Optional[float] = None,
+             args: Optional[Dict] = None):
+        """手势实例中的一个时间点"""
+        if trace_id is not None:
+            self._emit("n", name, timestamp, trace_id, args)
+
+    def end(self, trace_id: Optional[int], name: str, timestamp: Optional[float] = None,
+            args: Optional[Dict] = None):
+        """结束手势实例 (name需与begin时一致)"""
+        if trace_id is not None:
+            self._emit("e", name, timestamp, trace_id, args)
+
+    def export(self, path: str) -> bool:
+        """导出 Chrome trace JSON"""
+        with self.lock:
+            events = list(self.events)
+        data = {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"dropped_events": self.dropped_events},
+        }
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            return True
+        except OSError as e:
+            print(f"❌ 导出手势追踪失败: {e}")
+            return False
+
+
+# 全局追踪器实例
+_tracer = None
+
+def get_tracer() -> GestureTracer:
+    """获取全局手势追踪器实例"""
+    global _tracer
+    if _tracer is None:
+        _tracer = GestureTracer()
+    return _tracer
@@ -1,16 +1,105 @@
 import cv2 as cv
-import mediapipe as mp
+import numpy as np
 import time
 import math
 
 
+class OneEuroFilter:
+    """
+    One Euro 滤波器 (Casiez 等, 2012)，状态为整个数组，一帧只做一次向量化更新
+
+    静止时截止频率接近 min_cutoff，抖动被强力平滑；快速移动时截止频率随速度升高 (beta)，
+    滞后很小。坐标为MediaPipe的归一化坐标 (0~1)，速度单位为 画面宽度/秒。
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=5.0, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self.x_prev = None
+        self.dx_prev = None
+        self.t_prev = None
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, x, t):
+        x = np.asarray(x, dtype=np.float64)
+        if self.x_prev is None or self.x_prev.shape != x.shape:
+            # 首帧: 直接采用观测值
+            self.x_prev = x
+            self.dx_prev = np.zeros_like(x)
+            self.t_prev = t
+            return x
+        if t <= self.t_prev:
+            # 时间戳未前进 (同一帧重复调用)
+            return self.x_prev
+
+        dt = t - self.t_prev
+        dx = (x - self.x_prev) / dt
+        a_d = self._alpha(self.d_cutoff, dt)
+        dx_hat = a_d * dx + (1 - a_d) * self.dx_prev
+        cutoff = self.min_cutoff + self.beta * np.abs(dx_hat)
+        a = self._alpha(cutoff, dt)  # 每个坐标各自的平滑系数
+        x_hat = a * x + (1 - a) * self.x_prev
+
+        self.x_prev = x_hat
+        self.dx_prev = dx_hat
+        self.t_prev = t
+        return x_hat
+
+
+class LandmarkSmoother:
+    """
+    每只手一个 One Euro 滤波器 (21x3 坐标)，按左右手标签对应，
+    MediaPipe 调换两只手的输出顺序时也不会把两只手的轨迹混在一起；离开画面的手丢弃其滤波器
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=5.0, d_cutoff=1.0):
+        self.params = (min_cutoff, beta, d_cutoff)
+        self.filters = {}
+
+    def reset(self):
+        self.filters = {}
+
+    def update(self, hands, t, handedness=None):
+        """
+        Args:
+            hands: 每只手一个 (21, 3) 归一化坐标数组
+            t: 该帧时间戳 (秒)
+            handedness: 每只手的左右手标签，缺失或重复时退化为按顺序对应
+        Returns:
+            平滑后的坐标数组列表
+        """
+        if handedness and len(handedness) == len(hands) and all(handedness) \
+                and len(set(handedness)) == len(handedness):
+            keys = list(handedness)
+        else:
+            keys = list(range(len(hands)))
+        self.filters = {key: f for key, f in self.filters.items() if key in keys}
+        smoothed = []
+        for key, hand in zip(keys, hands):
+            if key not in self.filters:
+                self.filters[key] = OneEuroFilter(*self.params)
+            smoothed.append(self.filters[key](hand, t))
+        return smoothed
+
+
 class handDetector():
-    def __init__(self, mode=False, maxHands=2, complexity = 1, detectionCon=0.5, trackCon=0.5):
+    def __init__(self, mode=False, maxHands=2, complexity = 1, detectionCon=0.5, trackCon=0.5,
+                 smoothing=False, min_cutoff=1.0, beta=5.0):
         self.mode = mode
         self.maxHands = maxHands
         self.complexity = complexity
         self.detectionCon = detectionCon
         self.trackCon = trackCon
+        # mediapipe导入较慢 (约1秒)，推迟到真正创建检测器时
+        import mediapipe as mp
         self.mpHands = mp.solutions.hands
         self.hands = self.mpHands.Hands(self.mode, self.maxHands, self.complexity,
                                         self.detectionCon, self.trackCon,)
@@ -18,22 +107,68 @@ class handDetector():
         
         # 手指关节点ID
         self.tipIds = [4, 8, 12, 16, 20]  # 拇指、食指、中指、无名指、小指尖端
-
-    def findHands(self, img, draw=True):
+        self.last_timings = {}  # 最近一次 findHands 各步骤耗时 (毫秒)
+
+        # 关键点平滑 (One Euro)，减少抖动造成的阈值闪烁
+        self.smoother = LandmarkSmoother(min_cutoff, beta) if smoothing else None
+        self.landmarks = []  # 平滑后每只手21x3的归一化坐标
+
+    def warm_up(self, iterations=3, size=(480, 640)):
+        """用空白帧预先运行几次，把图初始化的开销挪到第一帧真实画面之前"""
+        blank = np.zeros((size[0], size[1], 3), dtype=np.uint8)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            self.hands.process(blank)
+        return time.perf_counter() - start
+
+    def findHands(self, img, draw=True, timestamp=None):
+        """timestamp 为该帧时间 (秒)，用于平滑滤波；离线处理视频时传入视频时间戳"""
+        start = time.perf_counter()
         imgRGB = cv.cvtColor(img, cv.COLOR_BGR2RGB)
+        converted = time.perf_counter()
         self.results = self.hands.process(imgRGB)
+        self.last_timings = {"cvtColor": (converted - start) * 1000,
+                             "hands.process": (time.perf_counter() - converted) * 1000}
         # print(results.multi_hand_landmarks)
 
-        if self.results.multi_hand_landmarks:
+        if self.smoother is not None:
+            smooth_start = time.perf_counter()
+            hands = [np.array([(lm.x, lm.y, lm.z) for lm in handLms.landmark])
+                     for handLms in (self.results.multi_hand_landmarks or [])]
+            handedness = [h.classification[0].label for h in (self.results.multi_handedness or [])]
+            self.landmarks = self.smoother.update(hands, timestamp if timestamp is not None else smooth_start,
+                                                  handedness)
+            self.last_timings["smoothing"] = (time.perf_counter() - smooth_start) * 1000
+            if draw:
+                self.draw_smoothed_landmarks(img)
+        elif self.results.multi_hand_landmarks:
             for handLms in self.results.multi_hand_landmarks:
                 if draw:
                     self.mpDraw.draw_landmarks(img, handLms, self.mpHands.HAND_CONNECTIONS)
 
         return img
 
+    def draw_smoothed_landmarks(self, img):
+        """绘制平滑后的关键点和连线，与 findPosition 返回的坐标一致"""
+        h, w = img.shape[:2]
+        for hand in self.landmarks:
+            points = [(int(x * w), int(y * h)) for x, y, _ in hand]
+            for start, end in self.mpHands.HAND_CONNECTIONS:
+                cv.line(img, points[start], points[end], (224, 224, 224), 2)
+            for point in points:
+                cv.circle(img, point, 4, (0, 0, 255), cv.FILLED)
+
     def findPosition(self, img, handNo = 0, draw=True):
         lmList = []
-        if self.results.multi_hand_landmarks:
+        if self.smoother is not None:
+            if handNo < len(self.landmarks):
+                h, w, c = img.shape
+                for id, (x, y, _) in enumerate(self.landmarks[handNo]):
+                    cx, cy = int(x * w), int(y * h)
+                    lmList.append([id, cx, cy])
+                    if draw:
+                        cv.circle(img, (cx, cy), 5, (255, 0, 250), -1)
+        elif self.results.multi_hand_landmarks:
             myHand = self.results.multi_hand_landmarks[handNo]
             for id, lm in enumerate(myHand.landmark):
                 # print(id, lm)
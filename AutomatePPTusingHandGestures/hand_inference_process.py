@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+独立进程手部推理
+Process-based Hand Inference
+
+受GIL限制，同一进程内的MediaPipe推理、PIL文字渲染和 cv.imshow 无法真正并行。
+本模块把推理放到独立进程:
+1. 画面通过 multiprocessing.shared_memory 的环形槽位传递，图像不经过pickle
+2. 推理结果写入共享内存中的紧凑结构体 (LANDMARK_DTYPE)，队列中只传递槽位号
+3. 主进程提交当前帧后立即取最近完成的结果，推理与界面渲染在不同CPU核上并行
+4. 所有槽位都在推理中时丢弃新帧，不会越积越多
+"""
+
+import multiprocessing
+import queue
+import time
+from collections import deque
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import cv2 as cv
+import numpy as np
+
+from hand_tracking_service import LandmarkHandDetector, attach_shared_memory
+
+
+MAX_HANDS = 2
+HANDEDNESS_LABELS = ("", "Left", "Right")
+
+# 单帧推理结果 (每个槽位一条)
+LANDMARK_DTYPE = np.dtype([
+    ("sequence", np.uint64),                          # 帧序号
+    ("num_hands", np.uint8),                          # 检测到的手数
+    ("handedness", np.uint8, (MAX_HANDS,)),           # 0=未知 1=左手 2=右手
+    ("landmarks", np.float32, (MAX_HANDS, 21, 3)),    # 归一化坐标 (x, y, z)
+    ("inference_ms", np.float32),                     # 推理耗时
+])
+
+
+def _inference_worker(frame_shm_name: str, result_shm_name: str, shape: Tuple[int, int, int],
+                      slot_count: int, config: Tuple, task_queue, done_queue):
+    """推理进程入口: 从任务队列取槽位号，推理后把结果写入对应结果槽位"""
+    import mediapipe as mp
+
+    frame_shm = attach_shared_memory(frame_shm_name)
+    result_shm = attach_shared_memory(result_shm_name)
+    frames = np.ndarray((slot_count,) + tuple(shape), dtype=np.uint8, buffer=frame_shm.buf)
+    results = np.ndarray((slot_count,), dtype=LANDMARK_DTYPE, buffer=result_shm.buf)
+
+    mode, max_hands, complexity, detection_con, track_con = config
+    hands = mp.solutions.hands.Hands(mode, min(max_hands, MAX_HANDS), complexity, detection_con, track_con)
+    blank = np.zeros(shape, dtype=np.uint8)
+    for _ in range(3):  # 预热
+        hands.process(blank)
+    done_queue.put(-1)  # 就绪信号
+
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            slot, sequence = task
+            start = time.perf_counter()
+            output = hands.process(frames[slot])
+
+            hand_list = output.multi_hand_landmarks or []
+            results["num_hands"][slot] = min(len(hand_list), MAX_HANDS)
+            for index, hand in enumerate(hand_list[:MAX_HANDS]):
+                results["landmarks"][slot, index] = [(lm.x, lm.y, lm.z) for lm in hand.landmark]
+                label = ""
+                if output.multi_handedness and index < len(output.multi_handedness):
+                    label = output.multi_handedness[index].classification[0].label
+                results["handedness"][slot, index] = HANDEDNESS_LABELS.index(label) if label in HANDEDNESS_LABELS else 0
+            results["inference_ms"][slot] = (time.perf_counter() - start) * 1000
+            results["sequence"][slot] = sequence
+            done_queue.put(slot)
+    finally:
+        del frames, results
+        frame_shm.close()
+        result_shm.close()
+
+
+class ProcessHandDetector(LandmarkHandDetector):
+    """
+    在独立进程中推理的手部检测器
+
+    findHands 提交当前帧后返回最近一次完成的推理结果，关键点通常比画面晚一帧，
+    换来推理与界面绘制的并行。
+    """
+
+    def __init__(self, mode=False, maxHands=2, complexity=1, detectionCon=0.5, trackCon=0.5,
+                 slot_count: int = 3, startup_timeout: float = 30.0,
+                 frame_shape: Optional[Tuple[int, int, int]] = (480, 640, 3)):
+        super().__init__()
+        self.config = (mode, maxHands, complexity, detectionCon, trackCon)
+        self.slot_count = slot_count
+        self.startup_timeout = startup_timeout
+
+        self.context = multiprocessing.get_context("spawn")
+        self.process = None
+        self.task_queue = None
+        self.done_queue = None
+        self.frame_shm: Optional[shared_memory.SharedMemory] = None
+        self.result_shm: Optional[shared_memory.SharedMemory] = None
+        self.frames: Optional[np.ndarray] = None
+        self.results: Optional[np.ndarray] = None
+        self.shape = None
+
+        self.free_slots = deque()
+        self.sequence = 0
+        self.latest_sequence = 0
+        self.dropped_frames = 0
+        self.last_inference_ms = 0.0
+
+        # 按预期画面尺寸提前启动并预热推理进程，尺寸不符时在第一帧重新启动
+        if frame_shape:
+            self._start(tuple(frame_shape))
+
+    def _start(self, shape: Tuple[int, int, int]):
+        """按画面尺寸创建共享内存并启动推理进程"""
+        self.stop()
+        self.shape = shape
+        self.frame_shm = shared_memory.SharedMemory(create=True, size=self.slot_count * int(np.prod(shape)))
+        self.result_shm = shared_memory.SharedMemory(create=True, size=self.slot_count * LANDMARK_DTYPE.itemsize)
+        self.frames = np.ndarray((self.slot_count,) + shape, dtype=np.uint8, buffer=self.frame_shm.buf)
+        self.results = np.ndarray((self.slot_count,), dtype=LANDMARK_DTYPE, buffer=self.result_shm.buf)
+        self.results[:] = np.zeros(1, dtype=LANDMARK_DTYPE)
+
+        self.task_queue = self.context.Queue()
+        self.done_queue = self.context.Queue()
+        self.process = self.context.Process(
+            target=_inference_worker,
+            args=(self.frame_shm.name, self.result_shm.name, shape, self.slot_count,
+                  self.config, self.task_queue, self.done_queue),
+            daemon=True
+        )
+        self.process.start()
+
+        try:
+            self.done_queue.get(timeout=self.startup_timeout)
+        except queue.Empty:
+            self.stop()
+            raise RuntimeError("推理进程启动超时")
+        self.free_slots = deque(range(self.slot_count))
+
+    def _collect_results(self):
+        """回收已完成的槽位，保留序号最新的结果"""
+        while True:
+            try:
+                slot = self.done_queue.get_nowait()
+            except queue.Empty:
+                break
+            sequence = int(self.results["sequence"][slot])
+            if sequence > self.latest_sequence:
+                self.latest_sequence = sequence
+                count = int(self.results["num_hands"][slot])
+                self.landmarks = [self.results["landmarks"][slot, i].copy() for i in range(count)]
+                self.handedness = [HANDEDNESS_LABELS[self.results["handedness"][slot, i]] for i in range(count)]
+                self.last_inference_ms = float(self.results["inference_ms"][slot])
+            self.free_slots.append(slot)
+
+    def submit(self, img) -> bool:
+        """把一帧写入空闲槽位并提交推理，没有空闲槽位时丢弃该帧"""
+        if self.process is None or img.shape != self.shape:
+            self._start(img.shape)
+        self._collect_results()
+        if not self.free_slots:
+            self.dropped_frames += 1
+            return False
+        slot = self.free_slots.popleft()
+        # 直接转换到共享内存槽位，不复制、不序列化画面
+        start = time.perf_counter()
+        cv.cvtColor(img, cv.COLOR_BGR2RGB, dst=self.frames[slot])
+        self.last_timings["cvtColor"] = (time.perf_counter() - start) * 1000
+        self.sequence += 1
+        self.task_queue.put((slot, self.sequence))
+        return True
+
+    def findHands(self, img, draw=True, timestamp=None):
+        self.last_timings = {}
+        previous_sequence = self.latest_sequence
+        self.submit(img)
+        self._collect_results()
+        # 推理在另一进程中进行，这里记录的是推理进程测得的耗时
+        self.last_timings["hands.process"] = self.last_inference_ms
+        if self.latest_sequence != previous_sequence:
+            # 只对新结果滤波，沿用旧结果的帧不重复平滑
+            self._smooth_landmarks(timestamp)
+        if draw:
+            self.draw_landmarks(img)
+        return img
+
+    def get_stats(self) -> dict:
+        """推理统计"""
+        return {
+            "submitted": self.sequence,
+            "latest_sequence": self.latest_sequence,
+            "dropped_frames": self.dropped_frames,
+            "inference_ms": self.last_inference_ms,
+        }
+
+    def stop(self):
+        """停止推理进程并释放共享内存"""
+        if self.process is not None:
+            self.task_queue.put(None)
+            self.process.join(timeout=2.0)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+        self.frames = None
+        self.results = None
+        for shm in (self.frame_shm, self.result_shm):
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        self.frame_shm = None
+        self.result_shm = None
+
+    def close(self):
+        self.stop()
+
+    def __del__(self):
+        try:
+            self.stop()
+        except Exception:
+            pass
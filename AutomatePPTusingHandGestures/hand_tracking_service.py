@@ -0,0 +1,553 @@
+# -*- coding: utf-8 -*-
+"""
+常驻手部追踪服务
+Persistent Hand Tracking Service
+
+MediaPipe Hands 图初始化和前几帧推理很慢，每次启动程序都要重新付出这部分开销。
+本模块提供一个独立的常驻进程:
+1. 进程内保存已预热的 mp.solutions.hands 图 (按检测参数缓存)
+2. 客户端通过共享内存传递画面，只经本地连接发送很小的控制消息
+3. 返回每只手 21x3 的归一化关键点数组
+4. 界面程序重启或切换文稿后可直接复用，无需重新初始化模型
+5. 长时间无客户端连接时自动退出
+6. 只监听当前用户私有目录中的 Unix 套接字 (Windows 为命名管道)，
+   每次启动服务生成随机认证密钥，保存在仅本用户可读的文件中
+7. 同一时间只服务一个客户端，其他客户端收到 "busy" 后回退到进程内检测；
+   认证握手在各自的线程中进行，客户端等待握手有超时，新客户端开始前重置追踪状态
+
+启动服务: python hand_tracking_service.py --serve
+停止服务: python hand_tracking_service.py --shutdown
+"""
+
+import math
+import os
+import secrets
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import AuthenticationError, shared_memory
+from multiprocessing.connection import Client, Listener, answer_challenge, deliver_challenge
+from typing import Dict, List, Optional, Tuple
+
+import cv2 as cv
+import numpy as np
+
+
+DEFAULT_IDLE_TIMEOUT = 600.0  # 无客户端连接多少秒后退出
+HANDSHAKE_TIMEOUT = 5.0  # 连接后等待认证握手的最长时间(秒)
+AUTHKEY_ENV = "PPT_HAND_TRACKING_AUTHKEY"  # 启动服务时通过环境变量传递认证密钥 (十六进制)
+
+# mp.solutions.hands.HAND_CONNECTIONS (客户端不导入mediapipe，直接使用连线表)
+HAND_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 4),
+    (0, 5), (5, 6), (6, 7), (7, 8),
+    (5, 9), (9, 10), (10, 11), (11, 12),
+    (9, 13), (13, 14), (14, 15), (15, 16),
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),
+)
+
+
+def get_runtime_dir() -> str:
+    """当前用户私有的运行目录 (权限0700)，存放套接字和认证密钥文件"""
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or tempfile.gettempdir()
+        path = os.path.join(base, "ppt-hand-tracking")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    base = os.environ.get("XDG_RUNTIME_DIR")
+    if base:
+        path = os.path.join(base, "ppt-hand-tracking")
+    else:
+        path = os.path.join(tempfile.gettempdir(), f"ppt-hand-tracking-{os.getuid()}")
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    # 目录可能是其他用户预先创建的: 必须属于本用户且其他人不可访问
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"手部追踪服务目录不安全: {path}")
+    return path
+
+
+def get_default_address() -> str:
+    """服务地址: Unix 套接字路径，Windows 为按用户区分的命名管道"""
+    if os.name == "nt":
+        user = os.environ.get("USERNAME", "user")
+        return rf"\\.\pipe\ppt-hand-tracking-{user}"
+    return os.path.join(get_runtime_dir(), "service.sock")
+
+
+def get_authkey_path() -> str:
+    return os.path.join(get_runtime_dir(), "authkey")
+
+
+def write_authkey(authkey: bytes):
+    """把认证密钥写入仅本用户可读写的文件 (0600)"""
+    path = get_authkey_path()
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    if hasattr(os, "fchmod"):
+        os.fchmod(fd, 0o600)  # 文件已存在时 os.open 不会修改权限
+    with os.fdopen(fd, "wb") as f:
+        f.write(authkey)
+
+
+def read_authkey() -> Optional[bytes]:
+    """读取运行中服务的认证密钥，没有服务时返回None"""
+    try:
+        with open(get_authkey_path(), "rb") as f:
+            return f.read() or None
+    except OSError:
+        return None
+
+
+def remove_service_files(address=None):
+    """服务退出时删除密钥文件 (及指定的套接字文件，正常关闭时由 Listener 自行删除)"""
+    paths = [get_authkey_path()]
+    if address is not None and os.name != "nt":
+        paths.append(address)
+    for path in paths:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """附加到其他进程创建的共享内存，不让本进程的resource_tracker在退出时删除它"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+
+class HandTrackingServer:
+    """常驻手部追踪服务端"""
+
+    def __init__(self, address=None, authkey: Optional[bytes] = None,
+                 idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        self.address = address or get_default_address()
+        if authkey is None:
+            # 由 spawn_server 通过环境变量传入；手动启动时生成新的密钥
+            authkey_hex = os.environ.pop(AUTHKEY_ENV, None)
+            authkey = bytes.fromhex(authkey_hex) if authkey_hex else secrets.token_bytes(32)
+        self.authkey = authkey
+        self.idle_timeout = idle_timeout
+
+        self.graphs: Dict[Tuple, object] = {}  # 检测参数 -> 已预热的 Hands 实例
+        self.client_lock = threading.Lock()  # 持有者为当前正在服务的客户端
+        self.client_connected = False
+        self.last_activity = time.monotonic()
+        self.running = True
+
+    def get_graph(self, config: Tuple):
+        """获取(必要时创建并预热)指定参数的 Hands 图"""
+        if config not in self.graphs:
+            import mediapipe as mp
+            mode, max_hands, complexity, detection_con, track_con = config
+            start = time.perf_counter()
+            hands = mp.solutions.hands.Hands(mode, max_hands, complexity, detection_con, track_con)
+            blank = np.zeros((480, 640, 3), dtype=np.uint8)
+            for _ in range(3):
+                hands.process(blank)
+            self.graphs[config] = hands
+            print(f"✅ 手部模型已加载并预热 {config} ({time.perf_counter() - start:.2f}秒)")
+        return self.graphs[config]
+
+    def reset_graphs(self):
+        """处理一帧空白画面，丢弃上一个客户端留下的手部追踪状态"""
+        blank = np.zeros((480, 640, 3), dtype=np.uint8)
+        for hands in self.graphs.values():
+            hands.process(blank)
+
+    def _idle_watchdog(self):
+        """长时间没有客户端时退出进程"""
+        while self.running:
+            time.sleep(5.0)
+            if not self.client_connected and time.monotonic() - self.last_activity > self.idle_timeout:
+                print("⏹️  手部追踪服务空闲超时，退出")
+                remove_service_files(self.address)
+                os._exit(0)
+
+    def serve_forever(self, preload_config: Optional[Tuple] = (False, 2, 1, 0.5, 0.5)):
+        """监听并依次服务客户端"""
+        if os.name != "nt" and os.path.exists(self.address):
+            conn = connect(self.address)
+            if conn is not None:
+                conn.close()
+                print("手部追踪服务已在运行")
+                return
+            os.unlink(self.address)  # 上次异常退出遗留的套接字文件
+
+        if preload_config:
+            self.get_graph(preload_config)
+        if self.idle_timeout:
+            threading.Thread(target=self._idle_watchdog, daemon=True).start()
+
+        # 认证握手在每个连接自己的线程中完成 (见 _handle_connection)，
+        # 未完成握手的连接不会阻塞 accept
+        with Listener(self.address) as listener:
+            write_authkey(self.authkey)
+            print(f"🖐️  手部追踪服务已启动: {self.address}")
+            try:
+                self._accept_loop(listener)
+            finally:
+                remove_service_files()
+
+    def _accept_loop(self, listener):
+        while self.running:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                print(f"❌ 接受连接失败: {e}")
+                continue
+            if not self.running:
+                conn.close()
+                break
+            threading.Thread(target=self._handle_connection, args=(conn,), daemon=True).start()
+
+    def _handle_connection(self, conn):
+        """认证一个连接 (握手只阻塞本线程)；空闲时为其服务，已有客户端时回复 busy"""
+        try:
+            deliver_challenge(conn, self.authkey)
+            answer_challenge(conn, self.authkey)
+        except (AuthenticationError, EOFError, OSError):
+            conn.close()
+            return
+
+        try:
+            if not self.client_lock.acquire(blocking=False):
+                self.reject_busy(conn)
+                return
+            try:
+                self.client_connected = True
+                self.reset_graphs()
+                self.handle_client(conn)
+            finally:
+                self.client_connected = False
+                self.last_activity = time.monotonic()
+                self.client_lock.release()
+        finally:
+            conn.close()
+
+    def reject_busy(self, conn):
+        """已有客户端时: 只响应 shutdown，其余请求回复 busy"""
+        try:
+            if not conn.poll(HANDSHAKE_TIMEOUT):
+                return
+            message = conn.recv()
+            if message[0] == "shutdown":
+                conn.send(("ok",))
+                self.stop()
+            else:
+                conn.send(("busy",))
+        except (EOFError, OSError):
+            pass
+
+    def stop(self):
+        """停止服务: 清除运行标志并连接一次自身以唤醒阻塞中的 accept"""
+        self.running = False
+        try:
+            Client(self.address).close()
+        except OSError:
+            pass
+
+    def handle_client(self, conn):
+        """处理一个客户端的请求，直到断开"""
+        shm = None
+        frame = None
+        hands = None
+        try:
+            while True:
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    break
+                command = message[0]
+
+                if command == "attach":
+                    # ("attach", 共享内存名, (高, 宽, 3), 检测参数)
+                    _, shm_name, shape, config = message
+                    if shm is not None:
+                        shm.close()
+                    shm = attach_shared_memory(shm_name)
+                    frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+                    hands = self.get_graph(tuple(config))
+                    conn.send(("ok",))
+                elif command == "process":
+                    # 共享内存中已是RGB画面
+                    if hands is None:
+                        conn.send(("error", "not attached"))
+                        continue
+                    results = hands.process(frame)
+                    conn.send(("result",) + extract_landmarks(results))
+                elif command == "ping":
+                    conn.send(("pong", os.getpid()))
+                elif command == "shutdown":
+                    conn.send(("ok",))
+                    self.stop()
+                    break
+        finally:
+            frame = None
+            if shm is not None:
+                shm.close()
+
+
+def extract_landmarks(results) -> Tuple[List[np.ndarray], List[str]]:
+    """把MediaPipe结果转换为 (每只手21x3的float32数组列表, 左右手标签列表)"""
+    landmarks = []
+    handedness = []
+    if results.multi_hand_landmarks:
+        for index, hand in enumerate(results.multi_hand_landmarks):
+            landmarks.append(np.array([(lm.x, lm.y, lm.z) for lm in hand.landmark], dtype=np.float32))
+            label = ""
+            if results.multi_handedness and index < len(results.multi_handedness):
+                label = results.multi_handedness[index].classification[0].label
+            handedness.append(label)
+    return landmarks, handedness
+
+
+def spawn_server():
+    """以独立会话启动服务进程，界面程序退出后服务继续运行 (本次启动使用新的随机认证密钥)"""
+    args = [sys.executable, os.path.abspath(__file__), "--serve"]
+    env = dict(os.environ)
+    env[AUTHKEY_ENV] = secrets.token_bytes(32).hex()
+    kwargs = {"stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL, "env": env}
+    if os.name == "nt":
+        kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.DETACHED_PROCESS
+    else:
+        kwargs["start_new_session"] = True
+    subprocess.Popen(args, **kwargs)
+
+
+def connect(address=None, authkey: Optional[bytes] = None, timeout: float = HANDSHAKE_TIMEOUT):
+    """连接服务 (默认读取密钥文件)，失败或握手超时返回None"""
+    authkey = authkey or read_authkey()
+    if authkey is None:
+        return None
+    try:
+        conn = Client(address or get_default_address())
+    except OSError:
+        return None
+    # 服务端先发出质询，等待质询时有超时，避免服务端异常时永远阻塞
+    try:
+        if not conn.poll(timeout):
+            conn.close()
+            return None
+        answer_challenge(conn, authkey)
+        deliver_challenge(conn, authkey)
+        return conn
+    except (OSError, EOFError, AuthenticationError):
+        conn.close()
+        return None
+
+
+class LandmarkHandDetector:
+    """
+    基于关键点数组的检测器基类，接口与 handTrackingModule.handDetector 一致
+    (findHands / findPosition / fingersUp / findDistance)，子类负责在 findHands 中填充 landmarks
+    """
+
+    def __init__(self):
+        self.tipIds = [4, 8, 12, 16, 20]
+        self.landmarks: List[np.ndarray] = []  # 每只手21x3的归一化坐标
+        self.handedness: List[str] = []
+        self.last_timings: Dict[str, float] = {}  # 最近一次 findHands 各步骤耗时 (毫秒)
+        self.smoother = None  # handTrackingModule.LandmarkSmoother，由 create_hand_detector 设置
+
+    def _smooth_landmarks(self, timestamp=None):
+        """对本帧 landmarks 做 One Euro 平滑 (子类在 findHands 中填充 landmarks 后调用)"""
+        if self.smoother is None:
+            return
+        start = time.perf_counter()
+        self.landmarks = self.smoother.update(self.landmarks, timestamp if timestamp is not None else start,
+                                              self.handedness)
+        self.last_timings["smoothing"] = (time.perf_counter() - start) * 1000
+
+    def draw_landmarks(self, img):
+        """按MediaPipe的样式绘制关键点和连线"""
+        h, w = img.shape[:2]
+        for hand in self.landmarks:
+            points = [(int(x * w), int(y * h)) for x, y, _ in hand]
+            for start, end in HAND_CONNECTIONS:
+                cv.line(img, points[start], points[end], (224, 224, 224), 2)
+            for point in points:
+                cv.circle(img, point, 4, (0, 0, 255), cv.FILLED)
+
+    def findPosition(self, img, handNo=0, draw=True):
+        lmList = []
+        if handNo < len(self.landmarks):
+            h, w = img.shape[:2]
+            for id, (x, y, _) in enumerate(self.landmarks[handNo]):
+                cx, cy = int(x * w), int(y * h)
+                lmList.append([id, cx, cy])
+                if draw:
+                    cv.circle(img, (cx, cy), 5, (255, 0, 250), -1)
+        return lmList
+
+    def fingersUp(self, lmList):
+        """检测竖起的手指"""
+        fingers = []
+        if len(lmList) != 0:
+            fingers.append(1 if lmList[self.tipIds[0]][1] > lmList[self.tipIds[0] - 1][1] else 0)
+            for id in range(1, 5):
+                fingers.append(1 if lmList[self.tipIds[id]][2] < lmList[self.tipIds[id] - 2][2] else 0)
+        return fingers
+
+    def findDistance(self, p1, p2, img, lmList, draw=True):
+        """计算两个关节点之间的距离"""
+        if len(lmList) == 0:
+            return 0, img, []
+        x1, y1 = lmList[p1][1], lmList[p1][2]
+        x2, y2 = lmList[p2][1], lmList[p2][2]
+        cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
+        if draw:
+            cv.line(img, (x1, y1), (x2, y2), (255, 0, 255), 3)
+            cv.circle(img, (x1, y1), 15, (255, 0, 255), cv.FILLED)
+            cv.circle(img, (x2, y2), 15, (255, 0, 255), cv.FILLED)
+            cv.circle(img, (cx, cy), 15, (0, 0, 255), cv.FILLED)
+        return math.hypot(x2 - x1, y2 - y1), img, [x1, y1, x2, y2, cx, cy]
+
+
+class RemoteHandDetector(LandmarkHandDetector):
+    """使用常驻服务的手部检测器"""
+
+    def __init__(self, mode=False, maxHands=2, complexity=1, detectionCon=0.5, trackCon=0.5,
+                 address=None, authkey: Optional[bytes] = None,
+                 spawn: bool = True, startup_timeout: float = 30.0):
+        from ppt_controller import poll_until
+
+        super().__init__()
+        self.config = (mode, maxHands, complexity, detectionCon, trackCon)
+
+        self.conn = connect(address, authkey)
+        if self.conn is None and spawn:
+            print("🚀 正在启动手部追踪服务...")
+            spawn_server()
+            self.conn, elapsed = poll_until(lambda: connect(address, authkey), timeout=startup_timeout)
+            if self.conn is not None:
+                print(f"✅ 已连接手部追踪服务 ({elapsed:.2f}秒)")
+        if self.conn is None:
+            raise ConnectionError(f"无法连接手部追踪服务 {address or get_default_address()}")
+        self.conn.send(("ping",))
+        if self.conn.recv()[0] == "busy":
+            self.conn.close()
+            self.conn = None
+            raise ConnectionError("手部追踪服务正在为其他程序服务")
+
+        self.shm: Optional[shared_memory.SharedMemory] = None
+        self.frame: Optional[np.ndarray] = None
+
+    def _attach(self, shape: Tuple[int, int, int]):
+        """按画面尺寸(重新)创建共享内存并通知服务端"""
+        self._release_shm()
+        self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+        self.frame = np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf)
+        self.conn.send(("attach", self.shm.name, shape, self.config))
+        reply = self.conn.recv()
+        if reply[0] != "ok":
+            raise ConnectionError(f"手部追踪服务拒绝连接: {reply}")
+
+    def _release_shm(self):
+        if self.shm is not None:
+            self.frame = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def findHands(self, img, draw=True, timestamp=None):
+        if self.frame is None or self.frame.shape != img.shape:
+            self._attach(img.shape)
+        # 直接转换到共享内存中，不复制、不序列化画面
+        start = time.perf_counter()
+        cv.cvtColor(img, cv.COLOR_BGR2RGB, dst=self.frame)
+        converted = time.perf_counter()
+        self.conn.send(("process",))
+        reply = self.conn.recv()
+        self.last_timings = {"cvtColor": (converted - start) * 1000,
+                             "hands.process": (time.perf_counter() - converted) * 1000}
+        if reply[0] == "result":
+            self.landmarks, self.handedness = reply[1], reply[2]
+        else:
+            self.landmarks, self.handedness = [], []
+        self._smooth_landmarks(timestamp)
+
+        if draw:
+            self.draw_landmarks(img)
+        return img
+
+    def close(self):
+        """断开连接 (服务进程继续运行)"""
+        self._release_shm()
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+def create_hand_detector(backend: str = "local", **kwargs):
+    """
+    创建手部检测器，不可用时回退到进程内检测器
+
+    Args:
+        backend: "local" 进程内检测; "service" 常驻手部追踪服务;
+                 "process" 独立推理进程 + 共享内存环形缓冲 (与界面并行)
+        smoothing / min_cutoff / beta: 关键点 One Euro 平滑参数 (所有后端通用)
+    """
+    import handTrackingModule as hmt
+
+    smoothing = kwargs.pop("smoothing", False)
+    smoothing_params = (kwargs.pop("min_cutoff", 1.0), kwargs.pop("beta", 5.0))
+    detector = None
+    if backend == "service":
+        try:
+            detector = RemoteHandDetector(**kwargs)
+        except Exception as e:
+            print(f"⚠️  手部追踪服务不可用 ({e})，使用进程内检测器")
+    elif backend == "process":
+        try:
+            from hand_inference_process import ProcessHandDetector
+            detector = ProcessHandDetector(**kwargs)
+        except Exception as e:
+            print(f"⚠️  推理进程启动失败 ({e})，使用进程内检测器")
+    if detector is not None:
+        if smoothing:
+            detector.smoother = hmt.LandmarkSmoother(*smoothing_params)
+        return detector
+
+    detector = hmt.handDetector(smoothing=smoothing, min_cutoff=smoothing_params[0],
+                                beta=smoothing_params[1], **kwargs)
+    detector.warm_up()
+    return detector
+
+
+def main():
+    """命令行入口"""
+    if "--shutdown" in sys.argv:
+        conn = connect()
+        if conn is None:
+            print("手部追踪服务未运行")
+            return
+        conn.send(("shutdown",))
+        conn.recv()
+        conn.close()
+        print("手部追踪服务已停止")
+    elif "--serve" in sys.argv:
+        HandTrackingServer().serve_forever()
+    else:
+        print(__doc__)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+关键点录制与确定性回放
+Landmark Recording and Deterministic Replay
+
+功能特性:
+1. 录制每帧的手部关键点和时间戳，保存为紧凑的 npz 文件
+2. 回放时按录制的时间戳把关键点送入 UnifiedGestureDetector 和 match_and_execute_gestures
+3. 使用模拟PPT控制器记录触发的动作，不需要摄像头、窗口或真实PPT
+4. 不等待真实时间，回放速度远快于实时，可在无摄像头的Linux机器上做回归测试
+
+用法:
+    录制: python landmark_replay.py record recording.npz [--no-smoothing]
+          (或在主程序中使用 --record-landmarks recording.npz；平滑设置应与主程序一致)
+    回放: python landmark_replay.py replay recording.npz [--config gesture_config.json]
+                                         [--output result.json] [--expect expected.json]
+"""
+
+import json
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+NUM_LANDMARKS = 21
+
+
+class LandmarkRecorder:
+    """逐帧关键点录制器"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.timestamps: List[float] = []
+        self.landmarks: List[np.ndarray] = []
+        self.frame_size: Tuple[int, int] = (0, 0)  # (宽, 高)
+
+    def add(self, timestamp: float, lmList, frame_shape=None):
+        """记录一帧，lmList 为 findPosition 的结果 (未检测到手时为空列表)"""
+        points = np.full((NUM_LANDMARKS, 2), -1, dtype=np.int16)  # -1 表示该帧没有手
+        for landmark_id, x, y in lmList[:NUM_LANDMARKS]:
+            points[landmark_id] = (x, y)
+        self.timestamps.append(timestamp)
+        self.landmarks.append(points)
+        if frame_shape is not None:
+            self.frame_size = (frame_shape[1], frame_shape[0])
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def save(self) -> bool:
+        """保存为 npz (timestamps: float64[N], landmarks: int16[N,21,2], frame_size: int32[2])"""
+        try:
+            np.savez_compressed(
+                self.path,
+                timestamps=np.asarray(self.timestamps, dtype=np.float64),
+                landmarks=np.asarray(self.landmarks, dtype=np.int16).reshape(-1, NUM_LANDMARKS, 2),
+                frame_size=np.asarray(self.frame_size, dtype=np.int32),
+            )
+            print(f"✅ 已保存 {len(self)} 帧关键点: {self.path}")
+            return True
+        except OSError as e:
+            print(f"❌ 保存关键点录制失败: {e}")
+            return False
+
+
+def load_recording(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """读取录制文件，返回 (时间戳, 关键点)"""
+    with np.load(path) as data:
+        return data["timestamps"], data["landmarks"]
+
+
+def to_lm_list(points: np.ndarray) -> list:
+    """把一帧关键点数组还原为 findPosition 格式，没有手时返回空列表"""
+    if points[0, 0] < 0:
+        return []
+    return [[landmark_id, int(x), int(y)] for landmark_id, (x, y) in enumerate(points)]
+
+
+class MockPPTController:
+    """模拟PPT控制器: 只记录动作，不注入按键"""
+
+    def __init__(self):
+        self.is_presentation_active = True
+        self.current_ppt_path = None
+        self.laser_mode = False
+        self.current_slide = 1
+        self.slide_change_callbacks = []
+        self.clock = 0.0  # 回放驱动设置的当前帧时间戳
+        self.actions: List[Dict] = []
+
+    def _record(self, action: str, *args):
+        self.actions.append({"time": round(self.clock, 6), "action": action, "args": list(args),
+                             "slide": self.current_slide})
+
+    def execute_action(self, action):
+        action_str = action.value if hasattr(action, 'value') else str(action)
+        if action_str == "next_slide":
+            self.current_slide += 1
+        elif action_str == "prev_slide":
+            self.current_slide = max(1, self.current_slide - 1)
+        elif action_str == "laser_pointer":
+            self.laser_mode = not self.laser_mode
+        self._record(action_str)
+
+    def move_slides(self, offset: int):
+        self.current_slide = max(1, self.current_slide + offset)
+        self._record("move_slides", offset)
+
+    def jump_to_slide(self, slide_number: int):
+        self.current_slide = slide_number
+        self._record("jump_to_page", slide_number)
+
+    def get_current_slide(self) -> Optional[int]:
+        return self.current_slide
+
+    def get_slide_count(self) -> Optional[int]:
+        return None
+
+    def add_slide_change_callback(self, callback):
+        self.slide_change_callbacks.append(callback)
+
+
+def replay(path: str, config_file: str = "gesture_config.json") -> Dict:
+    """
+    回放一个关键点录制文件
+
+    Returns:
+        {"frames", "hand_frames", "elapsed_s", "speedup", "actions": [...]}
+    """
+    from unified_ppt_gesture_controller import UnifiedPPTGestureController
+
+    timestamps, landmarks = load_recording(path)
+    if len(timestamps) == 0:
+        return {"recording": path, "frames": 0, "hand_frames": 0, "duration_s": 0.0,
+                "elapsed_s": 0.0, "speedup": 0.0, "actions": []}
+    mock = MockPPTController()
+    controller = UnifiedPPTGestureController(config_file=config_file, ppt_controller=mock, headless=True)
+
+    start = time.perf_counter()
+    hand_frames = 0
+    for timestamp, points in zip(timestamps, landmarks):
+        lm_list = to_lm_list(points)
+        hand_frames += bool(lm_list)
+        mock.clock = float(timestamp) - float(timestamps[0])
+        controller.process_landmarks(lm_list, float(timestamp))
+    elapsed = time.perf_counter() - start
+    controller.action_executor.stop()
+
+    duration = float(timestamps[-1] - timestamps[0]) if len(timestamps) > 1 else 0.0
+    return {
+        "recording": path,
+        "frames": int(len(timestamps)),
+        "hand_frames": hand_frames,
+        "duration_s": duration,
+        "elapsed_s": elapsed,
+        "speedup": duration / elapsed if elapsed > 0 else 0.0,
+        "actions": mock.actions,
+    }
+
+
+def record_from_camera(path: str, camera_index: int = 0, smoothing: bool = True):
+    """用摄像头录制关键点 (按Q结束)，smoothing 与主程序的关键点平滑设置一致"""
+    import cv2 as cv
+    from hand_tracking_service import create_hand_detector
+
+    detector = create_hand_detector(backend="local", smoothing=smoothing)
+    recorder = LandmarkRecorder(path)
+    cap = cv.VideoCapture(camera_index)
+    while True:
+        success, img = cap.read()
+        if not success:
+            break
+        # 与主程序一致: 镜像后检测
+        img = cv.flip(img, 1)
+        timestamp = time.time()
+        img = detector.findHands(img, timestamp=timestamp)
+        recorder.add(timestamp, detector.findPosition(img, draw=False), img.shape)
+        cv.putText(img, f"REC {len(recorder)}", (10, 30), cv.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+        cv.imshow('Landmark Recorder', img)
+        if cv.waitKey(1) & 0xFF in (ord('q'), 27):
+            break
+    cap.release()
+    cv.destroyAllWindows()
+    recorder.save()
+
+
+def _option(name: str, default=None):
+    if name in sys.argv:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
+
+def main():
+    """命令行入口，回放结果与 --expect 不一致时返回非零退出码"""
+    if len(sys.argv) < 3 or sys.argv[1] not in ("record", "replay"):
+        print(__doc__)
+        return 2
+
+    command, path = sys.argv[1], sys.argv[2]
+    if command == "record":
+        record_from_camera(path, smoothing="--no-smoothing" not in sys.argv)
+        return 0
+
+    result = replay(path, _option("--config", "gesture_config.json"))
+    print(f"回放完成: {result['frames']}帧 (有手 {result['hand_frames']}帧), "
+          f"耗时 {result['elapsed_s'] * 1000:.1f}ms, {result['speedup']:.0f}倍实时速度, "
+          f"触发 {len(result['actions'])} 个动作")
+    for action in result["actions"]:
+        print(f"   {action['time']:8.3f}s  {action['action']} {action['args'] or ''}")
+
+    output_path = _option("--output")
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    expect_path = _option("--expect")
+    if expect_path:
+        with open(expect_path, 'r', encoding='utf-8') as f:
+            expected = json.load(f)
+        expected_actions = expected["actions"] if isinstance(expected, dict) else expected
+        if [(a["action"], a["args"]) for a in expected_actions] != \
+                [(a["action"], a["args"]) for a in result["actions"]]:
+            print("❌ 回放动作与预期不一致")
+            return 1
+        print("✅ 回放动作与预期一致")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+LibreOffice Impress 演示控制后端
+LibreOffice Impress Presentation Backend
+
+通过UNO本地套接字直接控制LibreOffice Impress:
+1. 启动/连接LibreOffice (可选无界面模式)
+2. 打开演示文稿并进入放映
+3. 跳转到指定页、上一页/下一页
+4. 查询当前页码和总页数
+5. 以轮询等待就绪代替固定时长的sleep
+6. 所有UNO调用都在同一个专用线程中执行 (动作执行线程与界面线程均可安全调用)
+
+依赖LibreOffice自带的 uno 模块 (需使用LibreOffice附带的Python或将其加入 PYTHONPATH)
+"""
+
+import functools
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from ppt_controller import poll_until
+
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+    UNO_AVAILABLE = True
+except ImportError:
+    uno = None
+    PropertyValue = None
+    UNO_AVAILABLE = False
+
+
+def _on_uno_thread(method):
+    """把方法调用转到后端的UNO线程执行并等待结果，已在UNO线程中时直接执行"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if threading.get_ident() == self._uno_thread_id:
+            return method(self, *args, **kwargs)
+        return self._uno_executor.submit(method, self, *args, **kwargs).result()
+    return wrapper
+
+
+class LibreOfficeBackend:
+    """LibreOffice Impress UNO控制后端"""
+
+    def __init__(self, host: str = "localhost", port: int = 2002, headless: bool = False,
+                 soffice_path: Optional[str] = None, startup_timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.headless = headless
+        self.soffice_path = soffice_path or self._find_soffice()
+        self.startup_timeout = startup_timeout
+
+        self.office_process = None
+        self.desktop = None
+        self.document = None
+
+        # UNO桥接不保证跨线程安全，公开方法统一在这个线程中执行
+        self._uno_thread_id = None
+        self._uno_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="uno",
+                                                initializer=self._mark_uno_thread)
+
+    def _mark_uno_thread(self):
+        self._uno_thread_id = threading.get_ident()
+
+    @staticmethod
+    def is_available() -> bool:
+        """当前Python环境是否可以使用UNO"""
+        return UNO_AVAILABLE
+
+    @staticmethod
+    def _find_soffice() -> Optional[str]:
+        """查找soffice可执行文件"""
+        candidates = [
+            "soffice",
+            "libreoffice",
+            "C:/Program Files/LibreOffice/program/soffice.exe",
+            "/Applications/LibreOffice.app/Contents/MacOS/soffice",
+        ]
+        for candidate in candidates:
+            path = shutil.which(candidate) or (candidate if os.path.exists(candidate) else None)
+            if path:
+                return path
+        return None
+
+    def _try_connect(self):
+        """尝试连接一次，成功返回Desktop对象"""
+        try:
+            local_context = uno.getComponentContext()
+            resolver = local_context.ServiceManager.createInstanceWithContext(
+                "com.sun.star.bridge.UnoUrlResolver", local_context)
+            context = resolver.resolve(
+                f"uno:socket,host={self.host},port={self.port};urp;StarOffice.ComponentContext")
+            return context.ServiceManager.createInstanceWithContext(
+                "com.sun.star.frame.Desktop", context)
+        except Exception:
+            return None
+
+    @_on_uno_thread
+    def connect(self) -> bool:
+        """连接LibreOffice，未运行时自动启动并轮询等待就绪"""
+        if not UNO_AVAILABLE:
+            print("❌ 未找到uno模块，无法使用LibreOffice后端")
+            return False
+
+        self.desktop = self._try_connect()
+        if self.desktop:
+            return True
+
+        if not self.soffice_path:
+            print("❌ 未找到LibreOffice (soffice)")
+            return False
+
+        args = [
+            self.soffice_path,
+            f"--accept=socket,host={self.host},port={self.port};urp;",
+            "--norestore",
+            "--nologo",
+        ]
+        if self.headless:
+            args.append("--headless")
+        self.office_process = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        self.desktop, elapsed = poll_until(self._try_connect, timeout=self.startup_timeout)
+        if self.desktop:
+            print(f"✅ LibreOffice已就绪 ({elapsed:.2f}秒)")
+            return True
+        print(f"❌ LibreOffice在{self.startup_timeout}秒内未就绪")
+        return False
+
+    @_on_uno_thread
+    def open_deck(self, file_path: str) -> bool:
+        """打开演示文稿"""
+        if not self.desktop and not self.connect():
+            return False
+        try:
+            url = uno.systemPathToFileUrl(os.path.abspath(file_path))
+            hidden = PropertyValue()
+            hidden.Name = "Hidden"
+            hidden.Value = self.headless
+            self.document = self.desktop.loadComponentFromURL(url, "_blank", 0, (hidden,))
+            return self.document is not None
+        except Exception as e:
+            print(f"❌ LibreOffice打开文件失败: {e}")
+            self.document = None
+            return False
+
+    def _get_show_controller(self):
+        """获取放映控制器，未在放映时返回None"""
+        if not self.document:
+            return None
+        try:
+            return self.document.Presentation.getController()
+        except Exception:
+            return None
+
+    @_on_uno_thread
+    def start_show(self, timeout: float = 10.0) -> bool:
+        """开始放映并等待放映控制器可用"""
+        if not self.document:
+            return False
+        try:
+            self.document.Presentation.start()
+        except Exception as e:
+            print(f"❌ LibreOffice开始放映失败: {e}")
+            return False
+
+        controller, elapsed = poll_until(self._get_show_controller, timeout=timeout)
+        if controller:
+            print(f"✅ 放映已开始 ({elapsed:.2f}秒)")
+            return True
+        return False
+
+    @_on_uno_thread
+    def end_show(self):
+        """结束放映"""
+        if self.document:
+            try:
+                self.document.Presentation.end()
+            except Exception as e:
+                print(f"❌ LibreOffice结束放映失败: {e}")
+
+    @_on_uno_thread
+    def goto_slide(self, slide_number: int) -> bool:
+        """跳转到第 slide_number 页 (从1开始)"""
+        controller = self._get_show_controller()
+        if not controller:
+            return False
+        count = controller.getSlideCount()
+        controller.gotoSlideIndex(max(0, min(count - 1, slide_number - 1)))
+        return True
+
+    @_on_uno_thread
+    def next_slide(self) -> bool:
+        """下一页"""
+        controller = self._get_show_controller()
+        if not controller:
+            return False
+        controller.gotoNextSlide()
+        return True
+
+    @_on_uno_thread
+    def previous_slide(self) -> bool:
+        """上一页"""
+        controller = self._get_show_controller()
+        if not controller:
+            return False
+        controller.gotoPreviousSlide()
+        return True
+
+    @_on_uno_thread
+    def get_current_slide(self) -> Optional[int]:
+        """获取当前放映页码 (从1开始)"""
+        controller = self._get_show_controller()
+        if not controller:
+            return None
+        return controller.getCurrentSlideIndex() + 1
+
+    @_on_uno_thread
+    def get_slide_count(self) -> Optional[int]:
+        """获取总页数"""
+        controller = self._get_show_controller()
+        if controller:
+            return controller.getSlideCount()
+        if self.document:
+            try:
+                return self.document.getDrawPages().getCount()
+            except Exception:
+                return None
+        return None
+
+    def close(self):
+        """关闭文档，若LibreOffice由本后端启动则一并退出，最后停止UNO线程"""
+        self._close()
+        self._uno_executor.shutdown(wait=True)
+
+    @_on_uno_thread
+    def _close(self):
+        if self.document:
+            try:
+                self.end_show()
+                self.document.close(True)
+            except Exception:
+                pass
+            self.document = None
+        if self.office_process:
+            try:
+                if self.desktop:
+                    self.desktop.terminate()
+            except Exception:
+                pass
+            try:
+                self.office_process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.office_process.kill()
+            self.office_process = None
+        self.desktop = None
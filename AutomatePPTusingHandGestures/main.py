@@ -1,6 +1,7 @@
 import os
+import sys
 import cv2 as cv
-import handTrackingModule as hmt
+from hand_tracking_service import create_hand_detector
 import pyautogui as pt
 import time
 
@@ -18,7 +19,7 @@ pt.press('f5')
 pTime = 0
 cTime = 0
 cap = cv.VideoCapture(0)
-detector = hmt.handDetector()
+detector = create_hand_detector(backend="service" if "--hand-service" in sys.argv else "local")
 count = 0
 curr = 0
 pre = 0
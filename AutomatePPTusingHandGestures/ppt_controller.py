@@ -7,26 +7,116 @@ PowerPoint Control Module
 """
 
 import os
-import pyautogui as pt
+import re
+import shutil
 import subprocess
+import threading
+import queue
 import time
 import platform
-from typing import Optional, List
+from collections import deque
+from typing import Optional, List, Dict, Callable, Tuple, Any
 from pathlib import Path
+from ppt_discovery import PPTDiscoveryService
+from gesture_tracer import get_tracer
+
+
+# 演示软件窗口标题中的应用名
+PRESENTATION_APPS = ("PowerPoint", "LibreOffice", "Impress", "WPS", "Keynote")
+WINDOW_QUERY_TIMEOUT = 2.0  # 单次窗口查询命令的超时 (秒)
+
+
+def window_title_matches(title: str, file_name: str) -> bool:
+    """
+    窗口标题是否为该演示文稿的演示软件窗口:
+    标题需包含应用名，且以 " - " 分隔出的完整一段为文件名，或文件名去掉扩展名
+    (Windows默认隐藏扩展名时标题为 "文稿 - PowerPoint")
+    """
+    if not any(app.lower() in title.lower() for app in PRESENTATION_APPS):
+        return False
+    separator = r"\s[-\u2013\u2014]\s"
+    for name in (file_name, Path(file_name).stem):
+        pattern = rf"(^|{separator}){re.escape(name)}($|{separator})"
+        if re.search(pattern, title):
+            return True
+    return False
+
+
+class _LazyPyAutoGUI:
+    """首次使用时才导入pyautogui，避免拖慢程序启动"""
+
+    def __init__(self):
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    import pyautogui
+                    # 禁用pyautogui的安全检查以提高性能
+                    pyautogui.FAILSAFE = False
+                    pyautogui.PAUSE = 0.1
+                    self._module = pyautogui
+        return self._module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+
+pt = _LazyPyAutoGUI()
+
+
+def preload_pyautogui():
+    """提前导入pyautogui (可在后台线程调用)"""
+    pt._load()
+
+
+def poll_until(predicate: Callable[[], Any], timeout: float = 10.0,
+               initial_delay: float = 0.05, max_delay: float = 1.0) -> Tuple[Any, float]:
+    """
+    以指数退避轮询，直到 predicate 返回真值或超时
+    
+    Returns:
+        (predicate最后的返回值, 耗时秒数)
+    """
+    start = time.monotonic()
+    delay = initial_delay
+    while True:
+        result = predicate()
+        elapsed = time.monotonic() - start
+        if result or elapsed >= timeout:
+            return result, elapsed
+        time.sleep(min(delay, max(0.0, timeout - elapsed)))
+        delay = min(delay * 2, max_delay)
 
 
 class PPTController:
     """PowerPoint控制器类"""
     
-    def __init__(self):
+    def __init__(self, backend: str = "keyboard", search_roots: Optional[List[str]] = None):
+        """
+        Args:
+            backend: 控制方式，"keyboard" 为模拟按键，"libreoffice" 为通过UNO直接控制LibreOffice Impress
+            search_roots: 自动查找PPT文件的根目录列表，默认为当前目录
+        """
         self.is_presentation_active = False
         self.current_ppt_path = None
         self.ppt_process = None
         self.laser_mode = False  # 激光指示器模式状态
+        self.slide_change_callbacks: List[Callable[[int], None]] = []  # 页码变化回调
+        self.discovery = PPTDiscoveryService(search_roots)  # PPT文件发现与索引
+        self.startup_timeout = 20.0  # 等待演示窗口出现的最长时间(秒)
+        self.last_startup_time = None  # 上次打开文件到窗口就绪的实测耗时(秒)
         
-        # 禁用pyautogui的安全检查以提高性能
-        pt.FAILSAFE = False
-        pt.PAUSE = 0.1
+        # LibreOffice后端 (可选)
+        self.office_backend = None
+        if backend == "libreoffice":
+            from libreoffice_backend import LibreOfficeBackend
+            if LibreOfficeBackend.is_available():
+                self.office_backend = LibreOfficeBackend()
+            else:
+                print("⚠️  uno模块不可用，回退到按键控制")
         
     def open_powerpoint_file(self, file_path: str) -> bool:
         """
@@ -42,29 +132,47 @@ class PPTController:
             if not os.path.exists(file_path):
                 print(f"文件不存在: {file_path}")
                 return False
+            
+            # 记录打开时间，下次自动选择时优先
+            self.discovery.record_opened(file_path)
+            
+            if self.office_backend:
+                # LibreOffice后端: 轮询就绪，无需固定等待
+                if self.office_backend.open_deck(file_path) and self.office_backend.start_show():
+                    self.current_ppt_path = file_path
+                    self.is_presentation_active = True
+                    print(f"成功打开PPT: {file_path} (共{self.office_backend.get_slide_count()}页)")
+                    self._notify_slide_changed()
+                    return True
+                print("LibreOffice后端打开失败，回退到按键控制")
+                self.office_backend = None
                 
             # 根据操作系统选择打开方式
             system = platform.system()
+            file_name = Path(file_path).name
             
-            if system == "Windows":
-                # Windows系统
-                self.ppt_process = os.startfile(file_path)
-                time.sleep(3)  # 等待PowerPoint启动
-                
-                # 尝试进入演示模式
-                time.sleep(2)
-                pt.press('f5')  # F5键进入幻灯片放映模式
-                
-            elif system == "Darwin":  # macOS
-                subprocess.run(['open', file_path])
-                time.sleep(3)
+            try:
+                if system == "Windows":
+                    # Windows系统
+                    self.ppt_process = os.startfile(file_path)
+                elif system == "Darwin":  # macOS
+                    subprocess.run(['open', file_path], timeout=10)
+                elif system == "Linux":
+                    subprocess.run(['xdg-open', file_path], timeout=10)
+            except subprocess.TimeoutExpired:
+                print("打开命令未及时返回，继续等待演示窗口")
+            
+            # 轮询等待演示窗口出现，而不是固定等待
+            window, ready = self.wait_for_presentation_window(file_name)
+            if ready:
+                self._activate_window(window)
+            
+            # 进入幻灯片放映模式
+            if system == "Darwin":
                 # macOS的Keynote或PowerPoint快捷键
                 pt.hotkey('cmd', 'shift', 'return')
-                
-            elif system == "Linux":
-                subprocess.run(['xdg-open', file_path])
-                time.sleep(3)
-                pt.press('f5')
+            else:
+                pt.press('f5')  # F5键进入幻灯片放映模式
                 
             self.current_ppt_path = file_path
             self.is_presentation_active = True
@@ -75,11 +183,140 @@ class PPTController:
             print(f"打开PPT失败: {e}")
             return False
     
+    def wait_for_presentation_window(self, file_name: str) -> Tuple[Any, bool]:
+        """
+        以指数退避轮询等待打开 file_name 的演示软件窗口出现
+        
+        Returns:
+            (窗口句柄, 是否就绪)；无法检测窗口时按原方式固定等待3秒
+        """
+        if not self._can_detect_windows():
+            print("未找到窗口检测工具 (Linux需要xdotool或wmctrl)，固定等待3秒")
+            time.sleep(3)
+            self.last_startup_time = None
+            return None, False
+        
+        window, elapsed = poll_until(lambda: self._find_window(file_name), timeout=self.startup_timeout)
+        if window:
+            self.last_startup_time = elapsed
+            print(f"演示窗口已就绪，耗时 {elapsed:.2f}秒")
+            return window, True
+        
+        self.last_startup_time = None
+        print(f"⚠️  {self.startup_timeout:.0f}秒内未检测到演示窗口，放映快捷键可能未生效")
+        return None, False
+    
+    def _can_detect_windows(self) -> bool:
+        """当前系统是否可以检测窗口"""
+        system = platform.system()
+        if system == "Windows":
+            return hasattr(pt, 'getWindowsWithTitle')
+        if system == "Linux":
+            return shutil.which('xdotool') is not None or shutil.which('wmctrl') is not None
+        if system == "Darwin":
+            return shutil.which('osascript') is not None
+        return False
+    
+    def _find_window(self, file_name: str):
+        """
+        查找打开 file_name 的演示软件窗口 (见 window_title_matches)，找到返回窗口句柄，否则返回None
+        (macOS上返回 (进程名, 窗口名))
+        """
+        system = platform.system()
+        stem = Path(file_name).stem
+        try:
+            if system == "Windows":
+                for window in pt.getWindowsWithTitle(stem):
+                    if window_title_matches(window.title, file_name):
+                        return window
+                return None
+            
+            if system == "Linux":
+                if shutil.which('xdotool'):
+                    # --name 按正则匹配，文件名需转义；候选窗口再按完整标题校验
+                    result = subprocess.run(['xdotool', 'search', '--onlyvisible', '--name', re.escape(stem)],
+                                            capture_output=True, text=True, timeout=WINDOW_QUERY_TIMEOUT)
+                    for window_id in result.stdout.split():
+                        name = subprocess.run(['xdotool', 'getwindowname', window_id],
+                                              capture_output=True, text=True, timeout=WINDOW_QUERY_TIMEOUT)
+                        if window_title_matches(name.stdout.strip(), file_name):
+                            return window_id
+                    return None
+                result = subprocess.run(['wmctrl', '-l'], capture_output=True, text=True,
+                                        timeout=WINDOW_QUERY_TIMEOUT)
+                for line in result.stdout.splitlines():
+                    # 窗口ID 桌面 主机名 标题
+                    fields = line.split(None, 3)
+                    if len(fields) == 4 and window_title_matches(fields[3], file_name):
+                        return fields[0]
+                return None
+            
+            if system == "Darwin":
+                # 逐行输出 "进程名<Tab>窗口名"
+                script = (
+                    'set output to ""\n'
+                    'tell application "System Events"\n'
+                    '  repeat with p in (processes whose visible is true)\n'
+                    '    repeat with w in windows of p\n'
+                    '      set output to output & name of p & tab & name of w & linefeed\n'
+                    '    end repeat\n'
+                    '  end repeat\n'
+                    'end tell\n'
+                    'return output'
+                )
+                result = subprocess.run(['osascript', '-e', script], capture_output=True, text=True,
+                                        timeout=WINDOW_QUERY_TIMEOUT)
+                for line in result.stdout.splitlines():
+                    process_name, _, window_name = line.partition("\t")
+                    if window_title_matches(f"{window_name} - {process_name}", file_name):
+                        return process_name, window_name
+                return None
+        except subprocess.TimeoutExpired:
+            print("窗口检测命令超时，稍后重试")
+        except Exception as e:
+            print(f"窗口检测失败: {e}")
+        return None
+    
+    def _activate_window(self, window):
+        """把演示窗口切到前台，保证放映快捷键发送到正确的窗口"""
+        system = platform.system()
+        try:
+            if system == "Windows":
+                window.activate()
+            elif system == "Linux":
+                if shutil.which('xdotool'):
+                    subprocess.run(['xdotool', 'windowactivate', '--sync', window], timeout=5)
+                else:
+                    subprocess.run(['wmctrl', '-i', '-a', window], timeout=5)
+            elif system == "Darwin":
+                # window 为 (进程名, 窗口名)，通过参数传入脚本，无需转义
+                script = (
+                    'on run argv\n'
+                    '  tell application "System Events"\n'
+                    '    tell process (item 1 of argv)\n'
+                    '      set frontmost to true\n'
+                    '      perform action "AXRaise" of window (item 2 of argv)\n'
+                    '    end tell\n'
+                    '  end tell\n'
+                    'end run'
+                )
+                process_name, window_name = window
+                result = subprocess.run(['osascript', '-e', script, process_name, window_name],
+                                        capture_output=True, text=True, timeout=5)
+                if result.returncode != 0:
+                    print(f"激活演示窗口失败: {result.stderr.strip()}")
+        except Exception as e:
+            print(f"激活演示窗口失败: {e}")
+    
     def next_slide(self):
         """下一张幻灯片"""
         if self.is_presentation_active:
             try:
-                pt.press('right')  # 或者使用 'space', 'pagedown'
+                if self.office_backend:
+                    self.office_backend.next_slide()
+                    self._notify_slide_changed()
+                else:
+                    pt.press('right')  # 或者使用 'space', 'pagedown'
                 print("执行：下一张幻灯片")
             except Exception as e:
                 print(f"下一张幻灯片失败: {e}")
@@ -88,11 +325,34 @@ class PPTController:
         """上一张幻灯片"""
         if self.is_presentation_active:
             try:
-                pt.press('left')  # 或者使用 'backspace', 'pageup'
+                if self.office_backend:
+                    self.office_backend.previous_slide()
+                    self._notify_slide_changed()
+                else:
+                    pt.press('left')  # 或者使用 'backspace', 'pageup'
                 print("执行：上一张幻灯片")
             except Exception as e:
                 print(f"上一张幻灯片失败: {e}")
     
+    def move_slides(self, offset: int):
+        """前进/后退多张幻灯片 (合并后的翻页操作，一次按键调用完成)"""
+        if offset == 1:
+            self.next_slide()
+        elif offset == -1:
+            self.previous_slide()
+        elif offset != 0 and self.is_presentation_active:
+            try:
+                current = self.get_current_slide()
+                if current is not None:
+                    # 已知当前页码时，多次翻页合并为一次跳转
+                    self.jump_to_slide(current + offset)
+                    return
+                key = 'right' if offset > 0 else 'left'
+                pt.press(key, presses=abs(offset), interval=0.0)
+                print(f"执行：{'前进' if offset > 0 else '后退'}{abs(offset)}张幻灯片")
+            except Exception as e:
+                print(f"多页翻页失败: {e}")
+    
     def play_pause(self):
         """播放/暂停"""
         if self.is_presentation_active:
@@ -106,7 +366,10 @@ class PPTController:
         """退出演示"""
         if self.is_presentation_active:
             try:
-                pt.press('esc')
+                if self.office_backend:
+                    self.office_backend.end_show()
+                else:
+                    pt.press('esc')
                 self.is_presentation_active = False
                 print("执行：退出演示")
             except Exception as e:
@@ -125,9 +388,13 @@ class PPTController:
         """跳转到指定幻灯片"""
         if self.is_presentation_active:
             try:
-                # 输入幻灯片编号
-                pt.typewrite(str(slide_number))
-                pt.press('enter')
+                if self.office_backend:
+                    self.office_backend.goto_slide(slide_number)
+                    self._notify_slide_changed()
+                else:
+                    # 输入幻灯片编号
+                    pt.typewrite(str(slide_number))
+                    pt.press('enter')
                 print(f"执行：跳转到第{slide_number}张幻灯片")
             except Exception as e:
                 print(f"跳转幻灯片失败: {e}")
@@ -198,32 +465,25 @@ class PPTController:
     
     def get_ppt_files(self, directory: str = None) -> List[str]:
         """
-        获取目录中的PPT文件列表
+        获取PPT文件列表 (递归查找，按最近打开时间排序)
         
         Args:
-            directory: 搜索目录，默认为当前目录
+            directory: 搜索目录，默认为配置的根目录
             
         Returns:
             PPT文件路径列表
         """
-        if directory is None:
-            directory = os.getcwd()
-            
-        ppt_extensions = ['.ppt', '.pptx', '.pps', '.ppsx']
-        ppt_files = []
-        
         try:
-            for file in os.listdir(directory):
-                if any(file.lower().endswith(ext) for ext in ppt_extensions):
-                    ppt_files.append(os.path.join(directory, file))
+            roots = [directory] if directory is not None else None
+            ppt_files = self.discovery.refresh(roots)
+            return self.discovery.get_ranked_files(ppt_files)
         except Exception as e:
             print(f"搜索PPT文件失败: {e}")
-            
-        return ppt_files
+            return []
     
     def auto_select_ppt(self) -> Optional[str]:
         """
-        自动选择PPT文件（选择第一个找到的PPT文件）
+        自动选择PPT文件（最近打开过的优先，其次是最近修改的）
         
         Returns:
             选中的PPT文件路径，如果没有找到则返回None
@@ -232,7 +492,10 @@ class PPTController:
         
         if ppt_files:
             selected_file = ppt_files[0]
-            print(f"自动选择PPT文件: {selected_file}")
+            info = self.discovery.get_file_info(selected_file) or {}
+            slide_count = info.get("slide_count")
+            slide_info = f" ({slide_count}页)" if slide_count else ""
+            print(f"自动选择PPT文件: {selected_file}{slide_info}")
             return selected_file
         else:
             print("当前目录下没有找到PPT文件")
@@ -277,6 +540,33 @@ class PPTController:
         except Exception as e:
             print(f" 执行PPT操作失败 ({action_str}): {e}")
 
+    def get_current_slide(self) -> Optional[int]:
+        """获取真实的当前页码，按键控制方式无法获知时返回None"""
+        if self.office_backend:
+            return self.office_backend.get_current_slide()
+        return None
+    
+    def get_slide_count(self) -> Optional[int]:
+        """获取总页数，按键控制方式无法获知时返回None"""
+        if self.office_backend:
+            return self.office_backend.get_slide_count()
+        return None
+    
+    def add_slide_change_callback(self, callback: Callable[[int], None]):
+        """注册页码变化回调 (仅在能获知真实页码时触发)"""
+        self.slide_change_callbacks.append(callback)
+    
+    def _notify_slide_changed(self):
+        """查询真实页码并通知回调"""
+        current = self.get_current_slide()
+        if current is None:
+            return
+        for callback in self.slide_change_callbacks:
+            try:
+                callback(current)
+            except Exception as e:
+                print(f"页码变化回调失败: {e}")
+    
     def is_active(self) -> bool:
         """检查演示是否处于活动状态"""
         return self.is_presentation_active
@@ -286,10 +576,154 @@ class PPTController:
         return {
             "is_active": self.is_presentation_active,
             "current_file": self.current_ppt_path,
-            "process": self.ppt_process is not None
+            "process": self.ppt_process is not None,
+            "backend": "libreoffice" if self.office_backend else "keyboard",
+            "startup_time": self.last_startup_time,
+            "current_slide": self.get_current_slide(),
+            "slide_count": self.get_slide_count()
         }
 
 
+class PPTActionExecutor:
+    """PPT动作执行器
+
+    在独立线程中执行按键注入，手势识别循环只负责入队，不会被 pt.PAUSE 阻塞。
+    执行前会合并队列中积压的命令：连续的翻页合并为一次净位移，
+    连续的跳页只保留最后一次。同时记录每种动作从入队到执行完成的延迟。
+    """
+
+    SLIDE_OFFSETS = {"next_slide": 1, "prev_slide": -1}
+
+    def __init__(self, controller: PPTController, history_size: int = 200, synchronous: bool = False):
+        self.controller = controller
+        self.synchronous = synchronous  # 同步模式: 在调用线程立即执行，不合并 (用于回放测试)
+        self.command_queue = queue.Queue()
+        self.latencies: Dict[str, deque] = {}
+        self.history_size = history_size
+        self.coalesced_count = 0  # 被合并掉的命令数
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """启动执行线程"""
+        if self.running or self.synchronous:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        """停止执行线程 (已入队的命令会先执行完)"""
+        if not self.running:
+            return
+        self.running = False
+        self.command_queue.put(None)
+        if self.thread:
+            self.thread.join(timeout=timeout)
+            self.thread = None
+
+    def submit(self, action, *args, trace_id: Optional[int] = None):
+        """提交一个PPT动作 (立即返回)，trace_id 用于关联手势延迟追踪"""
+        action_str = action.value if hasattr(action, 'value') else str(action)
+        if self.synchronous:
+            self._execute(action_str, args, [time.perf_counter()], [trace_id])
+            return
+        if not self.running:
+            self.start()
+        self.command_queue.put((action_str, args, time.perf_counter(), trace_id))
+
+    def _run(self):
+        """执行线程"""
+        while True:
+            command = self.command_queue.get()
+            if command is None:
+                break
+
+            # 取出所有已积压的命令一起合并执行
+            batch = [command]
+            stop_requested = False
+            while True:
+                try:
+                    pending = self.command_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if pending is None:
+                    stop_requested = True
+                    break
+                batch.append(pending)
+
+            for action_str, args, enqueue_times, trace_ids in self._coalesce(batch):
+                self._execute(action_str, args, enqueue_times, trace_ids)
+
+            if stop_requested:
+                break
+
+    def _coalesce(self, batch: List[tuple]) -> List[tuple]:
+        """合并命令: 相邻翻页求净位移，相邻跳页保留最后一个"""
+        merged = []
+        for action_str, args, enqueue_time, trace_id in batch:
+            last = merged[-1] if merged else None
+            if last and action_str in self.SLIDE_OFFSETS and last[0] == "move_slides":
+                last[1] = (last[1][0] + self.SLIDE_OFFSETS[action_str],)
+                last[2].append(enqueue_time)
+                last[3].append(trace_id)
+                self.coalesced_count += 1
+            elif last and action_str in self.SLIDE_OFFSETS and last[0] in self.SLIDE_OFFSETS:
+                offset = self.SLIDE_OFFSETS[last[0]] + self.SLIDE_OFFSETS[action_str]
+                merged[-1] = ["move_slides", (offset,), last[2] + [enqueue_time], last[3] + [trace_id]]
+                self.coalesced_count += 1
+            elif last and action_str == "jump_to_page" and last[0] == "jump_to_page":
+                merged[-1] = [action_str, args, last[2] + [enqueue_time], last[3] + [trace_id]]
+                self.coalesced_count += 1
+            else:
+                merged.append([action_str, args, [enqueue_time], [trace_id]])
+        return [tuple(item) for item in merged]
+
+    def _execute(self, action_str: str, args: tuple, enqueue_times: List[float],
+                 trace_ids: Optional[List[Optional[int]]] = None):
+        """执行一个(可能已合并的)命令并记录延迟"""
+        tracer = get_tracer()
+        for trace_id in trace_ids or []:
+            tracer.step(trace_id, "injection_start", args={"action": action_str})
+        try:
+            if action_str == "move_slides":
+                self.controller.move_slides(*args)
+            elif action_str == "jump_to_page" and args:
+                self.controller.jump_to_slide(*args)
+            else:
+                self.controller.execute_action(action_str)
+        except Exception as e:
+            print(f" 执行PPT操作失败 ({action_str}): {e}")
+
+        finished = time.perf_counter()
+        history = self.latencies.setdefault(action_str, deque(maxlen=self.history_size))
+        for enqueue_time in enqueue_times:
+            history.append((finished - enqueue_time) * 1000)
+        # 按键注入完成，结束对应的手势实例
+        for trace_id in trace_ids or []:
+            tracer.end(trace_id, "gesture", finished,
+                       args={"action": action_str, "coalesced": len(enqueue_times) > 1})
+
+    def pending_count(self) -> int:
+        """队列中等待执行的命令数"""
+        return self.command_queue.qsize()
+
+    def get_latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """获取各动作从入队到执行完成的延迟统计 (毫秒)"""
+        stats = {}
+        for action_str, history in list(self.latencies.items()):
+            samples = sorted(history)
+            if not samples:
+                continue
+            stats[action_str] = {
+                "count": len(samples),
+                "avg_ms": sum(samples) / len(samples),
+                "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+                "max_ms": samples[-1]
+            }
+        return stats
+
+
 # 全局PPT控制器实例
 _ppt_controller = None
 
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+PPT文件发现服务
+PPT Discovery Service
+
+功能特性:
+1. 在配置的根目录下用 os.scandir 递归查找演示文稿
+2. 持久化索引 (路径、修改时间、大小、页数、最近打开时间)
+3. 按目录修改时间增量刷新，未变化的目录不再重新列举
+4. 按最近打开时间排序，自动选择的结果是确定的
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import zipfile
+from typing import Dict, List, Optional
+
+
+PPT_EXTENSIONS = ('.ppt', '.pptx', '.pps', '.ppsx', '.odp')
+SKIPPED_DIRS = {'__pycache__', 'node_modules', '.git', 'venv', '.venv'}
+SLIDE_ENTRY_PATTERN = re.compile(r'^ppt/slides/slide\d+\.xml$')
+
+
+def get_default_index_path() -> str:
+    """默认索引文件路径"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ppt_gesture_controller", "ppt_index.json")
+
+
+def count_slides(file_path: str) -> Optional[int]:
+    """读取演示文稿页数 (支持pptx/ppsx/odp，旧版二进制ppt返回None)"""
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            names = archive.namelist()
+            if file_path.lower().endswith('.odp'):
+                content = archive.read('content.xml')
+                return content.count(b'<draw:page ')
+            return sum(1 for name in names if SLIDE_ENTRY_PATTERN.match(name))
+    except (zipfile.BadZipFile, OSError, KeyError):
+        return None
+
+
+class PPTDiscoveryService:
+    """PPT文件发现与索引服务"""
+
+    def __init__(self, roots: Optional[List[str]] = None, index_path: Optional[str] = None,
+                 max_depth: int = 6):
+        self.roots = [os.path.abspath(root) for root in (roots or [os.getcwd()])]
+        self.index_path = index_path or get_default_index_path()
+        self.max_depth = max_depth
+
+        self.lock = threading.Lock()
+        self.files: Dict[str, Dict] = {}        # 文件路径 -> {mtime, size, slide_count, last_opened}
+        self.directories: Dict[str, Dict] = {}  # 目录路径 -> {mtime, files, dirs}
+        self.load_index()
+
+    def load_index(self):
+        """加载持久化索引"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.files = data.get("files", {})
+            self.directories = data.get("directories", {})
+        except (OSError, ValueError):
+            self.files = {}
+            self.directories = {}
+
+    def save_index(self):
+        """保存索引 (先写临时文件再替换，避免写到一半的索引)"""
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            temp_path = self.index_path + ".tmp"
+            with self.lock:
+                data = {"files": self.files, "directories": self.directories}
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            print(f"保存PPT索引失败: {e}")
+
+    def refresh(self, roots: Optional[List[str]] = None) -> List[str]:
+        """
+        增量刷新索引
+
+        Returns:
+            根目录下当前存在的演示文稿路径列表
+        """
+        start = time.perf_counter()
+        found: List[str] = []
+        rescanned = 0
+        for root in roots or self.roots:
+            rescanned += self._scan_directory(os.path.abspath(root), 0, found)
+
+        # 移除已不存在的文件 (仅限本次扫描的根目录)
+        scanned_roots = [os.path.abspath(root) for root in (roots or self.roots)]
+        found_set = set(found)
+        with self.lock:
+            for path in list(self.files):
+                if any(path.startswith(root + os.sep) for root in scanned_roots) and path not in found_set:
+                    del self.files[path]
+
+        self.save_index()
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"PPT索引已刷新: {len(found)}个文件, 重新列举{rescanned}个目录, 耗时{elapsed:.0f}ms")
+        return found
+
+    def _scan_directory(self, directory: str, depth: int, found: List[str]) -> int:
+        """扫描单个目录并递归子目录，返回重新列举的目录数"""
+        try:
+            dir_mtime = os.stat(directory).st_mtime
+        except OSError:
+            return 0
+
+        rescanned = 0
+        cached = self.directories.get(directory)
+        if cached and cached.get("mtime") == dir_mtime:
+            # 目录内容未增删，直接使用缓存的列表
+            file_names, dir_names = cached["files"], cached["dirs"]
+        else:
+            file_names, dir_names = [], []
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        name = entry.name
+                        if name.startswith('.') or name.startswith('~$'):
+                            continue  # 隐藏文件和Office临时锁文件
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if name not in SKIPPED_DIRS:
+                                    dir_names.append(name)
+                            elif name.lower().endswith(PPT_EXTENSIONS):
+                                file_names.append(name)
+                        except OSError:
+                            continue
+            except OSError:
+                return 0
+            with self.lock:
+                self.directories[directory] = {"mtime": dir_mtime, "files": file_names, "dirs": dir_names}
+            rescanned = 1
+
+        for name in file_names:
+            path = os.path.join(directory, name)
+            if self._update_file(path):
+                found.append(path)
+
+        if depth < self.max_depth:
+            for name in dir_names:
+                rescanned += self._scan_directory(os.path.join(directory, name), depth + 1, found)
+        return rescanned
+
+    def _update_file(self, path: str) -> bool:
+        """更新单个文件的索引项，文件不存在时返回False"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+
+        entry = self.files.get(path)
+        if entry and entry.get("mtime") == stat.st_mtime and entry.get("size") == stat.st_size:
+            return True
+
+        # 新文件或已修改: 重新读取页数
+        with self.lock:
+            self.files[path] = {
+                "mtime": stat.st_mtime,
+                "size": stat.st_size,
+                "slide_count": count_slides(path),
+                "last_opened": entry.get("last_opened", 0) if entry else 0
+            }
+        return True
+
+    def get_ranked_files(self, paths: Optional[List[str]] = None) -> List[str]:
+        """按最近打开时间、修改时间、路径排序 (结果确定)"""
+        candidates = paths if paths is not None else list(self.files)
+        return sorted(
+            candidates,
+            key=lambda path: (-self.files.get(path, {}).get("last_opened", 0),
+                              -self.files.get(path, {}).get("mtime", 0),
+                              path)
+        )
+
+    def get_file_info(self, path: str) -> Optional[Dict]:
+        """获取索引中的文件信息"""
+        return self.files.get(os.path.abspath(path))
+
+    def record_opened(self, path: str):
+        """记录文件被打开，用于排序"""
+        path = os.path.abspath(path)
+        if not self._update_file(path):
+            return
+        with self.lock:
+            self.files[path]["last_opened"] = time.time()
+        self.save_index()
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+幻灯片缩略图缓存
+Slide Thumbnail Cache
+
+功能特性:
+1. 后台用无界面LibreOffice把演示文稿转换为逐页PNG缩略图
+2. 缩略图按文件内容哈希缓存在磁盘上，再次打开同一文稿无需重新转换
+3. 为手势窗口和演讲稿显示器提供当前页/下一页预览
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2 as cv
+import numpy as np
+
+
+def get_default_cache_dir() -> str:
+    """默认缓存目录"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ppt_gesture_controller", "thumbnails")
+
+
+class SlideThumbnailCache:
+    """幻灯片缩略图缓存"""
+
+    MANIFEST_NAME = "manifest.json"
+
+    def __init__(self, cache_dir: Optional[str] = None, thumbnail_width: int = 320):
+        self.cache_dir = cache_dir or get_default_cache_dir()
+        self.thumbnail_width = thumbnail_width
+        self.soffice_path = shutil.which("soffice") or shutil.which("libreoffice")
+
+        self.lock = threading.Lock()
+        self.hash_cache: Dict[Tuple[str, float, int], str] = {}  # (路径, mtime, 大小) -> 内容哈希
+        self.pending: Dict[Tuple[str, float, int], threading.Thread] = {}  # 正在处理的 (路径, mtime, 大小) -> 线程
+        self.manifest_cache: Dict[str, List[str]] = {}  # 内容哈希 -> 逐页缩略图路径
+        self.image_cache: Dict[Tuple[str, int, int], np.ndarray] = {}  # 已解码缩放的预览图
+        self.max_cached_images = 32
+
+    @staticmethod
+    def compute_file_hash(file_path: str) -> str:
+        """计算文件内容的SHA-256"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _file_key(file_path: str) -> Tuple[str, float, int]:
+        """(路径, 修改时间, 大小)，只需 stat，不读取文件内容"""
+        stat = os.stat(file_path)
+        return os.path.abspath(file_path), stat.st_mtime, stat.st_size
+
+    def get_file_hash(self, file_path: str) -> str:
+        """获取文件内容哈希 (按路径、修改时间、大小缓存，避免重复读取大文件)"""
+        key = self._file_key(file_path)
+        with self.lock:
+            if key in self.hash_cache:
+                return self.hash_cache[key]
+        file_hash = self.compute_file_hash(file_path)
+        with self.lock:
+            self.hash_cache[key] = file_hash
+        return file_hash
+
+    def _deck_dir(self, file_hash: str) -> str:
+        return os.path.join(self.cache_dir, file_hash)
+
+    def get_thumbnails(self, file_path: str) -> Optional[List[str]]:
+        """
+        获取已缓存的逐页缩略图路径列表，未缓存时返回None
+
+        不在调用线程上计算内容哈希: 哈希由 request() 启动的后台任务计算，完成前返回None
+        """
+        try:
+            key = self._file_key(file_path)
+        except OSError:
+            return None
+        with self.lock:
+            file_hash = self.hash_cache.get(key)
+        if file_hash is None:
+            return None
+        return self._load_manifest(file_hash)
+
+    def _load_manifest(self, file_hash: str) -> Optional[List[str]]:
+        """读取磁盘缓存中该内容哈希的缩略图清单"""
+        with self.lock:
+            if file_hash in self.manifest_cache:
+                return self.manifest_cache[file_hash]
+        try:
+            deck_dir = self._deck_dir(file_hash)
+            with open(os.path.join(deck_dir, self.MANIFEST_NAME), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            thumbnails = [os.path.join(deck_dir, name) for name in manifest["slides"]]
+        except (OSError, ValueError, KeyError):
+            return None
+        with self.lock:
+            self.manifest_cache[file_hash] = thumbnails
+        return thumbnails
+
+    def request(self, file_path: str, callback: Optional[Callable[[List[str]], None]] = None) -> bool:
+        """
+        请求生成缩略图 (立即返回，内容哈希和转换都在后台线程完成)
+
+        Returns:
+            缩略图是否已在缓存中
+        """
+        thumbnails = self.get_thumbnails(file_path)
+        if thumbnails is not None:
+            if callback:
+                callback(thumbnails)
+            return True
+
+        try:
+            key = self._file_key(file_path)
+        except OSError as e:
+            print(f"❌ 无法读取演示文稿: {e}")
+            return False
+        with self.lock:
+            if key in self.pending:
+                return False
+            thread = threading.Thread(target=self._render_job,
+                                      args=(file_path, key, callback), daemon=True)
+            self.pending[key] = thread
+        thread.start()
+        return False
+
+    def _render_job(self, file_path: str, key: Tuple[str, float, int], callback):
+        """后台任务: 计算内容哈希，磁盘缓存中没有时再转换"""
+        try:
+            file_hash = self.get_file_hash(file_path)
+            thumbnails = self._load_manifest(file_hash) or self.render(file_path, file_hash)
+            if thumbnails and callback:
+                callback(thumbnails)
+        except Exception as e:
+            print(f"❌ 幻灯片缩略图生成失败: {e}")
+        finally:
+            with self.lock:
+                self.pending.pop(key, None)
+
+    def render(self, file_path: str, file_hash: Optional[str] = None) -> Optional[List[str]]:
+        """同步转换演示文稿为逐页PNG并写入缓存"""
+        if not self.soffice_path:
+            print("⚠️  未找到LibreOffice (soffice)，无法生成幻灯片缩略图")
+            return None
+
+        file_hash = file_hash or self.get_file_hash(file_path)
+        deck_dir = self._deck_dir(file_hash)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        with tempfile.TemporaryDirectory(dir=self.cache_dir) as work_dir:
+            # 1. 演示文稿 -> PDF (LibreOffice的PNG导出只输出第一页)
+            subprocess.run(
+                [self.soffice_path, "--headless", "--norestore",
+                 # 独立的用户配置目录，避免与正在运行的LibreOffice实例冲突
+                 f"-env:UserInstallation={Path(work_dir, 'profile').resolve().as_uri()}",
+                 "--convert-to", "pdf", "--outdir", work_dir, os.path.abspath(file_path)],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=300, check=True
+            )
+            pdf_path = os.path.join(work_dir, os.path.splitext(os.path.basename(file_path))[0] + ".pdf")
+            if not os.path.exists(pdf_path):
+                print(f"❌ 演示文稿转换PDF失败: {file_path}")
+                return None
+
+            # 2. PDF -> 逐页PNG
+            output_dir = os.path.join(work_dir, "slides")
+            os.makedirs(output_dir)
+            slides = self._rasterize_pdf(pdf_path, output_dir)
+            if not slides:
+                return None
+
+            with open(os.path.join(output_dir, self.MANIFEST_NAME), 'w', encoding='utf-8') as f:
+                json.dump({
+                    "source": os.path.abspath(file_path),
+                    "slide_count": len(slides),
+                    "width": self.thumbnail_width,
+                    "slides": slides
+                }, f, ensure_ascii=False, indent=2)
+
+            # 3. 完整生成后再放入缓存目录，中途失败不会留下残缺的缓存
+            if os.path.exists(deck_dir):
+                shutil.rmtree(deck_dir, ignore_errors=True)
+            os.replace(output_dir, deck_dir)
+
+        print(f"🖼️  已生成 {len(slides)} 页幻灯片缩略图: {os.path.basename(file_path)}")
+        return [os.path.join(deck_dir, name) for name in slides]
+
+    def _rasterize_pdf(self, pdf_path: str, output_dir: str) -> List[str]:
+        """把PDF逐页渲染为PNG，返回按页序排列的文件名"""
+        pdftoppm = shutil.which("pdftoppm")
+        if pdftoppm:
+            subprocess.run(
+                [pdftoppm, "-png", "-scale-to-x", str(self.thumbnail_width), "-scale-to-y", "-1",
+                 pdf_path, os.path.join(output_dir, "slide")],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=300, check=True
+            )
+            # pdftoppm按页数位数补零，文件名排序即页序
+            return sorted(name for name in os.listdir(output_dir) if name.endswith(".png"))
+
+        try:
+            import fitz  # PyMuPDF (可选)
+        except ImportError:
+            print("⚠️  未找到pdftoppm或PyMuPDF，无法渲染幻灯片缩略图")
+            return []
+
+        slides = []
+        with fitz.open(pdf_path) as document:
+            for page_index, page in enumerate(document):
+                zoom = self.thumbnail_width / page.rect.width
+                pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+                name = f"slide-{page_index + 1:03d}.png"
+                pixmap.save(os.path.join(output_dir, name))
+                slides.append(name)
+        return slides
+
+    def get_slide_image(self, file_path: str, slide_number: int,
+                        width: Optional[int] = None) -> Optional[np.ndarray]:
+        """
+        获取第 slide_number 页 (从1开始) 的缩略图，可按宽度缩放
+
+        Returns:
+            BGR图像，缓存中没有时返回None
+        """
+        thumbnails = self.get_thumbnails(file_path)
+        if not thumbnails or not 1 <= slide_number <= len(thumbnails):
+            return None
+
+        key = (thumbnails[slide_number - 1], slide_number, width or 0)
+        with self.lock:
+            if key in self.image_cache:
+                return self.image_cache[key]
+
+        image = cv.imread(thumbnails[slide_number - 1])
+        if image is None:
+            return None
+        if width and image.shape[1] != width:
+            height = max(1, int(image.shape[0] * width / image.shape[1]))
+            image = cv.resize(image, (width, height), interpolation=cv.INTER_AREA)
+
+        with self.lock:
+            if len(self.image_cache) >= self.max_cached_images:
+                self.image_cache.pop(next(iter(self.image_cache)))
+            self.image_cache[key] = image
+        return image
+
+
+# 全局缩略图缓存实例
+_thumbnail_cache = None
+
+def get_thumbnail_cache() -> SlideThumbnailCache:
+    """获取全局缩略图缓存实例"""
+    global _thumbnail_cache
+    if _thumbnail_cache is None:
+        _thumbnail_cache = SlideThumbnailCache()
+    return _thumbnail_cache
+
+
+def draw_slide_preview(img, cache: SlideThumbnailCache, file_path: Optional[str], slide_number: int,
+                       position: Tuple[int, int], width: int = 160, show_next: bool = True):
+    """在图像上绘制当前页 (及下一页) 的缩略图预览，返回绘制区域的底部y坐标"""
+    x, y = position
+    if not file_path:
+        return y
+
+    for offset, color in ((0, (0, 255, 255)), (1, (150, 150, 150))):
+        if offset and not show_next:
+            break
+        preview = cache.get_slide_image(file_path, slide_number + offset, width)
+        if preview is None:
+            break
+        h, w = preview.shape[:2]
+        if y + h > img.shape[0] or x + w > img.shape[1] or x < 0:
+            break
+        img[y:y + h, x:x + w] = preview
+        cv.rectangle(img, (x, y), (x + w - 1, y + h - 1), color, 2)
+        y += h + 8
+    return y
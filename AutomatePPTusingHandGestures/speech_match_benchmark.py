@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+演讲稿匹配基准测试
+Speech Text Matching Benchmark
+
+功能特性:
+1. 生成 10 ~ 5000 段的中文/英文合成演讲稿
+2. 从演讲稿中截取片段，模拟语音识别的删字、错字、语序颠倒生成带噪声的查询
+3. 测量 SpeechTextManager.match_input_text 的延迟分位数、内存占用和 top-1 正确率
+   (延迟在不开启 tracemalloc 的单独一轮中计时；样本不足以估计的分位数不报告)
+4. 对每种匹配器实现分别测试，证明提速没有以正确率为代价
+
+用法:
+    python speech_match_benchmark.py [--sizes 10,100,1000,5000] [--languages zh,en]
+                                     [--noise 0,0.1,0.2,0.3] [--queries 100] [--seed 0]
+                                     (P99 需要至少200次查询才会报告)
+                                     [--matcher 模块名:类名] [--output speech_benchmark.json]
+"""
+
+import contextlib
+import importlib
+import io
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Tuple
+
+
+ZH_WORDS = [
+    "项目", "背景", "目标", "技术", "方案", "创新", "方法", "实验", "结果", "数据", "分析", "总结",
+    "系统", "设计", "用户", "体验", "手势", "识别", "模型", "训练", "性能", "优化", "延迟", "准确率",
+    "摄像头", "演示", "幻灯片", "控制", "交互", "界面", "算法", "框架", "测试", "部署", "需求", "调研",
+    "团队", "分工", "进度", "问题", "挑战", "解决", "未来", "展望", "应用", "场景", "教学", "会议",
+]
+ZH_FILLERS = ["我们", "这里", "首先", "然后", "接下来", "最后", "可以看到", "通过", "基于", "实现了"]
+EN_WORDS = [
+    "project", "background", "goal", "technical", "approach", "innovation", "method", "experiment",
+    "result", "data", "analysis", "summary", "system", "design", "user", "experience", "gesture",
+    "recognition", "model", "training", "performance", "optimization", "latency", "accuracy", "camera",
+    "presentation", "slide", "control", "interaction", "interface", "algorithm", "framework", "testing",
+    "deployment", "requirement", "research", "team", "progress", "problem", "challenge", "solution",
+    "future", "application", "scenario", "teaching", "meeting",
+]
+MIN_QUERIES = 40  # 每组查询数的下限 (不超过 --queries)，保证 P95 可以报告
+MIN_TAIL_SAMPLES = 2  # 分位数之上至少要有这么多样本才报告，否则 P99 实际就是最大值
+MEMORY_QUERIES = 10  # 内存轮只跑前几条查询 (tracemalloc 下查询慢一个数量级)
+
+EN_FILLERS = ["we", "here", "first", "then", "next", "finally", "you can see", "through", "based on", "this"]
+
+
+def generate_script(size: int, language: str, rng: random.Random) -> List[str]:
+    """生成 size 段演讲稿文本"""
+    words, fillers = (ZH_WORDS, ZH_FILLERS) if language == "zh" else (EN_WORDS, EN_FILLERS)
+    separator = "" if language == "zh" else " "
+    end = "。" if language == "zh" else "."
+    segments = []
+    for _ in range(size):
+        sentences = []
+        for _ in range(rng.randint(1, 3)):
+            parts = [rng.choice(fillers)] + rng.sample(words, rng.randint(4, 8))
+            sentences.append(separator.join(parts) + end)
+        segments.append(separator.join(sentences))
+    return segments
+
+
+def make_noisy_query(text: str, language: str, noise: float, rng: random.Random) -> str:
+    """截取一段文本并模拟语音识别错误: 删除、替换、语序颠倒"""
+    if language == "zh":
+        units = [c for c in text if c not in "。，"]
+        pool = "".join(ZH_WORDS)
+    else:
+        units = text.replace(".", "").split()
+        pool = EN_WORDS
+    length = min(len(units), rng.randint(8, 20) if language == "zh" else rng.randint(4, 10))
+    start = rng.randint(0, max(0, len(units) - length))
+    units = units[start:start + length]
+
+    noisy = []
+    for unit in units:
+        roll = rng.random()
+        if roll < noise / 3:
+            continue                              # 删除
+        if roll < noise * 2 / 3:
+            noisy.append(rng.choice(pool))        # 替换
+        else:
+            noisy.append(unit)
+    # 语序颠倒: 交换相邻单元
+    for _ in range(int(len(noisy) * noise / 3)):
+        if len(noisy) >= 2:
+            i = rng.randrange(len(noisy) - 1)
+            noisy[i], noisy[i + 1] = noisy[i + 1], noisy[i]
+    return ("" if language == "zh" else " ").join(noisy) or units[0]
+
+
+def load_matcher(spec: str):
+    """按 "模块名:类名" 加载匹配器类"""
+    module_name, class_name = spec.split(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def percentile(samples: List[float], q: float) -> Optional[float]:
+    """第 q 百分位数，样本数不足以区分该分位数与最大值时返回None"""
+    if len(samples) * (100 - q) / 100 < MIN_TAIL_SAMPLES:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+def _make_manager(matcher_class, segments: List[str]):
+    from speech_text_manager import SpeechTextManager
+
+    manager = SpeechTextManager(auto_load=False)
+    manager.matcher = matcher_class()
+    data = {"segments": [{"text": text} for text in segments]}
+    return manager, data
+
+
+def benchmark_matcher(matcher_class, segments: List[str], queries: List[Tuple[str, int]]) -> Dict:
+    """用一种匹配器跑一组查询: 先不开 tracemalloc 计时，再用新实例单独测内存"""
+    # 计时轮: 加载 (含关键词提取) 和每次查询的耗时、正确率
+    manager, data = _make_manager(matcher_class, segments)
+    start = time.perf_counter()
+    manager.load_speech_from_data(data)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    latencies = []
+    correct = 0
+    matched = 0
+    with contextlib.redirect_stdout(io.StringIO()):  # match_input_text 会打印匹配过程
+        for query, expected_index in queries:
+            start = time.perf_counter()
+            success, _, _ = manager.match_input_text(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if success:
+                matched += 1
+                correct += manager.current_index == expected_index
+
+    # 内存轮: tracemalloc 会显著拖慢分配，不计时
+    manager, data = _make_manager(matcher_class, segments)
+    tracemalloc.start()
+    manager.load_speech_from_data(data)
+    _, load_peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for query, _ in queries[:MEMORY_QUERIES]:
+            manager.match_input_text(query)
+    _, query_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "load_ms": load_ms,
+        "load_peak_bytes": load_peak,
+        "query_peak_bytes": query_peak,
+        "queries": len(queries),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies),
+        "mean_ms": statistics.mean(latencies),
+        "match_rate": matched / len(queries),
+        "top1_accuracy": correct / len(queries),
+    }
+
+
+def _format_ms(value: Optional[float]) -> str:
+    return f"{value:>10.2f}" if value is not None else f"{'-':>10}"
+
+
+def run_benchmarks(sizes: List[int], languages: List[str], noise_levels: List[float],
+                   max_queries: int, matchers: Dict[str, type], seed: int = 0) -> List[Dict]:
+    """运行全部组合，返回结果列表"""
+    results = []
+    for language in languages:
+        for size in sizes:
+            rng = random.Random(f"{seed}-{language}-{size}")
+            segments = generate_script(size, language, rng)
+            # 大稿件的单次查询是线性扫描，控制查询数量使每组耗时可接受，但不少于 MIN_QUERIES
+            query_count = min(max_queries, max(MIN_QUERIES, 50000 // size))
+            for noise in noise_levels:
+                queries = []
+                for _ in range(query_count):
+                    index = rng.randrange(size)
+                    queries.append((make_noisy_query(segments[index], language, noise, rng), index))
+                for matcher_name, matcher_class in matchers.items():
+                    stats = benchmark_matcher(matcher_class, segments, queries)
+                    stats.update({"matcher": matcher_name, "language": language,
+                                  "segments": size, "noise": noise})
+                    results.append(stats)
+                    print(f"{matcher_name:<14}{language:<4}{size:>6}{noise:>6.2f}"
+                          f"{_format_ms(stats['p50_ms'])}{_format_ms(stats['p95_ms'])}{_format_ms(stats['p99_ms'])}"
+                          f"{stats['query_peak_bytes'] / 1024:>10.0f}{stats['top1_accuracy']:>8.1%}")
+    return results
+
+
+def _option(name: str, default=None):
+    if name in sys.argv:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
+
+def main():
+    """命令行入口"""
+    sizes = [int(v) for v in _option("--sizes", "10,100,1000,5000").split(",")]
+    languages = _option("--languages", "zh,en").split(",")
+    noise_levels = [float(v) for v in _option("--noise", "0,0.1,0.2,0.3").split(",")]
+    max_queries = int(_option("--queries", 100))
+    seed = int(_option("--seed", 0))
+
+    from speech_text_manager import TextMatcher
+    matchers = {"TextMatcher": TextMatcher}
+    # --matcher 可重复指定，加入其它匹配器实现进行对比
+    for index, arg in enumerate(sys.argv):
+        if arg == "--matcher":
+            spec = sys.argv[index + 1]
+            matchers[spec.split(":")[1]] = load_matcher(spec)
+
+    print(f"{'匹配器':<11}{'语言':<3}{'段数':>5}{'噪声':>5}{'P50(ms)':>10}{'P95(ms)':>10}"
+          f"{'P99(ms)':>10}{'内存(KB)':>8}{'正确率':>6}")
+    results = run_benchmarks(sizes, languages, noise_levels, max_queries, matchers, seed)
+
+    output_path = _option("--output")
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {output_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -140,7 +140,7 @@ class TextMatcher:
 class SpeechTextManager:
     """演讲稿管理器"""
     
-    def __init__(self, config_file: str = "speech_config.json"):
+    def __init__(self, config_file: str = "speech_config.json", auto_load: bool = True):
         self.config_file = config_file
         self.segments: List[SpeechSegment] = []
         self.current_index = 0
@@ -148,8 +148,9 @@ class SpeechTextManager:
         self.auto_scroll_enabled = True
         self.display_context_lines = 3  # 显示上下文行数
         
-        # 加载演讲稿配置
-        self.load_speech_config()
+        # 加载演讲稿配置 (auto_load=False 时由调用方在后台加载)
+        if auto_load:
+            self.load_speech_config()
     
     def load_speech_config(self):
         """加载演讲稿配置"""
@@ -316,6 +317,21 @@ class SpeechTextManager:
         
         return old_index != self.current_index
     
+    def sync_to_slide(self, slide_number: int) -> bool:
+        """根据真实的幻灯片页码同步当前演讲片段"""
+        if 0 <= self.current_index < len(self.segments) and \
+                self.segments[self.current_index].slide_number == slide_number:
+            return False
+        
+        for segment in self.segments:
+            if segment.slide_number == slide_number:
+                self.current_index = segment.index
+                for other in self.segments:
+                    other.is_current = (other.index == segment.index)
+                    other.confidence = 0.0
+                return True
+        return False
+    
     def toggle_auto_scroll(self):
         """切换自动滚动状态"""
         self.auto_scroll_enabled = not self.auto_scroll_enabled
@@ -336,6 +352,16 @@ class SpeechScrollDisplay:
         self.line_height = 40
         self.margin = 20
         
+        # 幻灯片缩略图预览 (可选)
+        self.thumbnail_cache = None
+        self.ppt_path = None
+        self.preview_width = 160
+    
+    def set_slide_preview(self, thumbnail_cache, ppt_path: str):
+        """设置幻灯片缩略图来源，显示当前页/下一页预览"""
+        self.thumbnail_cache = thumbnail_cache
+        self.ppt_path = ppt_path
+        
     def create_display_image(self) -> np.ndarray:
         """创建显示图像"""
         img = np.zeros((self.window_height, self.window_width, 3), dtype=np.uint8)
@@ -363,6 +389,14 @@ class SpeechScrollDisplay:
                               font_size=self.font_size-6, color=(0, 255, 0))
             y_offset += self.line_height // 2
         
+        # 当前页/下一页缩略图 (右上角)
+        if self.thumbnail_cache and self.ppt_path:
+            from slide_thumbnail_cache import draw_slide_preview
+            draw_slide_preview(img, self.thumbnail_cache, self.ppt_path,
+                               progress_info['current_slide'],
+                               (self.window_width - self.margin - self.preview_width, self.margin),
+                               width=self.preview_width)
+        
         # 分隔线
         cv.line(img, (self.margin, y_offset), (self.window_width - self.margin, y_offset), 
                 (100, 100, 100), 2)
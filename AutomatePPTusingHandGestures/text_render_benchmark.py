@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+文本渲染基准测试
+Text Rendering Benchmark
+
+put_text_auto 根据是否含中文在 cv.putText 和基于PIL的 put_chinese_text 之间选择。
+本脚本按以下维度组合测量每次调用的耗时和单次调用的峰值内存 (tracemalloc):
+1. 画面尺寸 640x480 ~ 1920x1080
+2. 字符串长度
+3. 中文字符比例 (0 时走 cv.putText，大于0时走PIL)
+4. 每帧绘制的字符串数
+
+用法:
+    python text_render_benchmark.py [--frames 30] [--sizes 640x480,1280x720,1920x1080]
+                                    [--lengths 8,32,96] [--cjk 0,0.25,1] [--per-frame 1,5,10]
+                                    [--font-size 18] [--seed 0] [--output text_benchmark.json]
+"""
+
+import json
+import random
+import sys
+import time
+import tracemalloc
+from typing import Dict, Tuple
+
+import numpy as np
+
+from chinese_text_renderer import get_renderer, put_text_auto
+
+
+CJK_CHARS = "演示幻灯片手势识别状态文件命令冷却中可执行时长当前页下一页激光指示器画笔模式"
+ASCII_CHARS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 :."
+
+
+def make_text(length: int, cjk_ratio: float, rng: random.Random) -> str:
+    """生成指定长度和中文比例的字符串 (比例大于0时至少含一个中文字符)"""
+    cjk_count = round(length * cjk_ratio)
+    if cjk_ratio > 0:
+        cjk_count = max(1, cjk_count)
+    chars = [rng.choice(CJK_CHARS) for _ in range(cjk_count)]
+    chars += [rng.choice(ASCII_CHARS) for _ in range(length - cjk_count)]
+    rng.shuffle(chars)
+    return "".join(chars)
+
+
+def benchmark_case(frame_size: Tuple[int, int], length: int, cjk_ratio: float, per_frame: int,
+                   frames: int, font_size: int, rng: random.Random) -> Dict:
+    """测量一种组合: 每帧在新画面上绘制 per_frame 个字符串"""
+    width, height = frame_size
+    base = np.full((height, width, 3), 64, dtype=np.uint8)
+    texts = [[make_text(length, cjk_ratio, rng) for _ in range(per_frame)] for _ in range(frames)]
+    positions = [(10, 30 + (i * 30) % max(30, height - 40)) for i in range(per_frame)]
+
+    latencies = []
+    for frame_texts in texts:
+        img = base.copy()
+        for text, position in zip(frame_texts, positions):
+            start = time.perf_counter_ns()
+            img = put_text_auto(img, text, position, font_size, (255, 255, 255))
+            latencies.append((time.perf_counter_ns() - start) / 1e6)
+
+    # 单独一轮测量每次调用的峰值内存 (tracemalloc 会拖慢执行，不与计时混在一起；
+    # 统计Python和numpy的分配，PIL内部的图像缓冲不在其中)
+    call_peaks = []
+    tracemalloc.start()
+    put_text_auto(base.copy(), texts[0][0], positions[0], font_size, (255, 255, 255))  # 预热，排除首次调用的缓存分配
+    for frame_texts in texts[:min(5, frames)]:
+        img = base.copy()
+        for text, position in zip(frame_texts, positions):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            img = put_text_auto(img, text, position, font_size, (255, 255, 255))
+            _, peak = tracemalloc.get_traced_memory()
+            call_peaks.append(peak - before)
+    tracemalloc.stop()
+
+    latencies.sort()
+    count = len(latencies)
+    return {
+        "frame_size": f"{width}x{height}",
+        "length": length,
+        "cjk_ratio": cjk_ratio,
+        "strings_per_frame": per_frame,
+        "path": "pil" if cjk_ratio > 0 else "cv.putText",
+        "calls": count,
+        "mean_ms": sum(latencies) / count,
+        "p50_ms": latencies[count // 2],
+        "p95_ms": latencies[min(count - 1, int(count * 0.95))],
+        "frame_ms": sum(latencies) / frames,
+        "call_peak_bytes_mean": sum(call_peaks) / len(call_peaks),
+        "call_peak_bytes_max": max(call_peaks),
+    }
+
+
+def _option(name: str, default=None):
+    if name in sys.argv:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
+
+def main():
+    """命令行入口"""
+    frames = int(_option("--frames", 30))
+    sizes = [tuple(int(v) for v in size.split("x"))
+             for size in _option("--sizes", "640x480,1280x720,1920x1080").split(",")]
+    lengths = [int(v) for v in _option("--lengths", "8,32,96").split(",")]
+    cjk_ratios = [float(v) for v in _option("--cjk", "0,0.25,1").split(",")]
+    per_frame_counts = [int(v) for v in _option("--per-frame", "1,5,10").split(",")]
+    font_size = int(_option("--font-size", 18))
+    rng = random.Random(int(_option("--seed", 0)))
+
+    # 预先加载字体，首次加载的开销不计入结果
+    get_renderer().preload_fonts([font_size])
+
+    print(f"{'画面':<11}{'长度':>4}{'中文比例':>8}{'每帧':>4}{'路径':>12}"
+          f"{'P50(ms)':>9}{'P95(ms)':>9}{'每帧(ms)':>9}{'单次峰值内存 平均/最大(KB)':>18}")
+    results = []
+    for frame_size in sizes:
+        for length in lengths:
+            for cjk_ratio in cjk_ratios:
+                for per_frame in per_frame_counts:
+                    stats = benchmark_case(frame_size, length, cjk_ratio, per_frame, frames, font_size, rng)
+                    results.append(stats)
+                    print(f"{stats['frame_size']:<12}{length:>5}{cjk_ratio:>10.2f}{per_frame:>6}"
+                          f"{stats['path']:>12}{stats['p50_ms']:>9.3f}{stats['p95_ms']:>9.3f}"
+                          f"{stats['frame_ms']:>9.2f}{stats['call_peak_bytes_mean'] / 1024:>12.0f}"
+                          f"/{stats['call_peak_bytes_max'] / 1024:<6.0f}")
+
+    output_path = _option("--output")
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {output_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
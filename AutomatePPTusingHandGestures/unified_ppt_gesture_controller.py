@@ -12,21 +12,32 @@ Unified PPT Gesture Recognition Controller
 6. 支持多种PPT软件
 """
 
+import time
+_IMPORT_START = time.perf_counter()  # 进程启动的近似起点，用于统计首帧时间
+
 import cv2 as cv
 import numpy as np
-import time
 import math
 import json
 import os
-import pyautogui as pt
+import sys
+import threading
+from collections import deque
 from enum import Enum
 from dataclasses import dataclass, asdict
 from typing import Dict, List, Tuple, Optional, Callable
-import handTrackingModule as hmt
-from chinese_text_renderer import put_chinese_text, ChineseTextRenderer, put_text_auto
-from ppt_controller import PPTController, get_ppt_controller
+from hand_tracking_service import create_hand_detector
+from chinese_text_renderer import put_chinese_text, ChineseTextRenderer, put_text_auto, get_renderer
+from ppt_controller import PPTController, PPTActionExecutor, get_ppt_controller, preload_pyautogui
+from camera_broker import open_shared_camera
+from frame_profiler import FrameProfiler
+from gesture_tracer import get_tracer
+from landmark_replay import LandmarkRecorder
+from slide_thumbnail_cache import get_thumbnail_cache, draw_slide_preview
 from speech_text_manager import SpeechTextManager, SpeechScrollDisplay
 
+_IMPORT_TIME = time.perf_counter() - _IMPORT_START
+
 
 class GestureType(Enum):
     """手势类型枚举"""
@@ -55,6 +66,27 @@ class PPTAction(Enum):
     SPEECH_PREV = "speech_prev"  # 演讲稿上一段
 
 
+class GestureState(Enum):
+    """单个手势的触发状态"""
+    IDLE = "idle"  # 未检测到 (不在状态表中)
+    ARMED = "armed"  # 置信度越过进入阈值，等待满足持续时间
+    FIRED = "fired"  # 已执行动作，处于不应期
+    RELEASE_REQUIRED = "release_required"  # 不应期已过，需松开 (低于退出阈值) 后才能再次触发
+
+
+# 静态手势名称 -> 手指模式 [拇指,食指,中指,无名指,小指]
+STATIC_GESTURE_PATTERNS = {
+    "fist": [0, 0, 0, 0, 0],
+    "point": [0, 1, 0, 0, 0],
+    "thumb_up": [1, 0, 0, 0, 0],
+    "peace": [0, 1, 1, 0, 0],
+    "ok": [1, 1, 0, 0, 0],
+    "three": [0, 1, 1, 1, 0],
+    "four": [0, 1, 1, 1, 1],
+    "open_hand": [1, 1, 1, 1, 1]
+}
+
+
 @dataclass
 class GestureConfig:
     """手势配置数据类"""
@@ -63,28 +95,68 @@ class GestureConfig:
     action: PPTAction
     finger_pattern: List[int] = None  # 静态手势的手指模式 [拇指,食指,中指,无名指,小指]
     motion_pattern: str = None  # 动态手势的运动模式
-    confidence_threshold: float = 0.8  # 识别置信度阈值
+    confidence_threshold: float = 0.8  # 识别置信度阈值 (进入阈值)
     hold_duration: float = 0.0  # 持续时间要求 (秒)
     enabled: bool = True  # 是否启用
     custom: bool = False  # 是否为自定义手势
+    exit_threshold: Optional[float] = None  # 退出阈值，低于它视为松开 (默认为进入阈值-0.2)
+    refractory_period: float = 0.3  # 不应期 (秒): 触发后至少经过这段时间才能再次触发
+
+    def get_exit_threshold(self) -> float:
+        if self.exit_threshold is not None:
+            return self.exit_threshold
+        return max(0.0, self.confidence_threshold - 0.2)
+
+
+# 滑动手势的反方向 (触发后回手的运动不应触发反向手势)
+OPPOSITE_MOTIONS = {
+    "swipe_left": "swipe_right",
+    "swipe_right": "swipe_left",
+    "swipe_up": "swipe_down",
+    "swipe_down": "swipe_up",
+}
+
+
+@dataclass
+class GestureTracker:
+    """一个手势配置的状态机实例 (只为非空闲的手势保存)"""
+    state: GestureState
+    since: float  # 进入 ARMED 的时间
+    fired_at: Optional[float] = None  # 被屏蔽 (未触发即进入等待松开) 时为None
 
 
 class UnifiedGestureDetector:
     """统一手势识别器"""
 
-    def __init__(self):
-        self.detector = hmt.handDetector()
+    def __init__(self, load_model: bool = True, hand_backend: str = "local", smoothing: bool = True):
+        # hand_backend: "local" 进程内; "service" 常驻手部追踪服务 (模型已预热，重启程序无需重新初始化);
+        #               "process" 独立推理进程 (与界面渲染并行)
+        self.hand_backend = hand_backend
+        # smoothing: 关键点 One Euro 平滑，抑制抖动造成的滑动/OK手势阈值闪烁
+        self.smoothing = smoothing
+        # load_model=False 时由调用方稍后 (可在后台线程) 调用 load_model()
+        self.detector = None
+        if load_model:
+            self.load_model()
         self.tipIds = [4, 8, 12, 16, 20]  # 手指尖端ID
 
         # 手势历史记录 (用于动态手势和持续手势)
         self.gesture_history = []
         self.position_history = []
-        self.last_gesture_time = {}
 
         # 双手检测
         self.left_hand_landmarks = None
         self.right_hand_landmarks = None
 
+    def load_model(self):
+        """加载MediaPipe手部模型"""
+        if self.detector is None:
+            self.detector = create_hand_detector(backend=self.hand_backend, smoothing=self.smoothing)
+
+    def is_ready(self) -> bool:
+        """手部模型是否已加载"""
+        return self.detector is not None
+
     def detect_static_gesture(self, lmList: List[List[int]]) -> Dict[str, float]:
         """检测静态手势 - 返回各种手势的置信度"""
         if len(lmList) == 0:
@@ -126,14 +198,30 @@ class UnifiedGestureDetector:
 
         return gestures
 
-    def detect_dynamic_gesture(self, lmList: List[List[int]]) -> Dict[str, float]:
-        """检测动态手势 - 基于运动轨迹"""
+    MOTION_WINDOW = 10  # 动态手势判断所用的帧数
+    MAX_FRAME_GAP = 0.25  # 相邻两帧间隔超过该值 (秒) 时轨迹不连续，重新开始记录
+
+    def reset_motion_history(self):
+        """清空运动轨迹 (手离开画面、时间戳不连续或滑动已触发时)"""
+        self.position_history = []
+
+    def motion_window_ready(self) -> bool:
+        """轨迹是否已有完整的判断窗口"""
+        return len(self.position_history) >= self.MOTION_WINDOW
+
+    def detect_dynamic_gesture(self, lmList: List[List[int]], timestamp: Optional[float] = None) -> Dict[str, float]:
+        """检测动态手势 - 基于运动轨迹 (timestamp 为该帧时间，回放时传入录制的时间戳)"""
         if len(lmList) == 0:
+            self.reset_motion_history()
             return {}
 
+        timestamp = timestamp if timestamp is not None else time.time()
+        if self.position_history and timestamp - self.position_history[-1][2] > self.MAX_FRAME_GAP:
+            self.reset_motion_history()
+
         # 记录手掌中心位置
         hand_center = lmList[9]  # 手掌中心
-        self.position_history.append([hand_center[1], hand_center[2], time.time()])
+        self.position_history.append([hand_center[1], hand_center[2], timestamp])
 
         # 保持最近30帧的历史
         if len(self.position_history) > 30:
@@ -141,9 +229,9 @@ class UnifiedGestureDetector:
 
         gestures = {}
 
-        if len(self.position_history) >= 10:
+        if self.motion_window_ready():
             # 分析运动模式
-            recent_positions = self.position_history[-10:]
+            recent_positions = self.position_history[-self.MOTION_WINDOW:]
 
             # 计算总体运动方向
             start_pos = recent_positions[0]
@@ -260,21 +348,51 @@ class UnifiedGestureDetector:
 class UnifiedPPTGestureController:
     """统一PPT手势识别播放器主类"""
 
-    def __init__(self, config_file: str = "gesture_config.json"):
-        self.gesture_detector = UnifiedGestureDetector()
-        self.ppt_controller = PPTController()
+    def __init__(self, config_file: str = "gesture_config.json", ppt_backend: str = "keyboard",
+                 fast_startup: bool = False, hand_backend: str = "local",
+                 ppt_controller: Optional[PPTController] = None, headless: bool = False,
+                 smoothing: bool = True):
+        # 快速启动: 摄像头窗口立即显示，模型/字体/演讲稿/PPT搜索在后台完成
+        self.fast_startup = fast_startup
+        # 无界面模式 (关键点回放/批处理): 不加载手部模型，不打开PPT，动作同步执行
+        self.headless = headless
+        self.startup_timings: Dict[str, float] = {"module_import": _IMPORT_TIME * 1000}  # 阶段 -> 毫秒
+        self.startup_threads: List[threading.Thread] = []
+        self.startup_reported = False
+        self.pending_ppt_file = None
+
+        self.gesture_detector = UnifiedGestureDetector(load_model=not (fast_startup or headless),
+                                                       hand_backend=hand_backend, smoothing=smoothing)
+        self.ppt_controller = ppt_controller or PPTController(backend=ppt_backend)
+        # 按键注入在独立线程执行，避免 pt.PAUSE 阻塞手势识别循环 (无界面模式同步执行，结果可复现)
+        self.action_executor = PPTActionExecutor(self.ppt_controller, synchronous=headless)
+        self.action_executor.start()
         self.config_file = config_file
 
         # 初始化中文文本渲染器
         self.chinese_renderer = ChineseTextRenderer()
 
         # 初始化演讲稿管理器
-        self.speech_manager = SpeechTextManager()
+        self.speech_manager = SpeechTextManager(auto_load=not (fast_startup or headless))
         self.speech_display = None
         self.show_speech_scroll = False
+        
+        # 幻灯片缩略图缓存 (后台生成，用于当前页/下一页预览)
+        self.thumbnail_cache = get_thumbnail_cache()
+        self.show_slide_preview = True
+        # 能获知真实页码时 (LibreOffice后端)，演讲稿随幻灯片自动同步；
+        # 页码在翻页完成时缓存，界面绘制不再每帧查询
+        self.current_slide_number: Optional[int] = None
+        self.ppt_controller.add_slide_change_callback(self.on_slide_changed)
 
         # 加载手势配置
         self.gesture_configs = self.load_gesture_configs()
+        # 每个手势独立的状态机: 非空闲的手势配置 -> 状态，以及手势名称 -> 配置的索引
+        self.gesture_states: Dict[str, GestureTracker] = {}
+        self.gesture_index: Dict[str, List[str]] = {}
+        self.motion_blocks: Dict[str, float] = {}  # 被屏蔽的运动模式 -> 屏蔽截止时间
+        self.hand_present = False
+        self.build_gesture_index()
 
         # 状态变量
         self.running = True
@@ -285,17 +403,31 @@ class UnifiedPPTGestureController:
         self.fps = 0
         self.frame_count = 0
         self.start_time = time.time()
+        self.profiler = FrameProfiler()  # 分阶段耗时直方图
+        self.show_profiler = False
+        self.profile_export_path = "frame_profile.json"
+
+        # 手势到动作的端到端延迟追踪 (启用时导出 Chrome trace JSON)
+        self.tracer = get_tracer()
+        self.trace_export_path = "gesture_trace.json"
+        self.capture_times = deque(maxlen=30)  # 最近各帧的采集时间 (perf_counter)
+        self.landmarks_time = 0.0
+        self.active_traces: Dict[str, Optional[int]] = {}  # 手势配置 -> 进行中的追踪id (已触发为None)
 
         # 激光指示器相关
         self.laser_point = None
         self.draw_trail = []
 
-        # 命令执行冷却控制
-        self.command_cooldown_duration = 2.0  # 执行命令后冷却2秒
-        self.last_command_execution_time = 0
+        # 关键点录制 (由 --record-landmarks 启用)
+        self.landmark_recorder = None
 
-        # 尝试自动初始化PPT
-        self.auto_initialize_ppt()
+        if headless:
+            pass
+        elif fast_startup:
+            self.start_background_loading()
+        else:
+            # 尝试自动初始化PPT
+            self.auto_initialize_ppt()
 
     def auto_initialize_ppt(self):
         """自动初始化PPT演示"""
@@ -305,6 +437,8 @@ class UnifiedPPTGestureController:
 
             if ppt_file:
                 print(f" 找到PPT文件: {os.path.basename(ppt_file)}")
+                # 后台预生成缩略图，已缓存的文稿直接复用
+                self.thumbnail_cache.request(ppt_file)
                 user_input = input("是否要自动打开PPT演示？(y/n): ").lower().strip()
 
                 if user_input in ['y', 'yes', '是', '']:
@@ -322,6 +456,56 @@ class UnifiedPPTGestureController:
             print(f" PPT初始化过程中出现错误: {e}")
             print(" 继续运行程序，可手动打开PPT使用手势控制")
 
+    def _run_startup_phase(self, name: str, func: Callable):
+        """执行一个启动阶段并记录耗时"""
+        start = time.perf_counter()
+        try:
+            func()
+        except Exception as e:
+            print(f"❌ 启动阶段 {name} 失败: {e}")
+        self.startup_timings[name] = (time.perf_counter() - start) * 1000
+
+    def start_background_loading(self):
+        """在后台线程加载手部模型、字体、演讲稿并搜索PPT"""
+        phases = {
+            "hand_model": self.gesture_detector.load_model,
+            "fonts": lambda: get_renderer().preload_fonts([16, 18, 21]),
+            "speech_script": self.speech_manager.load_speech_config,
+            "ppt_discovery": self.discover_ppt,
+            "pyautogui": preload_pyautogui,
+        }
+        for name, func in phases.items():
+            thread = threading.Thread(target=self._run_startup_phase, args=(name, func), daemon=True)
+            thread.start()
+            self.startup_threads.append(thread)
+
+    def discover_ppt(self):
+        """后台搜索PPT文件 (不阻塞等待用户输入)，找到后按 'O' 键打开"""
+        ppt_file = self.ppt_controller.auto_select_ppt()
+        if ppt_file:
+            self.thumbnail_cache.request(ppt_file)
+            self.pending_ppt_file = ppt_file
+            print(f" 找到PPT文件: {os.path.basename(ppt_file)}，按 'O' 键打开演示")
+        else:
+            print(" 当前目录未找到PPT文件，可手动打开PPT后使用手势控制")
+
+    def open_pending_ppt(self):
+        """在后台线程打开已找到的PPT文件"""
+        ppt_file = self.pending_ppt_file
+        if not ppt_file:
+            print(" 尚未找到PPT文件")
+            return
+        self.pending_ppt_file = None
+        threading.Thread(target=self.ppt_controller.open_powerpoint_file, args=(ppt_file,),
+                         daemon=True).start()
+
+    def report_startup_timings(self):
+        """打印启动各阶段耗时"""
+        self.startup_reported = True
+        print("启动耗时统计:")
+        for name, elapsed_ms in self.startup_timings.items():
+            print(f"   {name}: {elapsed_ms:.0f}ms")
+
     def load_gesture_configs(self) -> Dict[str, GestureConfig]:
         """加载手势配置"""
         default_configs = {
@@ -436,27 +620,71 @@ class UnifiedPPTGestureController:
 
     def process_frame(self, img):
         """处理视频帧"""
+        profiler = self.profiler
+
         # 翻转图像 (镜像效果)
-        img = cv.flip(img, 1)
+        with profiler.stage("flip"):
+            img = cv.flip(img, 1)
+
+        if not self.gesture_detector.is_ready():
+            # 手部模型仍在后台加载: 只显示画面，不使用中文字体
+            cv.putText(img, "Loading hand model...", (10, 30), cv.FONT_HERSHEY_SIMPLEX, 0.8, (0, 165, 255), 2)
+            return img
 
         # 检测手部
         img = self.gesture_detector.detector.findHands(img)
-        lmList = self.gesture_detector.detector.findPosition(img, draw=False)
+        for stage_name, elapsed_ms in self.gesture_detector.detector.last_timings.items():
+            profiler.record(stage_name, elapsed_ms)
+        with profiler.stage("landmarks"):
+            lmList = self.gesture_detector.detector.findPosition(img, draw=False)
+        self.landmarks_time = time.perf_counter()
 
-        # 识别手势
-        detected_gestures = {}
         current_time = time.time()
+        if self.landmark_recorder is not None:
+            self.landmark_recorder.add(current_time, lmList, img.shape)
+
+        # 识别并执行手势
+        detected_gestures = self.process_landmarks(lmList, current_time)
+
+        # 绘制界面元素 (text_render 为其中中文文字渲染的部分)
+        renderer = get_renderer()
+        render_before = renderer.render_time_ns
+        with profiler.stage("draw_ui"):
+            img = self.draw_ui(img, detected_gestures, lmList)
+        profiler.record("text_render", (renderer.render_time_ns - render_before) / 1e6)
+
+        return img
+
+    def process_landmarks(self, lmList, current_time: float) -> Dict[str, float]:
+        """
+        根据一帧的关键点识别手势并执行匹配的动作 (与画面无关，可用于回放)
 
-        if len(lmList) != 0:
+        Args:
+            lmList: findPosition 返回的 [id, x, y] 列表，未检测到手时为空
+            current_time: 该帧时间戳 (秒)
+
+        Returns:
+            检测到的手势及置信度
+        """
+        profiler = self.profiler
+        detected_gestures = {}
+        self.hand_present = len(lmList) != 0
+
+        if not self.hand_present:
+            # 手离开画面: 之前的轨迹不能与下次出现的手拼接
+            self.gesture_detector.reset_motion_history()
+        else:
             # 静态手势检测
-            static_gestures = self.gesture_detector.detect_static_gesture(lmList)
+            with profiler.stage("static_detect"):
+                static_gestures = self.gesture_detector.detect_static_gesture(lmList)
             detected_gestures.update(static_gestures)
 
             # 动态手势检测
-            dynamic_gestures = self.gesture_detector.detect_dynamic_gesture(lmList)
+            with profiler.stage("dynamic_detect"):
+                dynamic_gestures = self.gesture_detector.detect_dynamic_gesture(lmList, current_time)
             detected_gestures.update(dynamic_gestures)
 
-            # 激光指示器功能 (实时更新，不受冷却限制)
+            # 激光指示器功能 (实时更新，不受手势状态机限制)
             if self.ppt_controller.laser_mode:
                 index_tip = lmList[8]  # 食指尖
                 self.laser_point = (index_tip[1], index_tip[2])
@@ -465,88 +693,165 @@ class UnifiedPPTGestureController:
         # dual_gestures = self.gesture_detector.detect_dual_hand_gesture(left_lm, right_lm)
         # detected_gestures.update(dual_gestures)
 
-        # 检查命令执行冷却状态
-        current_time = time.time()
-        in_cooldown = (current_time - self.last_command_execution_time) < self.command_cooldown_duration
-
-        # 实时进行手势检测（不受冷却影响）
-        if detected_gestures:
-            self.match_and_execute_gestures(detected_gestures, current_time, in_cooldown)
-
-        # 绘制界面元素
-        self.draw_ui(img, detected_gestures, lmList)
-
-        return img
+        # 有手势检测到，或有手势尚未回到空闲状态 (需要据此判断松开)
+        if detected_gestures or self.gesture_states:
+            with profiler.stage("matching"):
+                self.match_and_execute_gestures(detected_gestures, current_time)
 
-    def match_and_execute_gestures(self, detected_gestures: Dict[str, float], current_time: float, in_cooldown: bool):
-        """匹配检测到的手势并执行相应操作"""
+        return detected_gestures
 
-        # 如果在冷却期内，不执行任何命令，只进行手势检测显示
-        if in_cooldown:
-            return
+    def on_slide_changed(self, slide_number: int):
+        """页码变化回调 (在执行PPT操作的线程中调用): 缓存页码并同步演讲稿"""
+        self.current_slide_number = slide_number
+        self.speech_manager.sync_to_slide(slide_number)
 
+    def build_gesture_index(self):
+        """建立 检测到的手势名称 -> 手势配置 的索引，修改配置后需重新调用"""
+        index: Dict[str, List[str]] = {}
         for config_key, config in self.gesture_configs.items():
-            if not config.enabled:
-                continue
-
-            matched = False
-            confidence = 0.0
-
-            # 根据手势类型进行匹配
             if config.gesture_type == GestureType.STATIC:
-                # 静态手势匹配
-                for gesture_name, gesture_confidence in detected_gestures.items():
-                    if self.matches_static_pattern(gesture_name, config):
-                        confidence = gesture_confidence
-                        matched = True
-                        break
-
-            elif config.gesture_type == GestureType.DYNAMIC:
-                # 动态手势匹配
-                if config.motion_pattern in detected_gestures:
-                    confidence = detected_gestures[config.motion_pattern]
-                    matched = True            # 检查置信度阈值
-            if matched and confidence >= config.confidence_threshold:
-                # 检查持续时间要求
-                if config.hold_duration > 0:
-                    if config_key not in self.gesture_detector.last_gesture_time:
-                        self.gesture_detector.last_gesture_time[config_key] = current_time
-                    elif current_time - self.gesture_detector.last_gesture_time[config_key] >= config.hold_duration:
-                        self.execute_custom_action(config.action)
-                        self.gesture_detector.last_gesture_time[config_key] = current_time
-                        # 记录命令执行时间，开始冷却
-                        self.last_command_execution_time = current_time
-                        print(f" 执行命令: {config.name}, 冷却{self.command_cooldown_duration}秒")
+                names = [name for name in STATIC_GESTURE_PATTERNS if self.matches_static_pattern(name, config)]
+            elif config.gesture_type == GestureType.DYNAMIC and config.motion_pattern:
+                names = [config.motion_pattern]
+            else:
+                names = []
+            for name in names:
+                index.setdefault(name, []).append(config_key)
+        self.gesture_index = index
+
+    def match_and_execute_gestures(self, detected_gestures: Dict[str, float], current_time: float):
+        """
+        匹配检测到的手势并推进各手势的状态机:
+        空闲 -> 待触发 (越过进入阈值) -> 已触发 (执行动作，进入不应期) -> 等待松开 (低于退出阈值后回到空闲)
+
+        只处理本帧检测到的手势和非空闲状态的手势，与配置总数无关
+        """
+        blocked = self._blocked_motions(current_time)
+        confidences: Dict[str, float] = {}
+        for gesture_name, gesture_confidence in detected_gestures.items():
+            for config_key in self.gesture_index.get(gesture_name, ()):
+                if gesture_name in blocked and config_key not in self.gesture_states:
+                    # 刚触发的滑动的回手动作: 不触发，整段运动结束 (松开) 后才能再次触发
+                    config = self.gesture_configs[config_key]
+                    if config.enabled and gesture_confidence >= config.confidence_threshold:
+                        self.gesture_states[config_key] = GestureTracker(GestureState.RELEASE_REQUIRED, current_time)
+                confidences[config_key] = max(confidences.get(config_key, 0.0), gesture_confidence)
+
+        for config_key in set(confidences) | set(self.gesture_states):
+            config = self.gesture_configs.get(config_key)
+            if config is None or not config.enabled:
+                self._reset_gesture_state(config_key)
+                continue
+            self._step_gesture_state(config_key, config, confidences.get(config_key, 0.0), current_time)
+
+    def _step_gesture_state(self, config_key: str, config: GestureConfig, confidence: float, current_time: float):
+        """推进一个手势配置的状态机"""
+        tracker = self.gesture_states.get(config_key)
+        if tracker is None:
+            if confidence < config.confidence_threshold:
+                return
+            tracker = GestureTracker(GestureState.ARMED, current_time)
+            self.gesture_states[config_key] = tracker
+            self._trace_threshold_crossed(config_key, config, confidence)
+
+        released = confidence < config.get_exit_threshold()
+        if (released and config.gesture_type == GestureType.DYNAMIC and tracker.state != GestureState.ARMED
+                and self.hand_present and not self.gesture_detector.motion_window_ready()):
+            # 触发后轨迹已清空，需积累完整窗口才能判断运动是否已停止
+            released = False
+
+        if tracker.state == GestureState.ARMED:
+            if released:
+                # 未触发就松开的手势实例
+                self._reset_gesture_state(config_key, current_time)
+            elif current_time - tracker.since >= config.hold_duration:
+                self.execute_custom_action(config.action, self._take_trace_id(config_key, config))
+                tracker.state = GestureState.FIRED
+                tracker.fired_at = current_time
+                if config.gesture_type == GestureType.DYNAMIC:
+                    # 已触发的轨迹不再参与判断，只保留当前位置作为新窗口的起点
+                    history = self.gesture_detector.position_history
+                    self.gesture_detector.position_history = history[-1:]
+                print(f" 执行命令: {config.name}")
+        elif tracker.state == GestureState.FIRED:
+            if current_time - tracker.fired_at >= config.refractory_period:
+                if released:
+                    self._reset_gesture_state(config_key, current_time)
                 else:
-                    # 防止重复触发
-                    if config_key not in self.gesture_detector.last_gesture_time or \
-                            current_time - self.gesture_detector.last_gesture_time[config_key] > 1.0:
-                        self.execute_custom_action(config.action)
-                        self.gesture_detector.last_gesture_time[config_key] = current_time
-                        # 记录命令执行时间，开始冷却
-                        self.last_command_execution_time = current_time
-                        print(f" 执行命令: {config.name}, 冷却{self.command_cooldown_duration}秒")
+                    tracker.state = GestureState.RELEASE_REQUIRED
+        elif released:
+            self._reset_gesture_state(config_key, current_time)
+
+    def _blocked_motions(self, current_time: float) -> set:
+        """
+        当前被屏蔽的运动模式: 已触发且尚未松开的滑动的反方向，
+        以及松开后一个不应期内的反方向
+        """
+        blocked = set()
+        for config_key, tracker in self.gesture_states.items():
+            config = self.gesture_configs.get(config_key)
+            if config is not None and config.gesture_type == GestureType.DYNAMIC and tracker.fired_at is not None \
+                    and config.motion_pattern in OPPOSITE_MOTIONS:
+                blocked.add(OPPOSITE_MOTIONS[config.motion_pattern])
+        for motion, until in list(self.motion_blocks.items()):
+            if current_time < until:
+                blocked.add(motion)
             else:
-                # 重置持续时间计时器
-                if config_key in self.gesture_detector.last_gesture_time:
-                    del self.gesture_detector.last_gesture_time[config_key]
+                del self.motion_blocks[motion]
+        return blocked
+
+    def _reset_gesture_state(self, config_key: str, current_time: Optional[float] = None):
+        """手势回到空闲状态"""
+        tracker = self.gesture_states.pop(config_key, None)
+        config = self.gesture_configs.get(config_key)
+        if tracker is not None and tracker.fired_at is not None and current_time is not None and config is not None \
+                and config.motion_pattern in OPPOSITE_MOTIONS:
+            # 滑动松开后的一个不应期内仍屏蔽反方向
+            opposite = OPPOSITE_MOTIONS[config.motion_pattern]
+            self.motion_blocks[opposite] = max(self.motion_blocks.get(opposite, 0.0),
+                                               current_time + config.refractory_period)
+        # 已触发的实例由动作执行器结束，这里只会结束未触发就松开的实例
+        self.tracer.end(self.active_traces.pop(config_key, None), "gesture",
+                        args={"outcome": "released"})
+
+    def adjust_refractory_periods(self, delta: float):
+        """调整所有手势的不应期"""
+        for config in self.gesture_configs.values():
+            config.refractory_period = round(min(2.0, max(0.0, config.refractory_period + delta)), 2)
+
+    def _trace_threshold_crossed(self, config_key: str, config: GestureConfig, confidence: float):
+        """手势置信度越过阈值: 开始一个手势实例并补记采集、关键点时间"""
+        if not self.tracer.enabled or not self.capture_times:
+            return
+        frame_time = self.capture_times[-1]
+        # 动态手势从滑动窗口(10帧)起点算起，静态手势从当前帧算起
+        if config.gesture_type == GestureType.DYNAMIC:
+            window = min(10, len(self.capture_times))
+            start_time = self.capture_times[-window]
+        else:
+            start_time = frame_time
+        trace_id = self.tracer.begin("gesture", start_time, args={"gesture": config.name})
+        self.tracer.step(trace_id, "frame_capture", frame_time)
+        self.tracer.step(trace_id, "landmarks_ready", self.landmarks_time)
+        self.tracer.step(trace_id, "threshold_crossed", args={"confidence": round(confidence, 3)})
+        self.active_traces[config_key] = trace_id
+
+    def _take_trace_id(self, config_key: str, config: GestureConfig) -> Optional[int]:
+        """取出即将触发的手势实例id，之后的结束事件由动作执行器记录"""
+        if not self.tracer.enabled:
+            return None
+        trace_id = self.active_traces.get(config_key)
+        if trace_id is None:
+            # 持续保持的手势再次触发，从当前时刻开始新的实例
+            trace_id = self.tracer.begin("gesture", args={"gesture": config.name, "repeat": True})
+        self.active_traces[config_key] = None
+        return trace_id
 
     def matches_static_pattern(self, gesture_name: str, config: GestureConfig) -> bool:
         """检查静态手势是否匹配配置模式"""
         # 简化的匹配逻辑，实际可以更复杂
-        pattern_map = {
-            "fist": [0, 0, 0, 0, 0],
-            "point": [0, 1, 0, 0, 0],
-            "thumb_up": [1, 0, 0, 0, 0],
-            "peace": [0, 1, 1, 0, 0],
-            "ok": [1, 1, 0, 0, 0],
-            "three": [0, 1, 1, 1, 0],
-            "four": [0, 1, 1, 1, 1],
-            "open_hand": [1, 1, 1, 1, 1]
-        }
-
-        if gesture_name in pattern_map and config.finger_pattern:
-            return pattern_map[gesture_name] == config.finger_pattern
+        if gesture_name in STATIC_GESTURE_PATTERNS and config.finger_pattern:
+            return STATIC_GESTURE_PATTERNS[gesture_name] == config.finger_pattern
         return False
 
     def draw_ui(self, img, detected_gestures: Dict[str, float], lmList):
@@ -568,19 +873,19 @@ class UnifiedPPTGestureController:
             ppt_info = f"文件: {ppt_name}"
             img = put_text_auto(img, ppt_info, (10, 90), 18, (255, 255, 255))
 
-        # 绘制命令冷却状态信息
-        current_time = time.time()
-        time_since_execution = current_time - self.last_command_execution_time
-        cooldown_remaining = max(0, self.command_cooldown_duration - time_since_execution)
-
-        if cooldown_remaining > 0:
-            cooldown_text = f"命令冷却中: {cooldown_remaining:.1f}秒 (冷却时长: {self.command_cooldown_duration}秒)"
-            color = (0, 165, 255)  # 橙色表示冷却中
+        # 绘制手势状态信息 (只列出非空闲的手势)
+        state_names = {GestureState.ARMED: "待触发", GestureState.FIRED: "已触发",
+                       GestureState.RELEASE_REQUIRED: "等待松开"}
+        if self.gesture_states:
+            state_text = "  ".join(f"{self.gesture_configs[key].name}: {state_names[tracker.state]}"
+                                   for key, tracker in self.gesture_states.items()
+                                   if key in self.gesture_configs)
+            color = (0, 165, 255)  # 橙色表示有手势进行中
         else:
-            cooldown_text = f"可执行命令 (冷却时长: {self.command_cooldown_duration}秒)"
+            state_text = "可执行命令"
             color = (0, 255, 0)  # 绿色表示可执行
 
-        img = put_text_auto(img, cooldown_text, (10, 120), 16, color)
+        img = put_text_auto(img, state_text, (10, 120), 16, color)
 
         # 绘制检测到的手势
         y_offset = 150
@@ -591,6 +896,12 @@ class UnifiedPPTGestureController:
                            cv.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
                 y_offset += 25
 
+        # 绘制当前页/下一页缩略图预览 (右上角)
+        if self.show_slide_preview and self.ppt_controller.current_ppt_path:
+            current_slide = self.current_slide_number or self.speech_manager.get_current_slide_number()
+            draw_slide_preview(img, self.thumbnail_cache, self.ppt_controller.current_ppt_path,
+                               current_slide, (w - 130, 10), width=120)
+
         # 绘制激光指示器
         if self.laser_point and self.ppt_controller.is_presentation_active:
             cv.circle(img, self.laser_point, 10, (0, 0, 255), -1)
@@ -605,6 +916,9 @@ class UnifiedPPTGestureController:
         if self.show_help:
             self.draw_help_overlay(img)
 
+        # put_text_auto 渲染中文时返回新图像，需要把最终结果返回给调用方
+        return img
+
     def draw_help_overlay(self, img):
         """绘制帮助覆盖层"""
         h, w = img.shape[:2]
@@ -620,7 +934,7 @@ class UnifiedPPTGestureController:
             "",
             "系统特性:",
             "✓ 实时手势检测",
-            "✓ 命令执行后冷却防误触",
+            "✓ 触发后需松开手势，防止重复触发",
             "",            "按键控制:",
             "H - 显示/隐藏帮助",
             "C - 校准模式",
@@ -628,8 +942,9 @@ class UnifiedPPTGestureController:
             "T - 文本输入匹配模式",
             "N - 演讲稿下一段",
             "P - 演讲稿上一段",
-            "+ - 增加冷却时间",
-            "- - 减少冷却时间",
+            "F - 性能分析叠加层",
+            "+ - 增加不应期",
+            "- - 减少不应期",
             "Q/ESC - 退出程序"
         ]
 
@@ -641,15 +956,19 @@ class UnifiedPPTGestureController:
         # 半透明效果
         cv.addWeighted(img, 0.3, overlay, 0.7, 0, img)
 
-    def execute_custom_action(self, action):
-        """执行自定义动作，包括演讲稿相关功能"""
+    def execute_custom_action(self, action, trace_id: Optional[int] = None):
+        """执行自定义动作，包括演讲稿相关功能 (trace_id 关联手势延迟追踪)"""
         try:
             if hasattr(action, 'value'):
                 action_str = action.value
             else:
                 action_str = str(action)
+            self.tracer.step(trace_id, "dispatch", args={"action": action_str})
             
             # 处理演讲稿相关动作
+            if action_str in ("speech_scroll_toggle", "speech_next", "speech_prev"):
+                # 演讲稿动作在本线程同步完成
+                self.tracer.end(trace_id, "gesture", args={"action": action_str})
             if action_str == "speech_scroll_toggle":
                 self.toggle_speech_scroll()
             elif action_str == "speech_next":
@@ -657,8 +976,8 @@ class UnifiedPPTGestureController:
             elif action_str == "speech_prev":
                 self.speech_prev_segment()
             else:
-                # 其他动作交给PPT控制器处理
-                self.ppt_controller.execute_action(action)
+                # 其他动作交给PPT动作执行器异步处理
+                self.action_executor.submit(action, trace_id=trace_id)
                 
         except Exception as e:
             print(f"❌ 执行动作失败 ({action_str}): {e}")
@@ -670,6 +989,8 @@ class UnifiedPPTGestureController:
         if self.show_speech_scroll:
             if self.speech_display is None:
                 self.speech_display = SpeechScrollDisplay(self.speech_manager)
+            if self.ppt_controller.current_ppt_path:
+                self.speech_display.set_slide_preview(self.thumbnail_cache, self.ppt_controller.current_ppt_path)
             print("📺 演讲稿滚动显示已开启")            # 在新线程中启动显示窗口
             import threading
             display_thread = threading.Thread(target=self.speech_display.show_display, daemon=True)
@@ -702,7 +1023,7 @@ class UnifiedPPTGestureController:
             print(f"🎯 演讲稿匹配成功，建议切换到幻灯片 {current_slide}")
             # 如果启用自动滚动，可以自动切换幻灯片
             if self.speech_manager.auto_scroll_enabled:
-                self.ppt_controller.jump_to_slide(current_slide)
+                self.action_executor.submit(PPTAction.JUMP_TO_PAGE, current_slide)
     
     def handle_text_input(self):
         """处理文本输入匹配"""
@@ -750,7 +1071,10 @@ class UnifiedPPTGestureController:
         print(" 按 'H' 显示帮助，按 'Q' 退出")
         print("=" * 60)
 
-        cap = cv.VideoCapture(0)
+        # 共享摄像头: 录屏画中画可同时使用同一路画面，每帧只解码一次
+        phase_start = time.perf_counter()
+        cap = open_shared_camera(0)
+        self.startup_timings["camera_open"] = (time.perf_counter() - phase_start) * 1000
         pTime = 0
 
         # 设置摄像头参数
@@ -758,14 +1082,20 @@ class UnifiedPPTGestureController:
         cap.set(cv.CAP_PROP_FRAME_HEIGHT, 480)
         cap.set(cv.CAP_PROP_FPS, 30)
 
+        profiler = self.profiler
         while self.running:
-            success, img = cap.read()
+            frame_start = time.perf_counter()
+            with profiler.stage("capture"):
+                success, img = cap.read()
+            self.capture_times.append(time.perf_counter())
             if not success:
                 print(" 无法读取摄像头")
                 break
 
             # 处理当前帧
             img = self.process_frame(img)
+            if self.show_profiler:
+                profiler.draw_overlay(img)
 
             # 计算FPS
             cTime = time.time()
@@ -775,8 +1105,17 @@ class UnifiedPPTGestureController:
             self.frame_count += 1
 
             # 显示图像
-            cv.imshow('统一PPT手势识别播放器', img)            # 处理按键
-            key = cv.waitKey(1) & 0xFF
+            with profiler.stage("imshow"):
+                cv.imshow('统一PPT手势识别播放器', img)
+            if "time_to_first_frame" not in self.startup_timings:
+                self.startup_timings["time_to_first_frame"] = (time.perf_counter() - _IMPORT_START) * 1000
+            if not self.startup_reported and not any(t.is_alive() for t in self.startup_threads):
+                self.report_startup_timings()
+
+            # 处理按键
+            with profiler.stage("waitKey"):
+                key = cv.waitKey(1) & 0xFF
+            profiler.record("frame", (time.perf_counter() - frame_start) * 1000)
             if key == ord('q') or key == 27:  # Q或ESC退出
                 self.running = False
             elif key == ord('h'):  # H显示/隐藏帮助
@@ -792,16 +1131,23 @@ class UnifiedPPTGestureController:
                 self.speech_next_segment()
             elif key == ord('p'):  # P键演讲稿上一段
                 self.speech_prev_segment()
-            elif key == ord('+') or key == ord('='):  # +键增加冷却时间
-                self.command_cooldown_duration = min(5.0, self.command_cooldown_duration + 0.5)
-                print(f"命令冷却时间增加到: {self.command_cooldown_duration}秒")
-            elif key == ord('-'):  # -键减少冷却时间
-                self.command_cooldown_duration = max(0.5, self.command_cooldown_duration - 0.5)
-                print(f"命令冷却时间减少到: {self.command_cooldown_duration}秒")
+            elif key == ord('o'):  # O键打开后台找到的PPT (快速启动模式)
+                self.open_pending_ppt()
+            elif key == ord('f'):  # F键显示/隐藏性能分析叠加层
+                self.show_profiler = not self.show_profiler
+            elif key == ord('+') or key == ord('='):  # +键增加所有手势的不应期
+                self.adjust_refractory_periods(0.1)
+                print("手势不应期增加0.1秒")
+            elif key == ord('-'):  # -键减少所有手势的不应期
+                self.adjust_refractory_periods(-0.1)
+                print("手势不应期减少0.1秒")
 
         # 清理资源
         cap.release()
         cv.destroyAllWindows()
+        self.action_executor.stop()
+        if hasattr(self.gesture_detector.detector, "close"):
+            self.gesture_detector.detector.close()  # 断开手部追踪服务 / 停止推理进程
 
         # 显示统计信息
         total_time = time.time() - self.start_time
@@ -810,13 +1156,41 @@ class UnifiedPPTGestureController:
         print(f"   总运行时间: {total_time:.1f}秒")
         print(f"   处理帧数: {self.frame_count}")
         print(f"   平均FPS: {avg_fps:.1f}")
+        if self.profiler.export_json(self.profile_export_path):
+            print(f"   分阶段耗时已导出: {self.profile_export_path}")
+        if self.landmark_recorder is not None:
+            self.landmark_recorder.save()
+        if self.tracer.enabled and self.tracer.export(self.trace_export_path):
+            print(f"   手势延迟追踪已导出: {self.trace_export_path} (可用 Perfetto 打开)")
+        latency_stats = self.action_executor.get_latency_stats()
+        if latency_stats:
+            print(f"   PPT动作延迟 (合并命令 {self.action_executor.coalesced_count} 条):")
+            for action_str, stats in latency_stats.items():
+                print(f"     {action_str}: {stats['count']}次, 平均 {stats['avg_ms']:.0f}ms, "
+                      f"P95 {stats['p95_ms']:.0f}ms, 最大 {stats['max_ms']:.0f}ms")
         print("统一PPT手势识别播放器已退出")
 
 
 def main():
     """主函数"""
     try:
-        controller = UnifiedPPTGestureController()
+        # --fast-startup: 立即打开摄像头窗口，其余初始化在后台完成
+        # --hand-service: 使用常驻手部追踪服务进程; --hand-process: 独立推理进程
+        # --trace: 记录手势到动作的端到端延迟; --no-smoothing: 关闭关键点平滑
+        # --libreoffice: 通过UNO直接控制LibreOffice Impress (可获知真实页码)
+        get_tracer().enabled = "--trace" in sys.argv
+        hand_backend = "local"
+        if "--hand-service" in sys.argv:
+            hand_backend = "service"
+        elif "--hand-process" in sys.argv:
+            hand_backend = "process"
+        controller = UnifiedPPTGestureController(fast_startup="--fast-startup" in sys.argv,
+                                                 hand_backend=hand_backend,
+                                                 ppt_backend="libreoffice" if "--libreoffice" in sys.argv else "keyboard",
+                                                 smoothing="--no-smoothing" not in sys.argv)
+        # --record-landmarks <文件>: 录制关键点，供 landmark_replay.py 回放
+        if "--record-landmarks" in sys.argv:
+            controller.landmark_recorder = LandmarkRecorder(sys.argv[sys.argv.index("--record-landmarks") + 1])
         controller.run()
     except KeyboardInterrupt:
         print("\n用户中断程序")
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+离线视频批处理
+Offline Video Batch Processor
+
+对录制好的视频文件 (例如录屏助手输出的 video_*.mp4) 离线运行手势识别:
+1. 后台线程解码视频，与MediaPipe推理重叠
+2. MediaPipe 可选静态图片模式 (逐帧独立检测) 或视频模式 (帧间跟踪)
+3. 手势识别与动作匹配复用主程序逻辑，动作由模拟PPT控制器记录
+4. 每个视频输出逐帧CSV和JSON汇总
+5. 多个视频用进程池并行处理
+
+用法:
+    python video_batch_processor.py <视频或目录> [...] [--output-dir batch_results]
+                                    [--workers N] [--static] [--no-mirror]
+                                    [--config gesture_config.json] [--save-landmarks]
+                                    [--no-smoothing] [--max-hands 2]
+
+注意: 主程序先水平镜像摄像头画面再检测，因此默认同样镜像每一帧，左右滑动才与实时一致。
+      若视频本身已是镜像画面 (例如录下的主程序窗口)，请加 --no-mirror。
+"""
+
+import csv
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import cv2 as cv
+import numpy as np
+
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+
+
+class BackgroundVideoReader:
+    """后台解码线程 + 有界队列，迭代得到 (帧序号, 时间戳秒, 帧)"""
+
+    def __init__(self, path: str, queue_size: int = 32):
+        self.path = path
+        self.capture = cv.VideoCapture(path)
+        self.fps = self.capture.get(cv.CAP_PROP_FPS) or 30.0
+        self.frame_count = int(self.capture.get(cv.CAP_PROP_FRAME_COUNT) or 0)
+        self.frames: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.stopped = False
+        self.thread = threading.Thread(target=self._read_loop, daemon=True)
+
+    def is_opened(self) -> bool:
+        return self.capture.isOpened()
+
+    def _read_loop(self):
+        index = 0
+        try:
+            while not self.stopped:
+                success, frame = self.capture.read()
+                if not success:
+                    break
+                position_ms = self.capture.get(cv.CAP_PROP_POS_MSEC)
+                timestamp = position_ms / 1000.0 if position_ms > 0 else index / self.fps
+                self.frames.put((index, timestamp, frame))
+                index += 1
+        finally:
+            self.frames.put(None)
+            self.capture.release()
+
+    def __iter__(self) -> Iterator[Tuple[int, float, np.ndarray]]:
+        self.thread.start()
+        while True:
+            item = self.frames.get()
+            if item is None:
+                break
+            yield item
+
+    def stop(self):
+        self.stopped = True
+        # 取走队列中的帧，让阻塞在 put 上的解码线程退出
+        while self.thread.is_alive():
+            try:
+                self.frames.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
+def process_video(path: str, output_dir: str, static_mode: bool = False, mirror: bool = True,
+                  config_file: str = "gesture_config.json", save_landmarks: bool = False,
+                  smoothing: bool = True, max_hands: int = 2) -> Dict:
+    """
+    处理单个视频 (在进程池的工作进程中运行)
+
+    Returns:
+        汇总信息字典
+    """
+    import handTrackingModule as hmt
+    from landmark_replay import LandmarkRecorder, MockPPTController
+    from unified_ppt_gesture_controller import UnifiedPPTGestureController
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    reader = BackgroundVideoReader(path)
+    if not reader.is_opened():
+        return {"video": path, "error": "无法打开视频"}
+
+    # 除静态图片模式外与主程序使用相同的检测参数，离线结果才能代表实时行为
+    detector = hmt.handDetector(mode=static_mode, maxHands=max_hands, smoothing=smoothing)
+    mock = MockPPTController()
+    controller = UnifiedPPTGestureController(config_file=config_file, ppt_controller=mock, headless=True,
+                                             smoothing=smoothing)
+    recorder = LandmarkRecorder(os.path.join(output_dir, f"{name}.landmarks.npz")) if save_landmarks else None
+
+    os.makedirs(output_dir, exist_ok=True)
+    csv_path = os.path.join(output_dir, f"{name}.gestures.csv")
+    start = time.perf_counter()
+    frames = 0
+    hand_frames = 0
+    gesture_counts: Dict[str, int] = {}
+
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(["frame", "time_s", "hand", "gestures", "actions"])
+        try:
+            for index, timestamp, frame in reader:
+                if mirror:
+                    frame = cv.flip(frame, 1)
+                # 用视频时间戳驱动平滑滤波，结果与处理速度无关
+                detector.findHands(frame, draw=False, timestamp=timestamp)
+                lm_list = detector.findPosition(frame, draw=False)
+                if recorder is not None:
+                    recorder.add(timestamp, lm_list, frame.shape)
+
+                actions_before = len(mock.actions)
+                mock.clock = timestamp
+                detected = controller.process_landmarks(lm_list, timestamp)
+                new_actions = mock.actions[actions_before:]
+
+                frames += 1
+                hand_frames += bool(lm_list)
+                for gesture_name in detected:
+                    gesture_counts[gesture_name] = gesture_counts.get(gesture_name, 0) + 1
+                writer.writerow([
+                    index, f"{timestamp:.3f}", int(bool(lm_list)),
+                    ";".join(f"{g}:{c:.2f}" for g, c in detected.items()),
+                    ";".join(a["action"] for a in new_actions)
+                ])
+        finally:
+            reader.stop()
+            controller.action_executor.stop()
+
+    if recorder is not None:
+        recorder.save()
+
+    elapsed = time.perf_counter() - start
+    action_counts: Dict[str, int] = {}
+    for action in mock.actions:
+        action_counts[action["action"]] = action_counts.get(action["action"], 0) + 1
+    summary = {
+        "video": path,
+        "mode": "static" if static_mode else "video",
+        "frames": frames,
+        "hand_frames": hand_frames,
+        "video_fps": reader.fps,
+        "processing_fps": frames / elapsed if elapsed > 0 else 0.0,
+        "elapsed_s": elapsed,
+        "gesture_counts": gesture_counts,
+        "action_counts": action_counts,
+        "actions": mock.actions,
+        "csv": csv_path,
+    }
+    with open(os.path.join(output_dir, f"{name}.summary.json"), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
+
+
+def collect_videos(paths: List[str]) -> List[str]:
+    """展开目录，返回视频文件列表"""
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(VIDEO_EXTENSIONS):
+                    videos.append(os.path.join(path, name))
+        elif os.path.isfile(path):
+            videos.append(path)
+        else:
+            print(f"⚠️  跳过不存在的路径: {path}")
+    return videos
+
+
+def process_videos(videos: List[str], output_dir: str, workers: Optional[int] = None, **options) -> List[Dict]:
+    """用进程池并行处理多个视频"""
+    workers = workers or max(1, min(len(videos), (os.cpu_count() or 2) - 1))
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(process_video, video, output_dir, **options): video for video in videos}
+        for future in as_completed(futures):
+            video = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                summary = {"video": video, "error": str(e)}
+            if "error" in summary:
+                print(f"❌ {os.path.basename(video)}: {summary['error']}")
+            else:
+                print(f"✅ {os.path.basename(video)}: {summary['frames']}帧, "
+                      f"{summary['processing_fps']:.0f} fps, 动作 {summary['action_counts']}")
+            results.append(summary)
+    return results
+
+
+def main():
+    """命令行入口"""
+    args = sys.argv[1:]
+    options = {"static_mode": "--static" in args, "mirror": "--no-mirror" not in args,
+               "save_landmarks": "--save-landmarks" in args, "smoothing": "--no-smoothing" not in args}
+    output_dir = "batch_results"
+    workers = None
+    paths = []
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg == "--output-dir":
+            output_dir = args[index + 1]
+            index += 1
+        elif arg == "--workers":
+            workers = int(args[index + 1])
+            index += 1
+        elif arg == "--max-hands":
+            options["max_hands"] = int(args[index + 1])
+            index += 1
+        elif arg == "--config":
+            options["config_file"] = args[index + 1]
+            index += 1
+        elif not arg.startswith("--"):
+            paths.append(arg)
+        index += 1
+
+    videos = collect_videos(paths)
+    if not videos:
+        print(__doc__)
+        return 2
+
+    start = time.perf_counter()
+    results = process_videos(videos, output_dir, workers, **options)
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "batch_summary.json"), 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    total_frames = sum(r.get("frames", 0) for r in results)
+    print(f"批处理完成: {len(videos)}个视频, {total_frames}帧, 耗时 {time.perf_counter() - start:.1f}秒")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,12 +16,14 @@
 import cv2 as cv
 import numpy as np
 import pyaudio
-import wave
 import threading
 import time
 import json
 import os
 import subprocess
+import struct
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Tuple, Optional, Callable
 from dataclasses import dataclass, asdict
@@ -34,6 +36,7 @@ import mss
 import ffmpeg
 
 # 导入现有模块
+from camera_broker import open_shared_camera
 from speech_text_manager import SpeechTextManager, TextMatcher
 from chinese_text_renderer import put_text_auto
 
@@ -61,7 +64,121 @@ class RecordingConfig:
     video_fps: int = 30            # 视频帧率
     audio_sample_rate: int = 44100  # 音频采样率
     camera_position: str = "bottom_right"  # 摄像头位置 
-    camera_size: tuple = (320, 240)  # 摄像头大小
+    camera_size: tuple = (320, 240)  # 摄像头画中画大小 (宽, 高)
+    audio_fsync_interval: float = 2.0  # 音频落盘(fsync)及WAV头回写间隔(秒)
+    audio_queue_size: int = 256     # 音频写入队列最大块数
+    video_encoder: str = "opencv"   # 编码方式: "opencv"(mp4v+录后合并) 或 "ffmpeg_pipe"(实时管道编码)
+    video_codec: str = "libx264"    # ffmpeg_pipe 模式的视频编码器
+    video_preset: str = "veryfast"  # ffmpeg_pipe 模式的编码预设
+    video_crf: int = 23             # ffmpeg_pipe 模式的画质参数(CRF)
+    frame_buffer_count: int = 4     # 采集/编码线程间循环复用的预分配帧缓冲数
+    capture_workers: int = 0        # 颜色转换的工作线程数 (0表示在采集线程内完成)
+    skip_unchanged_frames: bool = False  # 屏幕无变化时跳过转换，直接让编码线程重复上一帧
+    change_detect_scale: int = 16   # 变化检测缩略图的缩小倍数
+    change_threshold: int = 2       # 缩略图像素最大差值不超过该值视为无变化
+    output_scale: float = 1.0       # 输出画面缩放比例
+
+
+class StreamingWavWriter:
+    """流式WAV写入器
+
+    后台线程把音频块增量写入磁盘，内存占用与录制时长无关。
+    每隔 fsync_interval 秒回写一次WAV头中的长度字段并fsync，
+    即使程序崩溃，文件也是一个包含截至上次落盘数据的合法WAV。
+    """
+
+    HEADER_SIZE = 44
+
+    def __init__(self, output_path: str, channels: int, sample_width: int, rate: int,
+                 fsync_interval: float = 2.0, queue_size: int = 256):
+        self.output_path = output_path
+        self.channels = channels
+        self.sample_width = sample_width
+        self.rate = rate
+        self.fsync_interval = fsync_interval
+
+        self.data_bytes = 0
+        self.dropped_chunks = 0
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+        self.file = open(output_path, 'wb')
+        self.file.write(self._build_header(0))
+        self.file.flush()
+
+        self.writer_thread = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer_thread.start()
+
+    def _build_header(self, data_bytes: int) -> bytes:
+        """构造44字节的PCM WAV文件头"""
+        byte_rate = self.rate * self.channels * self.sample_width
+        block_align = self.channels * self.sample_width
+        return struct.pack(
+            '<4sI4s4sIHHIIHH4sI',
+            b'RIFF', 36 + data_bytes, b'WAVE',
+            b'fmt ', 16, 1, self.channels, self.rate,
+            byte_rate, block_align, self.sample_width * 8,
+            b'data', data_bytes
+        )
+
+    def write(self, data: bytes):
+        """提交一块音频数据（在音频回调线程中调用，不阻塞；队列满或已停止时丢弃并计数）"""
+        if self.stop_event.is_set():
+            self.dropped_chunks += 1
+            return
+        try:
+            self.queue.put_nowait(data)
+        except queue.Full:
+            self.dropped_chunks += 1
+
+    def _patch_header(self):
+        """回写WAV头中的长度字段并落盘"""
+        position = self.file.tell()
+        self.file.seek(0)
+        self.file.write(self._build_header(self.data_bytes))
+        self.file.seek(position)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def _write_loop(self):
+        """后台写入线程 (文件由本线程独占，退出时回写文件头并关闭)"""
+        last_sync = time.monotonic()
+        try:
+            while True:
+                try:
+                    data = self.queue.get(timeout=min(0.5, self.fsync_interval))
+                except queue.Empty:
+                    if self.stop_event.is_set():
+                        break  # 已停止且队列已写完
+                    data = b''
+                if data is None:
+                    break
+                if data:
+                    self.file.write(data)
+                    self.data_bytes += len(data)
+                if time.monotonic() - last_sync >= self.fsync_interval:
+                    self._patch_header()
+                    last_sync = time.monotonic()
+        except (OSError, ValueError) as e:
+            print(f"❌ 音频写入失败: {e}")
+        finally:
+            try:
+                self._patch_header()
+            except (OSError, ValueError) as e:
+                print(f"❌ 音频文件头回写失败: {e}")
+            self.file.close()
+
+    def close(self, timeout: float = 5.0):
+        """通知写入线程写完剩余数据并收尾（写入线程卡住时最多等待 timeout 秒，之后由它自行关闭文件）"""
+        self.stop_event.set()
+        try:
+            self.queue.put(None, timeout=0.5)
+        except queue.Full:
+            pass  # 写入线程取空队列后会因 stop_event 退出
+        self.writer_thread.join(timeout)
+        if self.writer_thread.is_alive():
+            print(f"⚠️  音频写入线程未在{timeout}秒内结束，将在写完后自行关闭文件")
+        if self.dropped_chunks:
+            print(f"⚠️  音频写入队列溢出，丢弃 {self.dropped_chunks} 个数据块")
 
 
 class AudioRecorder:
@@ -70,8 +187,10 @@ class AudioRecorder:
     def __init__(self, config: RecordingConfig):
         self.config = config
         self.is_recording = False
-        self.audio_data = []
         self.audio_thread = None
+        self.wav_writer = None
+        self.output_path = None
+        self.audio_sink = None  # 额外的音频数据接收者 (如ffmpeg管道)
         
         # 音频配置
         self.format = pyaudio.paInt16
@@ -82,15 +201,24 @@ class AudioRecorder:
         self.audio = pyaudio.PyAudio()
         self.stream = None
         
-    def start_recording(self):
-        """开始录制音频"""
+    def start_recording(self, output_path: str):
+        """开始录制音频，数据边录边写入 output_path"""
         if self.is_recording:
             return
             
         self.is_recording = True
-        self.audio_data = []
+        self.output_path = output_path
         
         try:
+            self.wav_writer = StreamingWavWriter(
+                output_path,
+                channels=self.channels,
+                sample_width=self.audio.get_sample_size(self.format),
+                rate=self.rate,
+                fsync_interval=self.config.audio_fsync_interval,
+                queue_size=self.config.audio_queue_size
+            )
+            
             self.stream = self.audio.open(
                 format=self.format,
                 channels=self.channels,
@@ -106,19 +234,24 @@ class AudioRecorder:
         except Exception as e:
             print(f"❌ 音频录制启动失败: {e}")
             self.is_recording = False
+            if self.wav_writer:
+                self.wav_writer.close()
+                self.wav_writer = None
     
     def _record_audio(self):
         """录制音频线程"""
         while self.is_recording:
             try:
                 data = self.stream.read(self.chunk, exception_on_overflow=False)
-                self.audio_data.append(data)
+                self.wav_writer.write(data)
+                if self.audio_sink:
+                    self.audio_sink(data)
             except Exception as e:
                 print(f"❌ 音频录制错误: {e}")
                 break
     
-    def stop_recording(self, output_path: str):
-        """停止录制并保存音频"""
+    def stop_recording(self, output_path: Optional[str] = None):
+        """停止录制并完成音频文件"""
         if not self.is_recording:
             return
             
@@ -130,16 +263,16 @@ class AudioRecorder:
         if self.stream:
             self.stream.stop_stream()
             self.stream.close()
+            self.stream = None
         
-        # 保存音频文件
+        # 完成音频文件（回写WAV头）
         try:
-            wf = wave.open(output_path, 'wb')
-            wf.setnchannels(self.channels)
-            wf.setsampwidth(self.audio.get_sample_size(self.format))
-            wf.setframerate(self.rate)
-            wf.writeframes(b''.join(self.audio_data))
-            wf.close()
-            print(f"🎵 音频已保存: {output_path}")
+            self.wav_writer.close()
+            self.wav_writer = None
+            if output_path and os.path.abspath(output_path) != os.path.abspath(self.output_path):
+                os.replace(self.output_path, output_path)
+                self.output_path = output_path
+            print(f"🎵 音频已保存: {self.output_path}")
         except Exception as e:
             print(f"❌ 音频保存失败: {e}")
     
@@ -147,9 +280,304 @@ class AudioRecorder:
         """清理资源"""
         if self.stream:
             self.stream.close()
+        if self.wav_writer:
+            self.wav_writer.close()
+            self.wav_writer = None
         self.audio.terminate()
 
 
+class FFmpegPipeWriter:
+    """ffmpeg管道视频写入器
+
+    接口与 cv.VideoWriter 一致 (write / isOpened / release)。
+    原始BGR帧通过stdin、PCM音频通过额外管道直接送入同一个ffmpeg进程，
+    边录边编码为H.264，停止录制时无需再做一次音视频合并。
+    """
+
+    def __init__(self, output_path: str, width: int, height: int, fps: int,
+                 config: RecordingConfig, audio_rate: Optional[int] = None,
+                 audio_channels: int = 1):
+        self.output_path = output_path
+        self.width = width
+        self.height = height
+        self.audio_rate = audio_rate
+        self.audio_channels = audio_channels
+        self.process = None
+        self.audio_fd = None
+        self.audio_queue = None
+        self.audio_thread = None
+        self.audio_started = False
+        self.dropped_audio_chunks = 0
+        self.stop_event = threading.Event()
+        self.start_time = None
+        self.audio_piped = audio_rate is not None and self.can_pipe_audio()
+
+        try:
+            video_input = ffmpeg.input(
+                'pipe:0', format='rawvideo', pix_fmt='bgr24',
+                s=f"{width}x{height}", framerate=fps
+            )
+            inputs = [video_input]
+            output_args = {
+                'vcodec': config.video_codec,
+                'preset': config.video_preset,
+                'crf': config.video_crf,
+                'pix_fmt': 'yuv420p'
+            }
+
+            pass_fds = ()
+            if self.audio_piped:
+                read_fd, self.audio_fd = os.pipe()
+                inputs.append(ffmpeg.input(
+                    f"pipe:{read_fd}", format='s16le',
+                    ar=audio_rate, ac=audio_channels
+                ))
+                output_args['acodec'] = 'aac'
+                pass_fds = (read_fd,)
+
+            args = ffmpeg.output(*inputs, output_path, **output_args) \
+                .global_args('-loglevel', 'error') \
+                .overwrite_output() \
+                .compile()
+            self.process = subprocess.Popen(args, stdin=subprocess.PIPE, pass_fds=pass_fds)
+
+            if self.audio_piped:
+                os.close(read_fd)
+                self.audio_queue = queue.Queue(maxsize=256)
+                self.audio_thread = threading.Thread(target=self._audio_loop, daemon=True)
+                self.audio_thread.start()
+        except Exception as e:
+            print(f"❌ ffmpeg编码进程启动失败: {e}")
+            self.process = None
+            self.audio_piped = False
+
+    @staticmethod
+    def can_pipe_audio() -> bool:
+        """是否支持通过额外文件描述符把音频送入ffmpeg (仅POSIX)"""
+        return os.name == 'posix'
+
+    def isOpened(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def write(self, frame):
+        """写入一帧BGR画面"""
+        if not self.isOpened():
+            return
+        if self.start_time is None:
+            self.start_time = time.monotonic()
+        if frame.shape[1] != self.width or frame.shape[0] != self.height:
+            frame = cv.resize(frame, (self.width, self.height))
+        try:
+            self.process.stdin.write(np.ascontiguousarray(frame).data)
+        except (BrokenPipeError, OSError) as e:
+            print(f"❌ ffmpeg视频管道写入失败: {e}")
+
+    def write_audio(self, data: bytes):
+        """写入一块PCM音频，首块前补足与视频起点之间的静音以保持同步"""
+        if not self.audio_piped or self.audio_queue is None:
+            return
+        if not self.audio_started:
+            self.audio_started = True
+            if self.start_time is not None:
+                gap_samples = int((time.monotonic() - self.start_time) * self.audio_rate)
+                silence = bytes(gap_samples * self.audio_channels * 2)
+                if silence:
+                    self._enqueue_audio(silence)
+        self._enqueue_audio(data)
+
+    def _enqueue_audio(self, data: bytes):
+        """非阻塞入队，队列满时丢弃并计数，不阻塞音频采集线程"""
+        try:
+            self.audio_queue.put_nowait(data)
+        except queue.Full:
+            self.dropped_audio_chunks += 1
+
+    def _audio_loop(self):
+        """音频管道写入线程"""
+        while True:
+            try:
+                data = self.audio_queue.get(timeout=0.5)
+            except queue.Empty:
+                if self.stop_event.is_set():
+                    break
+                continue
+            if data is None:
+                break
+            try:
+                os.write(self.audio_fd, data)
+            except OSError as e:
+                print(f"❌ ffmpeg音频管道写入失败: {e}")
+                break
+
+    def release(self, timeout: float = 5.0):
+        """关闭管道并等待ffmpeg写完文件尾"""
+        if self.audio_thread:
+            self.stop_event.set()
+            try:
+                self.audio_queue.put(None, timeout=0.5)
+            except queue.Full:
+                pass
+            self.audio_thread.join(timeout)
+            if self.audio_thread.is_alive():
+                print("⚠️  ffmpeg音频管道写入线程未能及时退出")
+            self.audio_thread = None
+            if self.dropped_audio_chunks:
+                print(f"⚠️  ffmpeg音频队列已满，丢弃了 {self.dropped_audio_chunks} 块音频")
+        if self.audio_fd is not None:
+            os.close(self.audio_fd)
+            self.audio_fd = None
+        if self.process:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+            self.process.wait()
+            self.process = None
+
+
+class FramePacer:
+    """基于单调时钟的帧节拍调度器
+
+    第 n 帧的输出时间固定为 t0 + n / fps，采集与处理耗时会自动从等待时间中扣除。
+    处理落后时重复上一帧补齐时间轴，提前时丢弃多余帧，保证输出时长与真实时长一致。
+    """
+
+    def __init__(self, fps: int):
+        self.fps = fps
+        self.interval = 1.0 / fps
+        self.start = None
+        self.emitted_frames = 0    # 已输出帧数 (含重复帧)
+        self.captured_frames = 0   # 实际采集帧数
+        self.duplicated_frames = 0 # 为补齐时间轴重复的帧数
+        self.dropped_frames = 0    # 因提前而丢弃的帧数
+
+    def frames_due(self, now: Optional[float] = None) -> int:
+        """登记一帧新采集的画面，返回它需要写入的次数 (0表示丢弃)"""
+        if now is None:
+            now = time.monotonic()
+        if self.start is None:
+            self.start = now
+        self.captured_frames += 1
+
+        due = int((now - self.start) * self.fps) + 1 - self.emitted_frames
+        if due <= 0:
+            self.dropped_frames += 1
+            return 0
+        self.duplicated_frames += due - 1
+        self.emitted_frames += due
+        return due
+
+    def wait(self):
+        """睡眠到下一帧的截止时间"""
+        if self.start is None:
+            return
+        delay = self.start + self.emitted_frames * self.interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def get_stats(self) -> Dict:
+        """获取帧率统计: 目标帧率、实际采集帧率、输出帧率和重复/丢弃帧数"""
+        elapsed = time.monotonic() - self.start if self.start is not None else 0
+        return {
+            "target_fps": self.fps,
+            "achieved_fps": self.captured_frames / elapsed if elapsed > 0 else 0.0,
+            "output_fps": self.emitted_frames / elapsed if elapsed > 0 else 0.0,
+            "captured_frames": self.captured_frames,
+            "output_frames": self.emitted_frames,
+            "duplicated_frames": self.duplicated_frames,
+            "dropped_frames": self.dropped_frames
+        }
+
+
+class CameraCompositor:
+    """摄像头画中画合成器
+
+    摄像头在独立线程中读取并缩放到画中画尺寸，只保留最新一帧；
+    录屏线程合成时只做一次切片赋值，屏幕帧率不受摄像头帧率和读取延迟影响。
+    """
+
+    def __init__(self, capture, size: tuple, position: str = "bottom_right", margin: int = 20):
+        self.capture = capture
+        self.width, self.height = size
+        self.position = position
+        self.margin = margin
+
+        # 双缓冲: 读取线程写后台缓冲，写完后与前台交换
+        self.lock = threading.Lock()
+        self.front = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        self.back = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        self.has_frame = False
+        self.frames_read = 0
+
+        self.offset_cache = {}  # 屏幕尺寸 -> 画中画左上角坐标
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """启动摄像头读取线程"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._read_loop, daemon=True)
+        self.thread.start()
+
+    def _read_loop(self):
+        """摄像头读取线程"""
+        while self.running:
+            try:
+                ret, frame = self.capture.read()
+            except Exception as e:
+                print(f"❌ 摄像头捕获错误: {e}")
+                break
+            if not ret:
+                time.sleep(0.01)
+                continue
+            cv.resize(frame, (self.width, self.height), dst=self.back)
+            with self.lock:
+                self.front, self.back = self.back, self.front
+                self.has_frame = True
+            self.frames_read += 1
+
+    def _get_offset(self, screen_height: int, screen_width: int):
+        """计算并缓存画中画位置"""
+        key = (screen_height, screen_width)
+        if key not in self.offset_cache:
+            w, h, m = self.width, self.height, self.margin
+            if self.position == "bottom_left":
+                x, y = m, screen_height - h - m
+            elif self.position == "top_right":
+                x, y = screen_width - w - m, m
+            elif self.position == "top_left":
+                x, y = m, m
+            else:
+                x, y = screen_width - w - m, screen_height - h - m  # 默认右下角
+            self.offset_cache[key] = (max(0, x), max(0, y))
+        return self.offset_cache[key]
+
+    def composite(self, screen_frame):
+        """把最新的摄像头画面合成到屏幕帧上"""
+        if not self.has_frame:
+            return screen_frame
+        if screen_frame is None:
+            with self.lock:
+                return self.front.copy()
+
+        screen_height, screen_width = screen_frame.shape[:2]
+        if self.width > screen_width or self.height > screen_height:
+            return screen_frame
+        x, y = self._get_offset(screen_height, screen_width)
+        with self.lock:
+            screen_frame[y:y + self.height, x:x + self.width] = self.front
+        return screen_frame
+
+    def stop(self):
+        """停止读取线程"""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+
+
 class VideoRecorder:
     """视频录制器"""
     
@@ -158,9 +586,27 @@ class VideoRecorder:
         self.is_recording = False
         self.screen_capture = None
         self.camera_capture = None
+        self.camera_compositor = None
         self.video_writer = None
         self.recording_thread = None
         self.start_time = None
+        self.frame_pacer = None
+        
+        # 采集线程 -> 编码线程的流水线
+        self.encoder_thread = None
+        self.encode_queue = None
+        self.free_buffers = None
+        self.frame_buffers = []
+        self.capture_pool = None
+        self.frame_size = (1920, 1080)  # 输出帧尺寸 (宽, 高)
+        self.error_frame = None  # 缓存的屏幕捕获错误画面
+        self.scaled_bgra = None  # 缩放输出时的BGRA中间缓冲
+        
+        # 屏幕变化检测
+        self.change_thumb = None  # 当前帧缩略图
+        self.last_thumb = None    # 上一次送编码的帧缩略图
+        self.unchanged_frames = 0 # 因画面无变化而跳过转换的帧数
+
     def initialize_captures(self):
         """初始化捕获设备"""
         # 初始化屏幕捕获
@@ -176,20 +622,26 @@ class VideoRecorder:
         # 初始化摄像头
         if self.config.enable_camera:
             try:
-                self.camera_capture = cv.VideoCapture(0)
+                # 与手势控制共用同一路摄像头，画中画尺寸由合成器缩放，不改动摄像头分辨率
+                self.camera_capture = open_shared_camera(0)
                 if not self.camera_capture.isOpened():
                     print("⚠️  摄像头无法打开，将跳过摄像头录制")
+                    self.camera_capture.release()
+                    self.camera_capture = None
                     self.config.enable_camera = False
                 else:
-                    self.camera_capture.set(cv.CAP_PROP_FRAME_WIDTH, self.config.camera_size[0])
-                    self.camera_capture.set(cv.CAP_PROP_FRAME_HEIGHT, self.config.camera_size[1])
                     print("✅ 摄像头初始化成功")
             except Exception as e:
                 print(f"❌ 摄像头初始化失败: {e}")
                 self.config.enable_camera = False
     
-    def start_recording(self, output_path: str):
-        """开始录制视频"""
+    def start_recording(self, output_path: str, audio_rate: Optional[int] = None):
+        """开始录制视频
+
+        Args:
+            output_path: 输出文件路径
+            audio_rate: ffmpeg_pipe 模式下随视频一起编码的音频采样率，None表示不含音频
+        """
         if self.is_recording:
             return
         
@@ -202,49 +654,178 @@ class VideoRecorder:
         else:
             screen_width, screen_height = 1920, 1080  # 默认尺寸
         
+        # 按输出比例缩放 (H.264的yuv420p要求宽高为偶数)
+        if self.config.output_scale != 1.0:
+            screen_width = max(2, int(screen_width * self.config.output_scale) // 2 * 2)
+            screen_height = max(2, int(screen_height * self.config.output_scale) // 2 * 2)
+        
+        self.frame_size = (screen_width, screen_height)
+        
         # 初始化视频写入器
-        fourcc = cv.VideoWriter_fourcc(*'mp4v')
-        self.video_writer = cv.VideoWriter(
-            output_path,
-            fourcc,
-            self.config.video_fps,
-            (screen_width, screen_height)
-        )
+        if self.config.video_encoder == "ffmpeg_pipe":
+            self.video_writer = FFmpegPipeWriter(
+                output_path,
+                screen_width,
+                screen_height,
+                self.config.video_fps,
+                self.config,
+                audio_rate=audio_rate
+            )
+        else:
+            fourcc = cv.VideoWriter_fourcc(*'mp4v')
+            self.video_writer = cv.VideoWriter(
+                output_path,
+                fourcc,
+                self.config.video_fps,
+                (screen_width, screen_height)
+            )
         
         if not self.video_writer.isOpened():
             print("❌ 视频写入器初始化失败")
             return
         
+        if self.config.enable_camera and self.camera_capture:
+            self.camera_compositor = CameraCompositor(
+                self.camera_capture,
+                self.config.camera_size,
+                self.config.camera_position
+            )
+            self.camera_compositor.start()
+        
+        self._allocate_frame_buffers(screen_width, screen_height)
+        if self.config.capture_workers > 0:
+            self.capture_pool = ThreadPoolExecutor(max_workers=self.config.capture_workers)
+        
         self.is_recording = True
         self.start_time = time.time()
+        self.frame_pacer = FramePacer(self.config.video_fps)
+        self.last_thumb = None
+        self.unchanged_frames = 0
         
+        self.encoder_thread = threading.Thread(target=self._encode_video)
+        self.encoder_thread.start()
         self.recording_thread = threading.Thread(target=self._record_video)
         self.recording_thread.start()
         print("🎬 开始录制视频")
 
+    def _allocate_frame_buffers(self, width: int, height: int):
+        """预分配帧缓冲，由采集线程和编码线程循环复用"""
+        count = max(2, self.config.frame_buffer_count)
+        self.frame_buffers = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(count)]
+        self.free_buffers = queue.Queue()
+        for index in range(count):
+            self.free_buffers.put(index)
+        # 队列容量比缓冲数少一，保证采集线程总能拿到一块正在填充的缓冲
+        self.encode_queue = queue.Queue(maxsize=count - 1)
+
     def _record_video(self):
-        """录制视频线程"""
-        # 在录制线程中重新初始化mss实例以避免线程安全问题
-        if self.config.enable_screen:
-            thread_screen_capture = mss.mss()
-            thread_monitor = thread_screen_capture.monitors[1]
-        else:
-            thread_screen_capture = None
-            thread_monitor = None
+        """采集线程: 抓屏、转换、叠加后按节拍把帧送入编码队列"""
+        thread_screen_capture = None
+        thread_monitor = None
+        try:
+            # 在录制线程中重新初始化mss实例以避免线程安全问题
+            if self.config.enable_screen:
+                thread_screen_capture = mss.mss()
+                thread_monitor = thread_screen_capture.monitors[1]
 
-        while self.is_recording:
+            # 叠加摄像头时每帧都会变化，不做变化检测
+            detect_changes = (self.config.skip_unchanged_frames and thread_screen_capture
+                              and not self.config.enable_camera)
+
+            while self.is_recording:
+                screenshot = None
+                if detect_changes:
+                    try:
+                        screenshot = thread_screen_capture.grab(thread_monitor)
+                    except Exception:
+                        screenshot = None  # 交给常规路径处理并显示错误画面
+                    if screenshot is not None and self._screen_unchanged(self._wrap_screenshot(screenshot)):
+                        # 画面未变化: 不转换，只通知编码线程重复上一帧
+                        repeat = self.frame_pacer.frames_due()
+                        if repeat:
+                            self.encode_queue.put((None, repeat, None))
+                        self.unchanged_frames += 1
+                        self.frame_pacer.wait()
+                        continue
+
+                # 取一块空闲缓冲；编码线程落后时不阻塞采集，由节拍器稍后补重复帧
+                try:
+                    index = self.free_buffers.get(timeout=self.frame_pacer.interval)
+                except queue.Empty:
+                    if screenshot is not None:
+                        self.last_thumb = None  # 这一帧没有送编码，下一帧不能按它判断无变化
+                    self.frame_pacer.wait()
+                    continue
+
+                frame = self._capture_frame_threaded(thread_screen_capture, thread_monitor,
+                                                     self.frame_buffers[index], screenshot)
+                # 按截止时间计算本帧应写入次数，落后时重复帧补齐时间轴
+                repeat = self.frame_pacer.frames_due() if frame is not None else 0
+                if repeat:
+                    self.encode_queue.put((frame, repeat, index))
+                else:
+                    self.free_buffers.put(index)
+                self.frame_pacer.wait()
+        except Exception as e:
+            print(f"❌ 视频录制错误: {e}")
+        finally:
+            # 通知编码线程结束
+            self.encode_queue.put(None)
+
+            # 清理线程本地的screen capture
+            if thread_screen_capture:
+                thread_screen_capture.close()
+
+    def _encode_video(self):
+        """编码线程: 写入帧后把缓冲归还空闲队列
+
+        最近写入的一帧缓冲会保留到下一帧到达，以便响应"重复上一帧"的请求。
+        """
+        last_frame = None
+        last_index = None
+        while True:
+            item = self.encode_queue.get()
+            if item is None:
+                break
+            frame, repeat, index = item
+            if frame is None:
+                frame = last_frame
+            elif last_index is not None:
+                self.free_buffers.put(last_index)
+                last_index = None
+            if frame is None:
+                continue
             try:
-                frame = self._capture_frame_threaded(thread_screen_capture, thread_monitor)
-                if frame is not None:
+                for _ in range(repeat):
                     self.video_writer.write(frame)
-                time.sleep(1.0 / self.config.video_fps)
             except Exception as e:
-                print(f"❌ 视频录制错误: {e}")
-                break
+                print(f"❌ 视频编码错误: {e}")
+            if index is not None:
+                last_frame = frame
+                last_index = index
+        if last_index is not None:
+            self.free_buffers.put(last_index)
 
-        # 清理线程本地的screen capture
-        if thread_screen_capture:
-            thread_screen_capture.close()
+    def _screen_unchanged(self, bgra) -> bool:
+        """比较缩略图判断屏幕是否与上一次送编码的画面相同"""
+        factor = max(1, self.config.change_detect_scale)
+        height, width = bgra.shape[:2]
+        size = (max(1, width // factor), max(1, height // factor))
+        if self.change_thumb is None or self.change_thumb.shape[:2] != (size[1], size[0]):
+            self.change_thumb = np.empty((size[1], size[0], 4), dtype=np.uint8)
+            self.last_thumb = None
+        
+        # 区域平均缩小，任何像素变化都会反映到对应缩略图像素上
+        cv.resize(bgra, size, dst=self.change_thumb, interpolation=cv.INTER_AREA)
+        if (self.last_thumb is not None
+                and cv.norm(self.change_thumb, self.last_thumb, cv.NORM_INF) <= self.config.change_threshold):
+            return True
+        
+        # 画面有变化，记为新的比较基准 (交换两块缓冲，避免分配)
+        if self.last_thumb is None:
+            self.last_thumb = np.empty_like(self.change_thumb)
+        self.change_thumb, self.last_thumb = self.last_thumb, self.change_thumb
+        return False
 
     def _capture_frame(self):
         """捕获一帧画面"""
@@ -254,75 +835,94 @@ class VideoRecorder:
         if self.config.enable_screen:
             try:
                 screenshot = self.screen_capture.grab(self.monitor)
-                frame = np.array(screenshot)
-                frame = cv.cvtColor(frame, cv.COLOR_BGRA2BGR)
+                frame = cv.cvtColor(self._wrap_screenshot(screenshot), cv.COLOR_BGRA2BGR)
             except Exception as e:
                 print(f"❌ 屏幕捕获错误: {e}")
-                # 创建黑色画面作为备用
-                frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+                # 使用缓存的黑色画面作为备用
+                frame = self._get_error_frame()
 
         # 添加摄像头画面
-        if self.config.enable_camera and self.camera_capture:
-            ret, camera_frame = self.camera_capture.read()
-            if ret:
-                frame = self._overlay_camera(frame, camera_frame)
+        if self.camera_compositor:
+            frame = self.camera_compositor.composite(frame)
 
         return frame
     
-    def _capture_frame_threaded(self, thread_screen_capture, thread_monitor):
-        """线程安全的帧捕获方法"""
+    def _capture_frame_threaded(self, thread_screen_capture, thread_monitor, out=None, screenshot=None):
+        """线程安全的帧捕获方法
+
+        Args:
+            thread_screen_capture: 采集线程自己的mss实例
+            thread_monitor: 要抓取的显示器区域
+            out: 预分配的BGR帧缓冲，提供时转换结果直接写入其中
+            screenshot: 已抓取的截图，提供时不再重新抓取
+        """
         frame = None
         
         # 捕获屏幕
         if self.config.enable_screen and thread_screen_capture:
             try:
-                screenshot = thread_screen_capture.grab(thread_monitor)
-                frame = np.array(screenshot)
-                frame = cv.cvtColor(frame, cv.COLOR_BGRA2BGR)
+                if screenshot is None:
+                    screenshot = thread_screen_capture.grab(thread_monitor)
+                frame = self._convert_bgra(self._scale_bgra(self._wrap_screenshot(screenshot)), out)
             except Exception as e:
                 print(f"❌ 屏幕捕获错误: {e}")
-                # 创建黑色画面作为备用
-                frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
-                cv.putText(frame, "Screen Capture Error", (50, 100), 
-                          cv.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+                # 使用缓存的黑色画面作为备用
+                frame = self._get_error_frame(out)
         
-        # 添加摄像头画面
-        if self.config.enable_camera and self.camera_capture:
-            try:
-                ret, camera_frame = self.camera_capture.read()
-                if ret:
-                    frame = self._overlay_camera(frame, camera_frame)
-            except Exception as e:
-                print(f"❌ 摄像头捕获错误: {e}")
+        # 添加摄像头画面 (摄像头在独立线程读取，这里只做一次切片赋值)
+        if self.camera_compositor:
+            frame = self.camera_compositor.composite(frame)
         
         return frame
-    
-    def _overlay_camera(self, screen_frame, camera_frame):
-        """在屏幕画面上叠加摄像头画面"""
-        if screen_frame is None:
-            return camera_frame
-        
-        h, w = screen_frame.shape[:2]
-        cam_h, cam_w = self.config.camera_size
-        
-        # 调整摄像头画面大小
-        camera_resized = cv.resize(camera_frame, (cam_w, cam_h))
-        
-        # 根据配置位置放置摄像头画面
-        if self.config.camera_position == "bottom_right":
-            x, y = w - cam_w - 20, h - cam_h - 20
-        elif self.config.camera_position == "bottom_left":
-            x, y = 20, h - cam_h - 20
-        elif self.config.camera_position == "top_right":
-            x, y = w - cam_w - 20, 20
-        elif self.config.camera_position == "top_left":
-            x, y = 20, 20
-        else:
-            x, y = w - cam_w - 20, h - cam_h - 20  # 默认右下角
+
+    @staticmethod
+    def _wrap_screenshot(screenshot):
+        """把mss截图的原始缓冲包装为BGRA数组 (零拷贝)"""
+        return np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(
+            screenshot.height, screenshot.width, 4)
+
+    def _scale_bgra(self, bgra):
+        """按输出尺寸缩放截图，缩放结果写入复用的中间缓冲"""
+        width, height = self.frame_size
+        if bgra.shape[1] == width and bgra.shape[0] == height:
+            return bgra
+        if self.scaled_bgra is None or self.scaled_bgra.shape[:2] != (height, width):
+            self.scaled_bgra = np.empty((height, width, 4), dtype=np.uint8)
+        cv.resize(bgra, (width, height), dst=self.scaled_bgra, interpolation=cv.INTER_AREA)
+        return self.scaled_bgra
+
+    def _get_error_frame(self, out=None):
+        """获取屏幕捕获失败时的备用画面，只在首次使用时创建"""
+        width, height = self.frame_size
+        if self.error_frame is None or self.error_frame.shape[:2] != (height, width):
+            self.error_frame = np.zeros((height, width, 3), dtype=np.uint8)
+            cv.putText(self.error_frame, "Screen Capture Error", (50, 100),
+                       cv.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+        # 后续会在画面上叠加摄像头，不能直接交出缓存本身
+        if out is not None and out.shape == self.error_frame.shape:
+            np.copyto(out, self.error_frame)
+            return out
+        return self.error_frame.copy()
+
+    def _convert_bgra(self, bgra, out=None):
+        """BGRA转BGR，启用工作线程池时按水平条带并行转换"""
+        if out is None or out.shape[:2] != bgra.shape[:2]:
+            return cv.cvtColor(bgra, cv.COLOR_BGRA2BGR)
         
-        # 叠加摄像头画面
-        screen_frame[y:y+cam_h, x:x+cam_w] = camera_resized
-        return screen_frame
+        if self.capture_pool is None:
+            cv.cvtColor(bgra, cv.COLOR_BGRA2BGR, dst=out)
+            return out
+        
+        height = bgra.shape[0]
+        workers = self.config.capture_workers
+        step = (height + workers - 1) // workers
+        futures = [
+            self.capture_pool.submit(cv.cvtColor, bgra[y:y + step], cv.COLOR_BGRA2BGR, dst=out[y:y + step])
+            for y in range(0, height, step)
+        ]
+        for future in futures:
+            future.result()
+        return out
     
     def stop_recording(self):
         """停止录制视频"""
@@ -334,13 +934,29 @@ class VideoRecorder:
         if self.recording_thread:
             self.recording_thread.join()
         
+        if self.encoder_thread:
+            self.encoder_thread.join()
+        
+        if self.capture_pool:
+            self.capture_pool.shutdown()
+            self.capture_pool = None
+        
         if self.video_writer:
             self.video_writer.release()
         
+        if self.camera_compositor:
+            self.camera_compositor.stop()
+            self.camera_compositor = None
+        
         if self.camera_capture:
             self.camera_capture.release()
         
         print("🎬 视频录制已停止")
+        stats = self.get_pacing_stats()
+        if stats:
+            print(f"🎬 帧率: 目标 {stats['target_fps']} FPS, 实际采集 {stats['achieved_fps']:.1f} FPS, "
+                  f"重复帧 {stats['duplicated_frames']}, 丢弃帧 {stats['dropped_frames']}, "
+                  f"无变化跳过 {stats['unchanged_frames']}")
     
     def get_recording_duration(self):
         """获取录制时长"""
@@ -348,6 +964,14 @@ class VideoRecorder:
             return time.time() - self.start_time
         return 0
 
+    def get_pacing_stats(self) -> Dict:
+        """获取帧节拍统计"""
+        if self.frame_pacer:
+            stats = self.frame_pacer.get_stats()
+            stats["unchanged_frames"] = self.unchanged_frames
+            return stats
+        return {}
+
 
 class SpeechRecognizer:
     """语音识别器"""
@@ -569,6 +1193,7 @@ class VideoRecordingAssistant:
         self.is_recording = False
         self.output_dir = self.config.output_dir
         self.current_session_id = None
+        self.audio_muxed_live = False  # 音频是否已由ffmpeg管道实时合入
         
         # 确保输出目录存在
         os.makedirs(self.output_dir, exist_ok=True)
@@ -601,13 +1226,30 @@ class VideoRecordingAssistant:
         
         try:
             # 初始化录制器
-            if self.config.enable_microphone:
-                self.audio_recorder = AudioRecorder(self.config)
-                self.audio_recorder.start_recording()
+            pipe_audio = (
+                self.config.video_encoder == "ffmpeg_pipe"
+                and self.config.enable_microphone
+                and FFmpegPipeWriter.can_pipe_audio()
+            )
             
             self.video_recorder = VideoRecorder(self.config)
             video_path = os.path.join(session_dir, f"video_{self.current_session_id}.mp4")
-            self.video_recorder.start_recording(video_path)
+            if pipe_audio:
+                # 音视频由同一个ffmpeg进程实时编码
+                self.video_recorder.start_recording(video_path, audio_rate=self.config.audio_sample_rate)
+            else:
+                self.video_recorder.start_recording(video_path)
+            # 以写入器实际状态为准: 音频管道建立失败时回退为录制后合并
+            self.audio_muxed_live = bool(
+                pipe_audio and getattr(self.video_recorder.video_writer, "audio_piped", False)
+            )
+            
+            if self.config.enable_microphone:
+                self.audio_recorder = AudioRecorder(self.config)
+                if self.audio_muxed_live and self.video_recorder.video_writer:
+                    self.audio_recorder.audio_sink = self.video_recorder.video_writer.write_audio
+                audio_path = os.path.join(session_dir, f"audio_{self.current_session_id}.wav")
+                self.audio_recorder.start_recording(audio_path)
             
             if self.config.enable_ai_subtitles:
                 self.speech_recognizer = SpeechRecognizer(self.config)
@@ -634,9 +1276,7 @@ class VideoRecordingAssistant:
         try:
             # 停止音频录制
             if self.audio_recorder:
-                session_dir = os.path.join(self.output_dir, self.current_session_id)
-                audio_path = os.path.join(session_dir, f"audio_{self.current_session_id}.wav")
-                self.audio_recorder.stop_recording(audio_path)
+                self.audio_recorder.stop_recording()
                 self.audio_recorder.cleanup()
             
             # 停止视频录制
@@ -659,12 +1299,27 @@ class VideoRecordingAssistant:
             self.is_recording = False
             print(f"✅ 录制已完成，文件保存在: {os.path.join(self.output_dir, self.current_session_id)}")
             
-            # 尝试合并音视频
-            self._merge_audio_video()
+            # 尝试合并音视频 (ffmpeg管道模式下已实时合入，只需改名为最终文件)
+            if self.audio_muxed_live:
+                self._finalize_muxed_video()
+            else:
+                self._merge_audio_video()
             
         except Exception as e:
             print(f"❌ 停止录制时出错: {e}")
     
+    def _finalize_muxed_video(self):
+        """把实时合入音频的视频文件改名为最终文件"""
+        session_dir = os.path.join(self.output_dir, self.current_session_id)
+        video_path = os.path.join(session_dir, f"video_{self.current_session_id}.mp4")
+        output_path = os.path.join(session_dir, f"final_{self.current_session_id}.mp4")
+        try:
+            if os.path.exists(video_path):
+                os.replace(video_path, output_path)
+                print(f"🎬 音视频已实时合并: {output_path}")
+        except OSError as e:
+            print(f"⚠️  重命名视频文件失败: {e}")
+    
     def _merge_audio_video(self):
         """合并音频和视频文件"""
         if not self.current_session_id:
@@ -705,6 +1360,8 @@ class VideoRecordingAssistant:
         
         if self.video_recorder and self.is_recording:
             status["duration"] = self.video_recorder.get_recording_duration()
+        if self.video_recorder:
+            status["pacing"] = self.video_recorder.get_pacing_stats()
         
         return status
     